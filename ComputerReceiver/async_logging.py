@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Asynchronous Logging for the receivers
+Request threads only append a structured event to a bounded queue; a
+background writer thread formats, batches and flushes them to the terminal
+and to a JSON-lines file
+"""
+
+import json
+import logging
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Deque, Dict, List, NamedTuple, Optional, TextIO, Union
+
+DEBUG, INFO, WARNING, ERROR = logging.DEBUG, logging.INFO, logging.WARNING, logging.ERROR
+
+
+class LogEvent(NamedTuple):
+    """One structured log event, formatted only on the writer thread"""
+    timestamp: float
+    level: int
+    message: str
+    fields: Dict[str, Any]
+
+    def text(self) -> str:
+        """The message with ``{field}`` placeholders filled in"""
+        if not self.fields:
+            return self.message
+        try:
+            return self.message.format(**self.fields)
+        except (KeyError, IndexError, ValueError):
+            return f"{self.message} {self.fields}"
+
+
+class ConsoleSink:
+    """Human-readable lines on a terminal stream"""
+
+    def __init__(self, stream: Optional[TextIO] = None, timestamps: bool = True):
+        self.stream = stream or sys.stdout
+        self.timestamps = timestamps
+
+    def write(self, events: List[LogEvent]):
+        lines = []
+        for event in events:
+            if self.timestamps:
+                when = datetime.fromtimestamp(event.timestamp).strftime('%Y-%m-%d %H:%M:%S,%f')[:-3]
+                lines.append(f"{when} - {logging.getLevelName(event.level)} - {event.text()}\n")
+            else:
+                lines.append(f"{event.text()}\n")
+        self.stream.write(''.join(lines))
+
+    def flush(self):
+        self.stream.flush()
+
+
+class JsonLinesSink:
+    """One JSON object per event, with the structured fields kept as keys"""
+
+    def __init__(self, path: Union[str, Path]):
+        self.file = Path(path).open('a', encoding='utf-8')
+
+    def write(self, events: List[LogEvent]):
+        self.file.write(''.join(
+            json.dumps({
+                'time': datetime.fromtimestamp(event.timestamp).isoformat(),
+                'level': logging.getLevelName(event.level),
+                'message': event.text(),
+                **event.fields,
+            }, default=str, ensure_ascii=False) + '\n'
+            for event in events))
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class AsyncLogger:
+    """Bounded, non-blocking log queue drained by one writer thread
+
+    Logging never waits on disk or terminal. Once the queue is more than
+    ``sample_above`` full, only every ``sample_every``-th debug/info event is
+    kept; when it is completely full new events are dropped. Warnings and
+    errors are never sampled. Dropped and sampled-out counts are reported by
+    the writer as a warning so gaps in the log are visible.
+    """
+
+    def __init__(self, sinks, max_queue: int = 10_000, batch_size: int = 512,
+                 sample_above: float = 0.5, sample_every: int = 10, level: int = INFO):
+        self.sinks = list(sinks)
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.sample_threshold = int(max_queue * sample_above)
+        self.sample_every = sample_every
+        self.level = level
+        self.logged = 0
+        self.dropped = 0
+        self.sampled_out = 0
+        self.batches = 0
+        self.sink_errors = 0
+        self._queue: Deque[LogEvent] = deque()
+        self._lock = threading.Lock()
+        self._ready = threading.Condition(self._lock)
+        self._sample_counter = 0
+        self._reported = (0, 0)
+        self._closed = False
+        self._writer = threading.Thread(target=self._run, name='async-logger', daemon=True)
+        self._writer.start()
+
+    def log(self, level: int, message: str, **fields):
+        """Queue an event; ``message`` may use ``{field}`` placeholders"""
+        if level < self.level or self._closed:
+            return
+        event = LogEvent(time.time(), level, message, fields)
+        with self._lock:
+            depth = len(self._queue)
+            if depth >= self.max_queue:
+                self.dropped += 1
+                return
+            if depth >= self.sample_threshold and level < WARNING:
+                self._sample_counter += 1
+                if self._sample_counter % self.sample_every:
+                    self.sampled_out += 1
+                    return
+            self._queue.append(event)
+            self.logged += 1
+            if not depth:
+                self._ready.notify()
+
+    def debug(self, message: str, **fields):
+        self.log(DEBUG, message, **fields)
+
+    def info(self, message: str, **fields):
+        self.log(INFO, message, **fields)
+
+    def warning(self, message: str, **fields):
+        self.log(WARNING, message, **fields)
+
+    def error(self, message: str, **fields):
+        self.log(ERROR, message, **fields)
+
+    @property
+    def depth(self) -> int:
+        return len(self._queue)
+
+    def metrics(self) -> dict:
+        return {
+            'depth': self.depth,
+            'logged': self.logged,
+            'dropped': self.dropped,
+            'sampled_out': self.sampled_out,
+            'batches': self.batches,
+        }
+
+    def close(self, timeout: float = 5.0):
+        """Write everything still queued, then stop the writer"""
+        with self._lock:
+            self._closed = True
+            self._ready.notify()
+        self._writer.join(timeout)
+        for sink in self.sinks:
+            if hasattr(sink, 'close'):
+                sink.close()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while not self._queue and not self._closed:
+                    self._ready.wait()
+                if not self._queue and self._closed:
+                    break
+                count = min(len(self._queue), self.batch_size)
+                batch = [self._queue.popleft() for _ in range(count)]
+                lost = (self.dropped, self.sampled_out)
+            if lost != self._reported:
+                batch.append(LogEvent(
+                    time.time(), WARNING,
+                    "⚠️  Log backpressure: {dropped} events dropped, {sampled_out} sampled out so far",
+                    {'dropped': lost[0], 'sampled_out': lost[1]}))
+                self._reported = lost
+            self._write(batch)
+
+    def _write(self, batch: List[LogEvent]):
+        for sink in self.sinks:
+            try:
+                sink.write(batch)
+                sink.flush()
+            except Exception as e:
+                self.sink_errors += 1
+                if self.sink_errors == 1:
+                    print(f"❌ Log sink {type(sink).__name__} failed: {e}", file=sys.stderr)
+        self.batches += 1
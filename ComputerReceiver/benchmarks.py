@@ -0,0 +1,445 @@
+#!/usr/bin/env python3
+"""
+Performance benchmarks for the console pipeline
+Runs against console_simulator.py in-process, or a real desk with --console
+"""
+
+import argparse
+import asyncio
+import http.client
+import json
+import multiprocessing
+import os
+import socket
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from async_logging import WARNING
+from console_client import ConsoleConnection, RCP_PORT
+from console_simulator import ConsoleSimulator
+from console_state import ConsoleStateMirror
+from console_sync import resync_handler, sync_mirror
+from rcp_protocol import LineFramer
+from udp_receiver import BATCH_SIZE, WiFiTextReceiver
+
+
+async def open_target(args):
+    """Start an in-process simulator unless a console host was given"""
+    if args.console:
+        return None, args.console, args.console_port
+    simulator = ConsoleSimulator(latency=args.latency_ms / 1000.0, jitter=args.jitter_ms / 1000.0)
+    port = await simulator.start('127.0.0.1', 0)
+    return simulator, '127.0.0.1', port
+
+
+def print_latencies(label, samples):
+    samples = sorted(samples)
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    print(f"  {label}: median {statistics.median(samples) * 1000:.2f} ms, "
+          f"p99 {p99 * 1000:.2f} ms over {len(samples)} requests")
+
+
+async def bench_roundtrip(args):
+    """Sequential request/reply latency, one command at a time"""
+    simulator, host, port = await open_target(args)
+    connection = ConsoleConnection(host, port)
+    await connection.connect()
+    samples = []
+    for i in range(args.count):
+        start = time.perf_counter()
+        await connection.request(f"set MIXER:Current/InCh/Fader/Level {i % 40} 0 {-(i % 100) * 10}")
+        samples.append(time.perf_counter() - start)
+    print_latencies("Round trip", samples)
+    await connection.close()
+    if simulator is not None:
+        await simulator.stop()
+
+
+async def bench_pipeline(args):
+    """Throughput of pipelined bursts of ``--burst`` set commands"""
+    simulator, host, port = await open_target(args)
+    connection = ConsoleConnection(host, port)
+    await connection.connect()
+    total = 0
+    start = time.perf_counter()
+    while total < args.count:
+        lines = [f"set MIXER:Current/InCh/Fader/Level {ch % 40} 0 {-(total % 100) * 10}"
+                 for ch in range(args.burst)]
+        await asyncio.gather(*await connection.request_many(lines))
+        total += len(lines)
+    elapsed = time.perf_counter() - start
+    print(f"  Pipelined: {total} commands in {elapsed:.3f} s ({total / elapsed:,.0f} cmd/s, "
+          f"bursts of {args.burst})")
+    await connection.close()
+    if simulator is not None:
+        await simulator.stop()
+
+
+async def bench_sync(args):
+    """Full state dump into a fresh mirror under an in-flight window of ``--burst``"""
+    simulator, host, port = await open_target(args)
+    connection = ConsoleConnection(host, port)
+    await connection.connect()
+    mirror = ConsoleStateMirror()
+    report = await sync_mirror(connection, mirror, window=args.burst)
+    print(f"  Sync: {report.applied}/{report.requested} parameters in {report.elapsed * 1000:.0f} ms "
+          f"({report.requested / report.elapsed:,.0f} gets/s, window {args.burst}, {report.errors} errors)")
+    await connection.close()
+    if simulator is not None:
+        await simulator.stop()
+
+
+async def bench_reconnect(args):
+    """Drop the link mid-burst and time reconnect, resync and replay until consistent"""
+    if args.console:
+        print("  ⚠️  The reconnect benchmark needs the in-process simulator")
+        return
+    simulator = ConsoleSimulator(latency=args.latency_ms / 1000.0, max_rate=args.rate)
+    port = await simulator.start('127.0.0.1', 0)
+    mirror = ConsoleStateMirror(simulator.mirror.table)
+    connection = ConsoleConnection('127.0.0.1', port, on_reconnect=resync_handler(mirror))
+    await connection.connect()
+    await sync_mirror(connection, mirror)
+
+    lines = [f"set MIXER:Current/InCh/Fader/Level {i % 40} 0 {-(i // 40) * 10 - 10}" for i in range(args.count)]
+    await connection.send_lines(lines)
+    while connection.in_flight > args.count // 2:
+        await asyncio.sleep(0.0005)
+    unacknowledged = len(connection.replay)
+    simulator.disconnect_all()
+    while connection.reconnects == 0:
+        await asyncio.sleep(0.001)
+
+    intended = {}
+    for line in lines:
+        _, address, x, y, value = line.split()
+        intended[(address, int(x), int(y))] = int(value)
+    consistent = all(simulator.mirror.get(address, x, y) == value for (address, x, y), value in intended.items())
+    print(f"  Reconnect: {unacknowledged} unacknowledged at drop, consistent={consistent} after "
+          f"{connection.last_recovery * 1000:.0f} ms (backoff + resync + replay)")
+    await connection.close()
+    await simulator.stop()
+
+
+def split_text_stream(chunks):
+    """The old receiver loop: grow a str buffer and split one line off at a time"""
+    buffer = ""
+    count = 0
+    for data in chunks:
+        buffer += data.decode('utf-8')
+        while '\n' in buffer:
+            message, buffer = buffer.split('\n', 1)
+            count += bool(message.strip())
+    return count
+
+
+def frame_stream(chunks):
+    framer = LineFramer()
+    return sum(len(framer.feed_text(data)) for data in chunks)
+
+
+async def bench_framing(args):
+    """Cost per MB of framing NOTIFY bursts, old str loop vs LineFramer
+
+    With 64 KB reads both are linear; when a lagging reader gets the whole
+    burst in one read the str loop re-copies the remainder for every line.
+    """
+    line = b"NOTIFY set MIXER:Current/InCh/Fader/Level 12 0 -1234\n"
+    for megabytes in (0.5, 1, 2, 4):
+        stream = line * int(megabytes * 1024 * 1024 // len(line))
+        for label, size in (("64 KB reads", 64 * 1024), ("one read", len(stream))):
+            chunks = [stream[i:i + size] for i in range(0, len(stream), size)]
+            timings = []
+            for framer in (split_text_stream, frame_stream):
+                start = time.perf_counter()
+                count = framer(chunks)
+                timings.append((time.perf_counter() - start) / megabytes)
+            print(f"  {megabytes:g} MB ({count:,} lines, {label}): str split {timings[0] * 1000:.1f} ms/MB, "
+                  f"LineFramer {timings[1] * 1000:.1f} ms/MB")
+
+
+def post_json(port, path, body):
+    connection = http.client.HTTPConnection('127.0.0.1', port)
+    connection.request('POST', path, json.dumps(body), {'Content-Type': 'application/json'})
+    response = connection.getresponse()
+    response.read()
+    connection.close()
+    return response.status
+
+
+async def bench_batch(args):
+    """HTTP throughput of /rcp (one command per request) vs /rcp/batch (``--burst`` per request)
+
+    Runs ios_rcp_receiver in-process with forwarding to the console, and
+    ``--clients`` phones posting concurrently. Coalescing is switched off for
+    both runs: a batch lands inside one coalescing window and would otherwise
+    reach the console as a fraction of its writes, measuring the coalescer
+    rather than the transport.
+    """
+    import ios_rcp_receiver as receiver  # Needs Flask
+    from werkzeug.serving import make_server
+
+    simulator, host, port = await open_target(args)
+    receiver.log.level = WARNING  # Keep terminal output out of the measurement
+    receiver.start_forwarding(host, port)
+    receiver.coalescer.suffixes = ()  # Every write goes straight through
+    server = make_server('127.0.0.1', 0, receiver.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    payloads = [{
+        'command': f"set MIXER:Current/InCh/Fader/Level {i % 40} 0 {-(i % 100) * 10}",
+        'description': 'Benchmark fader move', 'confidence': 0.95, 'originalText': f'channel {i % 40 + 1} down',
+        'timestamp': '2024-01-15T10:30:45Z', 'deviceId': 'Benchmark iPhone', 'commandType': 'voice_command',
+    } for i in range(args.count)]
+    per_client = args.count // args.clients
+
+    def run(path, chunk):
+        requests = [payloads[i:i + chunk] for i in range(0, per_client * args.clients, chunk)]
+        bodies = [batch[0] for batch in requests] if chunk == 1 else requests
+        with ThreadPoolExecutor(args.clients) as pool:
+            statuses = list(pool.map(lambda body: post_json(server.port, path, body), bodies))
+        return statuses
+
+    results = {}
+    loop = asyncio.get_running_loop()
+    for label, path, chunk in (("single", '/rcp', 1), ("batch", '/rcp/batch', args.burst)):
+        sent_before = simulator.commands if simulator else 0
+        start = time.perf_counter()
+        statuses = await loop.run_in_executor(None, run, path, chunk)
+        elapsed = time.perf_counter() - start
+        total = len(statuses) * chunk
+        results[label] = total / elapsed
+        while simulator and simulator.commands - sent_before < total and time.perf_counter() - start < elapsed + 5:
+            await asyncio.sleep(0.01)
+        forwarded = f", {simulator.commands - sent_before} reached the console" if simulator else ""
+        print(f"  {label:>6}: {total} commands in {len(statuses)} requests, {elapsed:.3f} s "
+              f"({results[label]:,.0f} cmd/s, {statuses.count(200)} OK{forwarded})")
+    print(f"  Batching {args.burst} commands per request: {results['batch'] / results['single']:.1f}× throughput")
+
+    server.shutdown()
+    receiver.stop_forwarding()
+    receiver.log.close()
+    if simulator is not None:
+        await simulator.stop()
+
+
+class KeepAliveClient:
+    """Minimal asyncio HTTP/1.1 client that reuses its connection when the server allows"""
+
+    def __init__(self, port):
+        self.port = port
+        self.reader = self.writer = None
+
+    async def post(self, path, body: bytes) -> int:
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection('127.0.0.1', self.port)
+        self.writer.write(f"POST {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nContent-Type: application/json\r\n"
+                          f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+        status_line = await self.reader.readline()
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        await self.reader.readexactly(int(headers.get('content-length', 0)))
+        if status_line.startswith(b'HTTP/1.0') or headers.get('connection', '').lower() == 'close':
+            await self.close()
+        return int(status_line.split()[1])
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+
+def start_http_server(receiver, kind):
+    """Serve the receiver's Flask or ASGI app from a background thread, returns (port, stop)"""
+    if kind == 'flask':
+        from werkzeug.serving import make_server
+        server = make_server('127.0.0.1', 0, receiver.app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server.port, server.shutdown
+    import uvicorn
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(receiver.create_asgi_app(), host='127.0.0.1', port=port,
+                                           access_log=False, log_level='warning', backlog=2048))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+
+    def stop():
+        server.should_exit = True
+        thread.join(5.0)
+    return port, stop
+
+
+async def bench_load(args):
+    """Requests/s and tail latency of /rcp with ``--clients`` phones posting at once, Flask vs ASGI"""
+    import ios_rcp_receiver as receiver  # Needs Flask, plus starlette and uvicorn for ASGI
+
+    simulator, host, port = await open_target(args)
+    receiver.log.level = WARNING
+    receiver.console_host, receiver.console_port = host, port
+    per_client = max(1, args.count // args.clients)
+    body = json.dumps({
+        'command': "set MIXER:Current/InCh/Fader/Level 0 0 -1000", 'description': 'Load test',
+        'confidence': 0.95, 'originalText': 'channel one down', 'timestamp': '2024-01-15T10:30:45Z',
+        'deviceId': 'Load test iPhone', 'commandType': 'voice_command',
+    }).encode()
+
+    async def phone(http_port, samples, failures):
+        client = KeepAliveClient(http_port)
+        for _ in range(per_client):
+            start = time.perf_counter()
+            try:
+                status = await client.post('/rcp', body)
+            except (OSError, asyncio.IncompleteReadError, ValueError):
+                await client.close()
+                status = None
+            samples.append(time.perf_counter() - start)
+            failures.append(status != 200)
+        await client.close()
+
+    for kind in args.servers.split(','):
+        if kind == 'flask':
+            receiver.start_forwarding(host, port)
+        http_port, stop = start_http_server(receiver, kind)
+        samples, failures = [], []
+        start = time.perf_counter()
+        await asyncio.gather(*(phone(http_port, samples, failures) for _ in range(args.clients)))
+        elapsed = time.perf_counter() - start
+        print(f"  {kind}: {len(samples)} requests from {args.clients} clients in {elapsed:.2f} s "
+              f"({len(samples) / elapsed:,.0f} req/s, {sum(failures)} failed)")
+        print_latencies(kind, samples)
+        stop()
+        receiver.stop_forwarding()
+    receiver.log.close()
+    if simulator is not None:
+        await simulator.stop()
+
+
+def udp_worker(port, batch_size, ready, stop, results):
+    """One SO_REUSEPORT receiver process; terminal output is discarded so only the receive path is measured"""
+    sys.stdout = open(os.devnull, 'w')
+    receiver = WiFiTextReceiver('127.0.0.1', port, reuse_port=True, batch_size=batch_size)
+    thread = threading.Thread(target=receiver.start_server, daemon=True)
+    thread.start()
+    while not receiver.is_running:
+        time.sleep(0.01)
+    ready.release()
+    stop.wait()
+    receiver.stop_server()
+    thread.join(2.0)
+    results.put((receiver.received, receiver.batches))
+
+
+def udp_sender(port, count, rate, start, results):
+    """Load generator process: one phone sending ``count`` voice messages at ``rate`` per second, in bursts of 32"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.connect(('127.0.0.1', port))
+    messages = [json.dumps({'id': f'{os.getpid()}-{i}', 'content': f'set channel {i % 32 + 1} to unity',
+                            'messageType': 'voice_command'}).encode() for i in range(count)]
+    start.wait()
+    sent = 0
+    began = time.perf_counter()
+    for i, message in enumerate(messages):
+        try:
+            sent += sock.send(message) > 0
+        except OSError:  # ECONNREFUSED from an earlier ICMP error, the datagram is lost
+            pass
+        if i % 32 == 31:
+            delay = began + (i + 1) / rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+    sock.close()
+    results.put(sent)
+
+
+async def bench_udp(args):
+    """Datagrams/s and drop rate of udp_receiver: one datagram per wakeup vs batched vs SO_REUSEPORT workers
+
+    ``--clients`` sender processes (separate source ports, so the kernel
+    spreads them over the workers) share an offered load of ``--rate``
+    datagrams/s until ``--count`` messages are sent.
+    """
+    context = multiprocessing.get_context('spawn')
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as probe:
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+    per_sender = max(1, args.count // args.clients)
+    configs = [(1, 1), (1, BATCH_SIZE)] + [(int(w), BATCH_SIZE) for w in args.workers.split(',') if int(w) > 1]
+
+    for workers, batch_size in configs:
+        ready, stop, start = context.Semaphore(0), context.Event(), context.Event()
+        received, sent = context.Queue(), context.Queue()
+        receivers = [context.Process(target=udp_worker, args=(port, batch_size, ready, stop, received))
+                     for _ in range(workers)]
+        senders = [context.Process(target=udp_sender, args=(port, per_sender, args.rate / args.clients, start, sent))
+                   for _ in range(args.clients)]
+        for process in receivers + senders:
+            process.start()
+        for _ in receivers:
+            ready.acquire()
+        await asyncio.sleep(0.5)  # Let the senders build their messages
+        began = time.perf_counter()
+        start.set()
+        total_sent = sum(sent.get() for _ in senders)
+        elapsed = time.perf_counter() - began
+        await asyncio.sleep(0.5)  # Let the receivers drain their socket buffers
+        stop.set()
+        counts = [received.get() for _ in receivers]
+        for process in receivers + senders:
+            process.join()
+        total = sum(c for c, _ in counts)
+        batches = sum(b for _, b in counts)
+        label = f"{workers} worker{'s' if workers > 1 else ''}, batch {batch_size}"
+        print(f"  {label:>20}: {total:,}/{total_sent:,} datagrams at {total_sent / elapsed:,.0f}/s offered "
+              f"({total / elapsed:,.0f} dgram/s, {100 * (1 - total / total_sent):.1f}% dropped, "
+              f"{total / max(batches, 1):.1f} per wakeup, per worker {[c for c, _ in counts]})")
+
+
+BENCHMARKS = {
+    'roundtrip': bench_roundtrip,
+    'pipeline': bench_pipeline,
+    'sync': bench_sync,
+    'reconnect': bench_reconnect,
+    'framing': bench_framing,
+    'batch': bench_batch,
+    'load': bench_load,
+    'udp': bench_udp,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the RCP console pipeline')
+    parser.add_argument('benchmark', choices=sorted(BENCHMARKS), help='Benchmark to run')
+    parser.add_argument('--count', type=int, default=2000, help='Number of commands (default: 2000)')
+    parser.add_argument('--burst', type=int, default=40, help='Commands per pipelined burst (default: 40)')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='Simulated console latency in ms')
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help='Simulated console jitter in ms')
+    parser.add_argument('--rate', type=float, default=20000.0, help='Simulated console command rate for reconnect, offered datagrams/s for udp (default: 20000)')
+    parser.add_argument('--clients', type=int, help='Concurrent clients (default: 8 for batch and udp, 500 for load)')
+    parser.add_argument('--servers', default='flask,asgi', help='HTTP servers compared by load (default: flask,asgi)')
+    parser.add_argument('--workers', default=f"{os.cpu_count() or 1}",
+                        help='Comma-separated UDP receiver process counts compared by udp (default: CPU count)')
+    parser.add_argument('--console', help='Benchmark a real console at this IP instead of the simulator')
+    parser.add_argument('--console-port', type=int, default=RCP_PORT, help='Console RCP port (default: 49280)')
+    args = parser.parse_args()
+    if args.clients is None:
+        args.clients = 500 if args.benchmark == 'load' else 8
+
+    target = "" if args.benchmark in ('framing', 'udp') else f" against {args.console or 'simulator'}"
+    print(f"⏱️  Benchmark: {args.benchmark}{target}")
+    asyncio.run(BENCHMARKS[args.benchmark](args))
+
+
+if __name__ == "__main__":
+    main()
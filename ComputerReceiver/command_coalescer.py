@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Output Coalescer for RCP set commands
+Collapses bursts of writes to the same continuous parameter (fader rides,
+pan sweeps) into the last value per (address, x, y) within a short window
+"""
+
+import asyncio
+import inspect
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from rcp_protocol import command_lines, parse_line
+
+# Continuous parameters worth coalescing; everything else passes straight through
+COALESCE_SUFFIXES = ('/Level', '/Pan', '/Balance')
+
+
+class OutputCoalescer:
+    """Last-value-wins buffer between the voice engine and the network sender
+
+    Level and pan writes are held for ``window`` seconds and only the newest
+    value per (address, x, y) is emitted, in first-seen order, as one burst.
+    Mutes, labels and gets go out immediately; a scene recall first flushes
+    whatever is pending so held fader moves cannot land after the recall.
+    """
+
+    def __init__(self, sink: Callable[[List[str]], Any], window: float = 0.005,
+                 suffixes: Tuple[str, ...] = COALESCE_SUFFIXES):
+        self.sink = sink
+        self.window = window
+        self.suffixes = suffixes
+        self.pending: Dict[Tuple[str, int, int], str] = {}
+        self.submitted = 0
+        self.emitted = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    def bind(self, loop: asyncio.AbstractEventLoop):
+        """Attach to the event loop that owns the window timer"""
+        self._loop = loop
+
+    def submit(self, commands):
+        """Queue RCPCommands, bulk commands or raw lines, safe from any thread"""
+        lines = list(command_lines(commands))
+        if not lines:
+            return
+        loop = self._loop
+        if loop is None:
+            self._loop = loop = asyncio.get_running_loop()
+        try:
+            on_loop = asyncio.get_running_loop() is loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            self._submit(lines)
+        else:
+            loop.call_soon_threadsafe(self._submit, lines)
+
+    def flush(self):
+        """Emit every pending write now"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self.pending:
+            burst = list(self.pending.values())
+            self.pending.clear()
+            self._emit(burst)
+
+    @property
+    def coalesced(self) -> int:
+        """Writes dropped because a newer value for the same slot replaced them"""
+        return self.submitted - self.emitted - len(self.pending)
+
+    def _submit(self, lines: List[str]):
+        immediate = []
+        for line in lines:
+            self.submitted += 1
+            message = parse_line(line)
+            if message is not None and message.verb == 'set' and message.address.endswith(self.suffixes):
+                key = (message.address, message.x, message.y)
+                self.pending[key] = line
+                continue
+            if line.startswith('ssrecall_ex'):
+                if immediate:
+                    self._emit(immediate)
+                    immediate = []
+                self.flush()
+            immediate.append(line)
+        if immediate:
+            self._emit(immediate)
+        if self.pending and self._timer is None:
+            self._timer = self._loop.call_later(self.window, self._on_window)
+
+    def _on_window(self):
+        self._timer = None
+        self.flush()
+
+    def _emit(self, burst: List[str]):
+        self.emitted += len(burst)
+        try:
+            result = self.sink(burst)
+            if inspect.isawaitable(result):
+                asyncio.ensure_future(result, loop=self._loop)
+        except Exception as e:
+            print(f"❌ Coalescer sink failed: {e}")
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Command Scheduler for deferred and cue-based RCP actions
+Holds batches like "in 10 seconds recall scene 4" or "at the end of this song
+mute 1 through 8" until their time or cue arrives, then dispatches them
+"""
+
+import asyncio
+import heapq
+import inspect
+import itertools
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+
+@dataclass
+class ScheduledBatch:
+    """A batch of RCP commands waiting for a deadline or a cue"""
+    batch_id: int
+    commands: List[Any]
+    label: str = ""
+    when: Optional[float] = None  # Monotonic deadline, None while waiting on a cue
+    cue: Optional[str] = None
+    created: float = field(default_factory=time.monotonic)
+    cancelled: bool = False
+
+
+class CommandScheduler:
+    """Heap-based scheduler driven by a single asyncio event loop
+
+    Timed batches live in a binary heap keyed on their deadline, so inserting
+    is O(log n). Cancelling only marks the entry and drops it from the live
+    index (O(1)); stale heap slots are skipped when popped and the heap is
+    compacted once they outnumber the live entries, which keeps thousands of
+    pending actions cheap over a long show. Cue batches wait in a per-cue
+    index until ``fire_cue`` moves them onto the heap as due now.
+    """
+
+    COMPACT_MIN_STALE = 64
+
+    def __init__(self, dispatch: Optional[Callable[[ScheduledBatch], Any]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.dispatch = dispatch
+        self.clock = clock
+        self._heap: List[tuple] = []  # (when, batch_id)
+        self._entries: Dict[int, ScheduledBatch] = {}
+        self._cues: Dict[str, Dict[int, None]] = {}  # cue -> ordered set of batch ids
+        self._stale = 0
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._running = False
+
+    @staticmethod
+    def normalize_cue(cue: str) -> str:
+        """Normalize a spoken cue name so 'End of this song' matches 'end of song'"""
+        words = [w for w in cue.lower().split() if w not in ('the', 'this', 'a')]
+        return ' '.join(words)
+
+    def schedule_in(self, delay: float, commands: List[Any], label: str = "") -> ScheduledBatch:
+        """Schedule a batch to run ``delay`` seconds from now"""
+        return self.schedule_at(self.clock() + max(0.0, delay), commands, label)
+
+    def schedule_at(self, when: float, commands: List[Any], label: str = "") -> ScheduledBatch:
+        """Schedule a batch for an absolute deadline on the scheduler clock"""
+        with self._lock:
+            batch = ScheduledBatch(next(self._ids), list(commands), label, when=when)
+            self._entries[batch.batch_id] = batch
+            heapq.heappush(self._heap, (when, batch.batch_id))
+        self._notify()
+        return batch
+
+    def schedule_on_cue(self, cue: str, commands: List[Any], label: str = "") -> ScheduledBatch:
+        """Hold a batch until ``fire_cue`` is called with a matching cue name"""
+        cue = self.normalize_cue(cue)
+        with self._lock:
+            batch = ScheduledBatch(next(self._ids), list(commands), label, cue=cue)
+            self._entries[batch.batch_id] = batch
+            self._cues.setdefault(cue, {})[batch.batch_id] = None
+        return batch
+
+    def has_cue(self, cue: str) -> bool:
+        """Whether any batch is waiting on ``cue``"""
+        with self._lock:
+            return self.normalize_cue(cue) in self._cues
+
+    def fire_cue(self, cue: str) -> List[ScheduledBatch]:
+        """Make every batch waiting on ``cue`` due immediately"""
+        cue = self.normalize_cue(cue)
+        now = self.clock()
+        with self._lock:
+            waiting = self._cues.pop(cue, {})
+            fired = []
+            for batch_id in waiting:
+                batch = self._entries[batch_id]
+                batch.when = now
+                heapq.heappush(self._heap, (now, batch_id))
+                fired.append(batch)
+        if fired:
+            self._notify()
+        return fired
+
+    def cancel(self, batch_id: int) -> bool:
+        """Cancel a pending batch, returns False if it already ran or never existed"""
+        with self._lock:
+            batch = self._entries.pop(batch_id, None)
+            if batch is None:
+                return False
+            batch.cancelled = True
+            if batch.when is None:
+                waiting = self._cues.get(batch.cue)
+                if waiting is not None:
+                    waiting.pop(batch_id, None)
+                    if not waiting:
+                        del self._cues[batch.cue]
+            else:
+                self._stale += 1
+                self._maybe_compact()
+        self._notify()
+        return True
+
+    def cancel_all(self) -> int:
+        """Cancel every pending batch and return how many were dropped"""
+        with self._lock:
+            count = len(self._entries)
+            for batch in self._entries.values():
+                batch.cancelled = True
+            self._entries.clear()
+            self._cues.clear()
+            self._heap.clear()
+            self._stale = 0
+        self._notify()
+        return count
+
+    def list_pending(self) -> List[ScheduledBatch]:
+        """Pending batches, timed ones by deadline followed by cue batches"""
+        with self._lock:
+            batches = list(self._entries.values())
+        timed = sorted((b for b in batches if b.when is not None), key=lambda b: (b.when, b.batch_id))
+        cued = sorted((b for b in batches if b.when is None), key=lambda b: b.batch_id)
+        return timed + cued
+
+    def next_deadline(self) -> Optional[float]:
+        """Deadline of the earliest live timed batch"""
+        with self._lock:
+            self._drop_stale_head()
+            return self._heap[0][0] if self._heap else None
+
+    def poll(self, now: Optional[float] = None) -> List[ScheduledBatch]:
+        """Pop and return every batch due at ``now`` in deadline order"""
+        now = self.clock() if now is None else now
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                _, batch_id = heapq.heappop(self._heap)
+                batch = self._entries.pop(batch_id, None)
+                if batch is None:
+                    self._stale -= 1
+                    continue
+                due.append(batch)
+        return due
+
+    def __len__(self):
+        return len(self._entries)
+
+    async def run(self):
+        """Dispatch due batches on the current event loop until ``stop`` is called"""
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._running = True
+        try:
+            while self._running:
+                for batch in self.poll():
+                    await self._dispatch(batch)
+                deadline = self.next_deadline()
+                timeout = None if deadline is None else max(0.0, deadline - self.clock())
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+        finally:
+            self._running = False
+            self._loop = None
+
+    def stop(self):
+        """Ask the ``run`` loop to exit"""
+        self._running = False
+        self._notify()
+
+    async def _dispatch(self, batch: ScheduledBatch):
+        if self.dispatch is None:
+            return
+        try:
+            result = self.dispatch(batch)
+            if inspect.isawaitable(result):
+                await result
+        except Exception as e:
+            print(f"❌ Scheduled batch {batch.batch_id} failed: {e}")
+
+    def _notify(self):
+        """Wake the run loop, safe to call from any thread"""
+        loop, wakeup = self._loop, self._wakeup
+        if loop is None or wakeup is None:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            wakeup.set()
+        else:
+            loop.call_soon_threadsafe(wakeup.set)
+
+    def _drop_stale_head(self):
+        while self._heap and self._heap[0][1] not in self._entries:
+            heapq.heappop(self._heap)
+            self._stale -= 1
+
+    def _maybe_compact(self):
+        if self._stale > self.COMPACT_MIN_STALE and self._stale * 2 > len(self._heap):
+            self._heap = [item for item in self._heap if item[1] in self._entries]
+            heapq.heapify(self._heap)
+            self._stale = 0
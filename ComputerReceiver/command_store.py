@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Command Store for received voice/RCP commands
+Thread-safe fixed-capacity ring buffer with monotonically increasing IDs
+"""
+
+import asyncio
+import json
+import threading
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional
+
+CommandRecord = Dict[str, Any]
+
+
+class CommandStore:
+    """Ring buffer of the last ``capacity`` command records
+
+    Every record gets an ``id`` that keeps increasing even after old records
+    are overwritten or the store is cleared, so clients can ask for everything
+    "since id X". Appends and the lookup of X are O(1); a read costs only the
+    records it returns.
+    """
+
+    def __init__(self, capacity: int = 100_000):
+        self.capacity = capacity
+        self._slots: List[Optional[CommandRecord]] = [None] * capacity
+        self._next_id = 1
+        self._first_id = 1  # Oldest id still stored
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self.clears = 0  # Bumped by clear() so live viewers can reset
+        self._listeners: List[Callable[[], None]] = []
+
+    def append(self, record: CommandRecord) -> int:
+        """Store a record and return its new id"""
+        return self.extend([record])[0]
+
+    def extend(self, records: Iterable[CommandRecord]) -> List[int]:
+        """Store several records atomically, their ids are consecutive"""
+        ids = []
+        with self._lock:
+            for record in records:
+                record_id = self._next_id
+                record['id'] = record_id
+                self._slots[(record_id - 1) % self.capacity] = record
+                self._next_id += 1
+                ids.append(record_id)
+            self._first_id = max(self._first_id, self._next_id - self.capacity)
+            self._changed.notify_all()
+        self._notify_listeners()
+        return ids
+
+    def since(self, after_id: int = 0, limit: Optional[int] = None) -> List[CommandRecord]:
+        """Records with an id greater than ``after_id``, oldest first"""
+        with self._lock:
+            start = max(after_id + 1, self._first_id)
+            stop = self._next_id if limit is None else min(self._next_id, start + max(limit, 0))
+            return [self._slots[(record_id - 1) % self.capacity] for record_id in range(start, stop)]
+
+    def page(self, after_id: int = 0, limit: int = 1000) -> Dict[str, Any]:
+        """One cursor page: records after ``after_id`` plus the cursor for the next call
+
+        ``next_since`` is the last returned id; a cursor from before a server
+        restart (newer than anything stored) is pulled back to ``last_id``, and
+        one from before the oldest stored record (evicted or cleared) is moved
+        up to just before it, so ``has_more`` only counts records still stored.
+        """
+        with self._lock:
+            start = max(after_id + 1, self._first_id)
+            stop = min(self._next_id, start + max(limit, 0))
+            records = [self._slots[(record_id - 1) % self.capacity] for record_id in range(start, stop)]
+            first_id, last_id = self._first_id, self._next_id - 1
+        next_since = records[-1]['id'] if records else max(min(after_id, last_id), first_id - 1)
+        return {
+            'commands': records,
+            'total': len(records),
+            'next_since': next_since,
+            'has_more': next_since < last_id,
+        }
+
+    def wait_since(self, after_id: int, timeout: Optional[float] = None,
+                   clears: Optional[int] = None) -> List[CommandRecord]:
+        """Block until records newer than ``after_id`` exist (or a clear), then return them"""
+        with self._changed:
+            self._changed.wait_for(
+                lambda: self._next_id - 1 > after_id or (clears is not None and self.clears != clears),
+                timeout)
+        return self.since(after_id)
+
+    def latest(self, count: int) -> List[CommandRecord]:
+        """The newest ``count`` records, oldest first"""
+        with self._lock:
+            start = max(self._next_id - count, self._first_id)
+            return [self._slots[(record_id - 1) % self.capacity] for record_id in range(start, self._next_id)]
+
+    def get(self, record_id: int) -> Optional[CommandRecord]:
+        with self._lock:
+            if self._first_id <= record_id < self._next_id:
+                return self._slots[(record_id - 1) % self.capacity]
+            return None
+
+    def clear(self):
+        """Drop every record, ids keep counting from where they were"""
+        with self._lock:
+            self._slots = [None] * self.capacity
+            self._first_id = self._next_id
+            self.clears += 1
+            self._changed.notify_all()
+        self._notify_listeners()
+
+    def add_listener(self, callback: Callable[[], None]):
+        """Call ``callback`` (from the writing thread) after every append or clear"""
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback: Callable[[], None]):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def _notify_listeners(self):
+        for callback in list(self._listeners):
+            callback()
+
+    @property
+    def last_id(self) -> int:
+        """Id of the newest record ever stored, 0 if none"""
+        return self._next_id - 1
+
+    @property
+    def first_id(self) -> int:
+        return self._first_id
+
+    def __len__(self):
+        return self._next_id - self._first_id
+
+
+def page_etag(page: Dict[str, Any]) -> str:
+    """ETag for a page from ``CommandStore.page``
+
+    Ids are never reused and stored records are never modified, so the id
+    range and ``has_more`` identify the body without serialising it.
+    """
+    first = page['commands'][0]['id'] if page['commands'] else 0
+    return f'W/"{first}-{page["next_since"]}-{int(page["has_more"])}"'
+
+
+def sse_message(event: str, data: Any, event_id: Optional[int] = None) -> str:
+    """Format one Server-Sent Events message"""
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+def stream_events(store: CommandStore, after_id: int = 0, keepalive: float = 15.0) -> Iterator[str]:
+    """Server-Sent Events for every record newer than ``after_id``, forever
+
+    Each viewer costs one blocked thread and wakes only when a command
+    arrives (or every ``keepalive`` seconds), so server work follows the
+    command rate instead of viewers × page reloads.
+    """
+    after_id = min(after_id, store.last_id)  # Ids from before a server restart
+    clears = store.clears
+    yield "retry: 2000\n\n"
+    while True:
+        records = store.wait_since(after_id, keepalive, clears)
+        if store.clears != clears:
+            clears = store.clears
+            after_id = store.last_id
+            yield sse_message('clear', {'last_id': after_id})
+            continue
+        if not records:
+            yield ": keepalive\n\n"
+            continue
+        for record in records:
+            yield sse_message('command', record, record['id'])
+        after_id = records[-1]['id']
+
+
+async def astream_events(store: CommandStore, after_id: int = 0, keepalive: float = 15.0) -> AsyncIterator[str]:
+    """``stream_events`` for event-loop servers: viewers wait on the loop, not in threads"""
+    loop = asyncio.get_running_loop()
+    changed = asyncio.Event()
+
+    def wake():
+        try:
+            loop.call_soon_threadsafe(changed.set)
+        except RuntimeError:  # Loop already closed
+            pass
+
+    store.add_listener(wake)
+    try:
+        after_id = min(after_id, store.last_id)
+        clears = store.clears
+        yield "retry: 2000\n\n"
+        while True:
+            changed.clear()
+            if store.clears != clears:
+                clears = store.clears
+                after_id = store.last_id
+                yield sse_message('clear', {'last_id': after_id})
+                continue
+            records = store.since(after_id)
+            if records:
+                for record in records:
+                    yield sse_message('command', record, record['id'])
+                after_id = records[-1]['id']
+                continue
+            try:
+                await asyncio.wait_for(changed.wait(), keepalive)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+    finally:
+        store.remove_listener(wake)
@@ -0,0 +1,478 @@
+#!/usr/bin/env python3
+"""
+Console Client for Yamaha RCP
+Persistent asyncio TCP connections to mixing consoles on port 49280,
+pooled so every iOS client shares one connection per console
+"""
+
+import asyncio
+import random
+import socket
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Deque, Dict, Iterable, List, Optional, Tuple
+
+from rcp_protocol import LineFramer, RCPValue, command_lines, parse_line
+
+RCP_PORT = 49280
+
+
+@dataclass
+class RCPReply:
+    """A console reply matched to the request that caused it"""
+    status: str  # OK or OKm
+    request: str
+    line: str
+    value: Optional[RCPValue] = None
+
+
+class RCPError(Exception):
+    """The console answered a request with ERROR"""
+
+    def __init__(self, request: str, line: str):
+        super().__init__(f"{line} (for '{request}')")
+        self.request = request
+        self.line = line
+
+
+class RCPTimeout(TimeoutError):
+    """The console never answered a request, e.g. the line was dropped"""
+
+    def __init__(self, request: str, timeout: float):
+        super().__init__(f"No reply within {timeout:g} s (for '{request}')")
+        self.request = request
+
+
+def request_key(line: str) -> tuple:
+    """Correlation key of a request or echoed reply: (verb, address, x, y) or (verb,)"""
+    message = parse_line(line)
+    if message is not None:
+        return message.verb, message.address, message.x, message.y
+    return (line.split(' ', 1)[0],)
+
+
+class _Pending:
+    """An in-flight request, ``future`` is None for fire-and-forget sends"""
+    __slots__ = ('line', 'key', 'future', 'done', 'deadline')
+
+    def __init__(self, line: str, key: tuple, future: Optional[asyncio.Future], deadline: float = 0.0):
+        self.line = line
+        self.key = key
+        self.future = future
+        self.done = False
+        self.deadline = deadline  # Loop time after which the reply is given up on
+
+
+class ReplayBuffer:
+    """Bounded record of set commands the console has not acknowledged yet
+
+    Entries are keyed by (verb, address, x, y), so several unanswered moves of
+    the same fader collapse into the newest one. When full, the oldest entry
+    is evicted (counted in ``evicted``) rather than growing without limit.
+    """
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self.entries: 'OrderedDict[tuple, _Pending]' = OrderedDict()
+        self.evicted = 0
+
+    def track(self, pending: _Pending):
+        if pending.key[0] != 'set' or not self.max_entries:
+            return
+        self.entries.pop(pending.key, None)
+        self.entries[pending.key] = pending
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evicted += 1
+
+    def acknowledge(self, pending: _Pending):
+        """Forget an answered command unless a newer one replaced it"""
+        if self.entries.get(pending.key) is pending:
+            del self.entries[pending.key]
+
+    def drain(self) -> List[str]:
+        """Return the unacknowledged lines, oldest first, and empty the buffer"""
+        lines = [pending.line for pending in self.entries.values()]
+        self.entries.clear()
+        return lines
+
+    def __len__(self):
+        return len(self.entries)
+
+
+def backoff_delay(attempt: int, base: float = 0.1, maximum: float = 5.0) -> float:
+    """Jittered exponential backoff: between half and all of base * 2**attempt, capped"""
+    delay = min(maximum, base * (2 ** attempt))
+    return delay * random.uniform(0.5, 1.0)
+
+
+class ConsoleConnection:
+    """One persistent TCP connection to a console
+
+    TCP_NODELAY is set so single commands are not held back by Nagle, and the
+    transport's write buffer is capped: sends wait in ``drain()`` once
+    ``write_buffer_limit`` bytes are queued instead of growing forever.
+
+    Requests are pipelined: many get/set lines go out without waiting and each
+    reply is matched back by (verb, address, x, y), oldest first. A reply that
+    carries no address (e.g. a bare ``ERROR``) goes to the oldest request with
+    the same verb. ``NOTIFY`` and unmatched lines go to ``line_handlers``.
+
+    If the link drops, unacknowledged sets stay in a ``ReplayBuffer`` and the
+    connection retries with jittered exponential backoff. Once back, the
+    ``on_reconnect`` hook (e.g. a state resync) picks which of them to replay;
+    without a hook they are all replayed. Sends made meanwhile wait for it.
+
+    A request not answered within ``reply_timeout`` (a line the desk dropped)
+    fails with RCPTimeout and gives its in-flight slot back, so lost lines
+    can never fill the window and block later sends. A reply arriving after
+    that is treated as unmatched.
+    """
+
+    def __init__(self, host: str, port: int = RCP_PORT, write_buffer_limit: int = 64 * 1024,
+                 connect_timeout: float = 2.0, max_in_flight: int = 1024, reconnect: bool = True,
+                 replay_size: int = 4096, reply_timeout: float = 5.0,
+                 on_reconnect: Optional[Callable[['ConsoleConnection', List[str]], Awaitable[List[str]]]] = None):
+        self.host = host
+        self.port = port
+        self.write_buffer_limit = write_buffer_limit
+        self.connect_timeout = connect_timeout
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+        self.line_handlers: List[Callable[[str], None]] = []
+        self.traffic_taps: List[Callable[[bool, str], None]] = []  # (sent, line) for every line, e.g. a recorder
+        self.lines_sent = 0
+        self.lines_received = 0
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0  # Requests sent and not yet answered
+        self._in_flight = asyncio.Semaphore(max_in_flight)
+        self._by_key: Dict[tuple, Deque[_Pending]] = {}
+        self._order: Deque[_Pending] = deque()  # Send order, for replies without a key
+        self._read_task: Optional[asyncio.Task] = None
+        self.reply_timeout = reply_timeout
+        self.timeouts = 0  # Requests given up on without a reply
+        self._sweep_task: Optional[asyncio.Task] = None
+        self._write_lock = asyncio.Lock()
+        self.reconnect = reconnect
+        self.replay = ReplayBuffer(replay_size)
+        self.on_reconnect = on_reconnect
+        self.reconnects = 0
+        self.last_recovery: Optional[float] = None  # Seconds from drop to consistent, last outage
+        self._reconnect_task: Optional[asyncio.Task] = None
+        self._closing = False
+
+    @property
+    def connected(self) -> bool:
+        return self.writer is not None and not self.writer.is_closing()
+
+    @property
+    def reconnecting(self) -> bool:
+        return self._reconnect_task is not None and not self._reconnect_task.done()
+
+    async def connect(self):
+        """Open the TCP connection and start reading replies"""
+        self._closing = False
+        self.reader, self.writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port), self.connect_timeout)
+        sock = self.writer.get_extra_info('socket')
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.writer.transport.set_write_buffer_limits(high=self.write_buffer_limit)
+        self._read_task = asyncio.create_task(self._read_loop())
+        if self._sweep_task is None or self._sweep_task.done():
+            self._sweep_task = asyncio.create_task(self._sweep_expired())
+        print(f"🎛️  Connected to console {self.host}:{self.port}")
+
+    async def send_lines(self, lines: Iterable[str]):
+        """Write RCP lines as one burst without waiting for their replies"""
+        await self._send(list(lines), want_futures=False)
+
+    async def request(self, line: str) -> RCPReply:
+        """Send one line and wait for its reply, raises RCPError on ERROR"""
+        futures = await self._send([line], want_futures=True)
+        return await futures[0]
+
+    async def request_many(self, lines: Iterable[str]) -> List[asyncio.Future]:
+        """Pipeline many lines in one burst, returning one reply future per line"""
+        return await self._send(list(lines), want_futures=True)
+
+    async def _send(self, lines: List[str], want_futures: bool) -> List[asyncio.Future]:
+        if not lines:
+            return []
+        if self._closing:
+            # Sends still in flight during shutdown must not reopen the connection
+            raise ConnectionError(f"Console {self.host}:{self.port} is closed")
+        if self.reconnecting and asyncio.current_task() is not self._reconnect_task:
+            await asyncio.shield(self._reconnect_task)
+        if not self.connected:
+            await self.connect()
+        loop = asyncio.get_running_loop()
+        futures = []
+        async with self._write_lock:
+            chunk = []
+            for line in lines:
+                if self._in_flight.locked():
+                    # Window full: push out what we have before waiting for replies
+                    self._write_chunk(chunk)
+                    chunk = []
+                    await self.writer.drain()
+                await self._in_flight.acquire()
+                self.in_flight += 1
+                future = loop.create_future() if want_futures else None
+                pending = _Pending(line, request_key(line), future, loop.time() + self.reply_timeout)
+                self._by_key.setdefault(pending.key, deque()).append(pending)
+                self._order.append(pending)
+                self.replay.track(pending)
+                chunk.append(line)
+                if future is not None:
+                    futures.append(future)
+            self._write_chunk(chunk)
+            await self.writer.drain()
+        return futures
+
+    def _write_chunk(self, chunk: List[str]):
+        if chunk:
+            self.writer.write("".join(f"{line}\n" for line in chunk).encode('utf-8'))
+            self.lines_sent += len(chunk)
+            for tap in self.traffic_taps:
+                for line in chunk:
+                    tap(True, line)
+
+    async def close(self):
+        """Close the connection and stop the reader"""
+        self._closing = True
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+            self._reconnect_task = None
+        if self._read_task is not None:
+            self._read_task.cancel()
+            self._read_task = None
+        if self._sweep_task is not None:
+            self._sweep_task.cancel()
+            self._sweep_task = None
+        self._fail_pending(ConnectionError(f"Connection to {self.host}:{self.port} closed"))
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+            self.writer = None
+
+    def on_line(self, line: str):
+        """Resolve the matching request, or hand NOTIFY/unmatched lines to handlers"""
+        status, _, rest = line.partition(' ')
+        if status in ('OK', 'OKm', 'ERROR') and self._resolve(status, rest, line):
+            return
+        for handler in self.line_handlers:
+            try:
+                handler(line)
+            except Exception as e:
+                print(f"❌ Console line handler failed: {e}")
+
+    def _resolve(self, status: str, rest: str, line: str) -> bool:
+        """Complete the oldest request matching a reply, False if none matches"""
+        pending = None
+        waiting = self._by_key.get(request_key(rest)) if rest else None
+        if waiting:
+            pending = waiting.popleft()
+        elif status == 'ERROR':
+            # Errors may not echo the address: fall back to oldest with the same verb
+            verb = rest.split(' ', 1)[0]
+            pending = next((p for p in self._order if not p.done and p.key[0] == verb), None)
+            if pending is None:
+                pending = next((p for p in self._order if not p.done), None)
+            if pending is not None:
+                self._by_key[pending.key].remove(pending)
+        if pending is None:
+            return False
+        if not self._by_key.get(pending.key, True):
+            del self._by_key[pending.key]
+
+        pending.done = True
+        while self._order and self._order[0].done:
+            self._order.popleft()
+        self._release()
+        self.replay.acknowledge(pending)
+
+        future = pending.future
+        if future is not None and not future.done():
+            if status == 'ERROR':
+                future.set_exception(RCPError(pending.line, line))
+            else:
+                message = parse_line(rest)
+                future.set_result(RCPReply(status, pending.line, line,
+                                           message.value if message is not None else None))
+        return True
+
+    def _release(self):
+        self.in_flight -= 1
+        self._in_flight.release()
+
+    def _fail_pending(self, error: Exception):
+        """Fail every in-flight request, used when the connection goes away"""
+        for pending in self._order:
+            if not pending.done:
+                pending.done = True
+                self._release()
+                if pending.future is not None and not pending.future.done():
+                    pending.future.set_exception(error)
+        self._order.clear()
+        self._by_key.clear()
+
+    def expire(self, now: float) -> int:
+        """Give up on requests past their deadline, returns how many
+
+        Every request gets the same timeout, so the send-order FIFO is also
+        deadline order and only its expired head needs looking at.
+        """
+        expired = 0
+        while self._order and (self._order[0].done or self._order[0].deadline <= now):
+            pending = self._order.popleft()
+            if pending.done:
+                continue
+            pending.done = True
+            waiting = self._by_key.get(pending.key)
+            if waiting:
+                if waiting[0] is pending:
+                    waiting.popleft()
+                else:
+                    waiting.remove(pending)
+                if not waiting:
+                    del self._by_key[pending.key]
+            self._release()
+            self.replay.acknowledge(pending)
+            if pending.future is not None and not pending.future.done():
+                pending.future.set_exception(RCPTimeout(pending.line, self.reply_timeout))
+            expired += 1
+        self.timeouts += expired
+        return expired
+
+    async def _sweep_expired(self):
+        loop = asyncio.get_running_loop()
+        interval = max(0.01, self.reply_timeout / 4)
+        while True:
+            await asyncio.sleep(interval)
+            if self.expire(loop.time()):
+                print(f"⚠️  Console {self.host}:{self.port}: {self.timeouts} requests unanswered so far")
+
+    async def _read_loop(self):
+        framer = LineFramer(max_line=64 * 1024)
+        try:
+            while True:
+                data = await self.reader.read(64 * 1024)
+                if not data:
+                    break
+                for line in framer.feed_text(data):
+                    self.lines_received += 1
+                    for tap in self.traffic_taps:
+                        tap(False, line)
+                    self.on_line(line)
+        except (ConnectionError, OSError) as e:
+            print(f"⚠️  Console {self.host}:{self.port} read error: {e}")
+        except asyncio.CancelledError:
+            return
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+        unacknowledged = self.replay.drain()
+        self._fail_pending(ConnectionError(f"Console {self.host}:{self.port} disconnected"))
+        print(f"🔌 Console {self.host}:{self.port} disconnected ({len(unacknowledged)} commands unacknowledged)")
+        if self.reconnect and not self._closing:
+            self._reconnect_task = asyncio.create_task(self._reconnect(unacknowledged))
+
+    async def _reconnect(self, unacknowledged: List[str]):
+        """Retry with backoff, resync and replay what is still relevant"""
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        attempt = 0
+        while True:
+            await asyncio.sleep(backoff_delay(attempt))
+            try:
+                await self.connect()
+                break
+            except (OSError, asyncio.TimeoutError) as e:
+                attempt += 1
+                print(f"⚠️  Reconnect to {self.host}:{self.port} failed (attempt {attempt}): {e}")
+
+        replay = unacknowledged
+        if self.on_reconnect is not None:
+            try:
+                replay = await self.on_reconnect(self, unacknowledged)
+            except (ConnectionError, OSError) as e:
+                print(f"❌ Resync with {self.host}:{self.port} failed: {e}")
+        if replay:
+            futures = await self.request_many(replay)
+            await asyncio.gather(*futures, return_exceptions=True)
+        self.reconnects += 1
+        self.last_recovery = loop.time() - started
+        print(f"✅ Console {self.host}:{self.port} back in {self.last_recovery * 1000:.0f} ms, "
+              f"replayed {len(replay)} of {len(unacknowledged)} commands")
+
+
+class ConsolePool:
+    """Shares one ConsoleConnection per (host, port) across all senders"""
+
+    def __init__(self, connection_factory: Callable[..., ConsoleConnection] = ConsoleConnection):
+        self.connection_factory = connection_factory
+        self.connections: Dict[Tuple[str, int], ConsoleConnection] = {}
+        self._connect_locks: Dict[Tuple[str, int], asyncio.Lock] = {}
+
+    async def get(self, host: str, port: int = RCP_PORT) -> ConsoleConnection:
+        """Return the live connection for a console, connecting on first use"""
+        key = (host, port)
+        connection = self.connections.get(key)
+        if connection is not None and (connection.connected or connection.reconnecting):
+            return connection
+        lock = self._connect_locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            connection = self.connections.get(key)
+            if connection is None:
+                connection = self.connection_factory(host, port)
+                self.connections[key] = connection
+            if not connection.connected:
+                await connection.connect()
+        return connection
+
+    async def send(self, host: str, port: int, commands):
+        """Send RCPCommands, bulk commands or raw lines to a console"""
+        connection = await self.get(host, port)
+        await connection.send_lines(command_lines(commands))
+
+    async def request(self, host: str, port: int, commands) -> List[asyncio.Future]:
+        """Pipeline commands to a console and return one reply future per line"""
+        connection = await self.get(host, port)
+        return await connection.request_many(command_lines(commands))
+
+    async def close_all(self):
+        for connection in list(self.connections.values()):
+            await connection.close()
+        self.connections.clear()
+
+
+class ConsoleLoopThread:
+    """Runs a ConsolePool on a background event loop for thread-based receivers"""
+
+    def __init__(self, pool: Optional[ConsolePool] = None):
+        self.loop = asyncio.new_event_loop()
+        self.pool = pool or ConsolePool()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="console-loop", daemon=True)
+        self.thread.start()
+
+    def submit(self, coroutine) -> Future:
+        """Schedule a coroutine on the console loop from any thread"""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def send(self, host: str, port: int, commands) -> Future:
+        return self.submit(self.pool.send(host, port, commands))
+
+    def stop(self):
+        """Close every connection and stop the loop thread"""
+        try:
+            self.submit(self.pool.close_all()).result(timeout=2.0)
+        except Exception:
+            pass
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=2.0)
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Multi-Console Router
+Maps channel, mix and DCA namespaces to target consoles (e.g. a CL at FOH and
+a TF for monitors) and fans each command out to all of them concurrently
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from console_client import ConsolePool, RCPError, RCP_PORT
+from console_state import DEFAULT_CATALOG, AddressTable
+from rcp_protocol import command_lines, parse_line
+
+SCENE_NAMESPACE = 'Scene'
+ALL_NAMESPACES = '*'
+
+
+def namespace_of(line: str) -> str:
+    """Namespace of an RCP line: 'InCh', 'Mix', 'DCA', ... or 'Scene' for recalls"""
+    if line.startswith('ssrecall_ex'):
+        return SCENE_NAMESPACE
+    message = parse_line(line)
+    if message is None:
+        return ''
+    path = message.address.split(':', 1)[-1].split('/')
+    return path[1] if len(path) > 1 and path[0] == 'Current' else path[0]
+
+
+@dataclass
+class ConsoleTarget:
+    """A console the router can address, with its own model-specific catalog"""
+    name: str
+    host: str
+    port: int = RCP_PORT
+    namespaces: Tuple[str, ...] = (ALL_NAMESPACES,)
+    table: Optional[AddressTable] = None
+
+    def handles(self, namespace: str) -> bool:
+        return ALL_NAMESPACES in self.namespaces or namespace in self.namespaces
+
+    def accepts(self, line: str) -> bool:
+        """False if the address or index does not exist on this console model"""
+        if self.table is None:
+            return True
+        message = parse_line(line)
+        if message is None:
+            return True
+        info = self.table.get(message.address)
+        if info is None or not info.supported:
+            return False
+        try:
+            info.slot(message.x, message.y)
+        except IndexError:
+            return False
+        return True
+
+
+@dataclass
+class ConsoleAck:
+    """Acknowledgements from one console for one routed batch"""
+    console: str
+    sent: int = 0
+    ok: int = 0
+    errors: List[str] = field(default_factory=list)
+    skipped: List[str] = field(default_factory=list)
+    elapsed: float = 0.0
+    failure: Optional[str] = None  # Connection problem or timeout
+
+    @property
+    def complete(self) -> bool:
+        return self.failure is None and self.ok == self.sent
+
+
+@dataclass
+class RouteResult:
+    """Per-console outcome of one routed batch"""
+    acks: Dict[str, ConsoleAck] = field(default_factory=dict)
+    unrouted: List[str] = field(default_factory=list)
+
+    @property
+    def complete(self) -> bool:
+        return not self.unrouted and all(ack.complete for ack in self.acks.values())
+
+
+class ConsoleRouter:
+    """Fans RCP commands out to the consoles that own their namespace
+
+    Every console has its own pooled connection and its own task, so a slow
+    or unreachable desk only delays its own acknowledgement; ``timeout``
+    bounds how long ``dispatch`` waits for any single console.
+    """
+
+    def __init__(self, targets: Iterable[ConsoleTarget], pool: Optional[ConsolePool] = None,
+                 timeout: float = 1.0):
+        self.targets: Dict[str, ConsoleTarget] = {target.name: target for target in targets}
+        self.pool = pool or ConsolePool()
+        self.timeout = timeout
+
+    def route(self, commands) -> Tuple[Dict[str, List[str]], Dict[str, List[str]], List[str]]:
+        """Split commands per console: (lines, skipped lines, unrouted lines)"""
+        lines_by_console: Dict[str, List[str]] = {name: [] for name in self.targets}
+        skipped: Dict[str, List[str]] = {name: [] for name in self.targets}
+        unrouted = []
+        for line in command_lines(commands):
+            namespace = namespace_of(line)
+            routed = False
+            for target in self.targets.values():
+                if not target.handles(namespace):
+                    continue
+                routed = True
+                if target.accepts(line):
+                    lines_by_console[target.name].append(line)
+                else:
+                    skipped[target.name].append(line)
+            if not routed:
+                unrouted.append(line)
+        return lines_by_console, skipped, unrouted
+
+    async def dispatch(self, commands) -> RouteResult:
+        """Send to every owning console concurrently and collect their acknowledgements"""
+        lines_by_console, skipped, unrouted = self.route(commands)
+        result = RouteResult(unrouted=unrouted)
+        jobs = []
+        for name, lines in lines_by_console.items():
+            if lines or skipped[name]:
+                ack = ConsoleAck(name, sent=len(lines), skipped=skipped[name])
+                result.acks[name] = ack
+                if lines:
+                    jobs.append(self._dispatch_one(self.targets[name], lines, ack))
+        await asyncio.gather(*jobs)
+        return result
+
+    def send(self, commands):
+        """Fire-and-forget fan-out, one independent task per console"""
+        lines_by_console, _, unrouted = self.route(commands)
+        for line in unrouted:
+            print(f"⚠️  No console routed for: {line}")
+        for name, lines in lines_by_console.items():
+            if lines:
+                target = self.targets[name]
+                task = asyncio.ensure_future(self.pool.send(target.host, target.port, lines))
+                task.add_done_callback(lambda t, name=name: self._report_send_error(name, t))
+
+    async def close(self):
+        await self.pool.close_all()
+
+    async def _dispatch_one(self, target: ConsoleTarget, lines: List[str], ack: ConsoleAck):
+        start = time.perf_counter()
+        try:
+            futures = await asyncio.wait_for(
+                self.pool.request(target.host, target.port, lines), self.timeout)
+            done, pending = await asyncio.wait(futures, timeout=self.timeout)
+            for future in pending:
+                future.cancel()
+            for future in done:
+                error = future.exception()
+                if error is None:
+                    ack.ok += 1
+                elif isinstance(error, RCPError):
+                    ack.errors.append(error.line)
+                else:
+                    ack.failure = str(error)
+            if pending:
+                ack.failure = f"{len(pending)} replies timed out"
+        except (OSError, asyncio.TimeoutError) as e:
+            ack.failure = str(e) or type(e).__name__
+        ack.elapsed = time.perf_counter() - start
+
+    def _report_send_error(self, name: str, task: asyncio.Future):
+        if not task.cancelled() and task.exception() is not None:
+            print(f"❌ Failed to send to console '{name}': {task.exception()}")
+
+
+def parse_route(spec: str) -> ConsoleTarget:
+    """Parse 'name=host[:port][/InCh,Mix,DCA][@catalog.csv]' into a ConsoleTarget
+
+    The catalog is that desk model's prminfo CSV (see console_state.py), the
+    default catalog when it is left out.
+    """
+    name, _, rest = spec.partition('=')
+    rest, _, catalog = rest.partition('@')
+    if not name or not rest:
+        raise ValueError(f"Route '{spec}' is not name=host[:port][/namespaces][@catalog]")
+    address, _, namespaces = rest.partition('/')
+    host, _, port = address.partition(':')
+    try:
+        table = load_table(catalog or DEFAULT_CATALOG)
+    except OSError as e:
+        raise ValueError(f"Route '{name}': cannot read catalog {catalog}: {e.strerror}")
+    return ConsoleTarget(
+        name=name,
+        host=host,
+        port=int(port) if port else RCP_PORT,
+        namespaces=tuple(namespaces.split(',')) if namespaces else (ALL_NAMESPACES,),
+        table=table,
+    )
+
+
+@lru_cache(maxsize=None)
+def load_table(path) -> AddressTable:
+    """Catalog for a route, loaded once however many desks share the model"""
+    return AddressTable.load(path)
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Yamaha Console Simulator
+Speaks RCP over TCP like a TF/CL desk so senders, the state mirror and the
+receivers can be load and latency tested without hardware
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+from typing import Dict, List, Optional
+
+from console_state import AddressTable, ConsoleStateMirror, DEFAULT_CATALOG
+from rcp_protocol import LineFramer, format_value, parse_line, tokenize
+
+RCP_PORT = 49280
+SCENE_COUNT = 100
+
+
+class SimulatedClient:
+    """Per-connection writer that keeps replies in order under jitter"""
+
+    def __init__(self, writer: asyncio.StreamWriter):
+        self.writer = writer
+        self.last_delivery = 0.0
+        self.peer = writer.get_extra_info('peername')
+
+    def deliver(self, loop: asyncio.AbstractEventLoop, at: float, line: str):
+        """Write ``line`` no earlier than ``at`` and never before an earlier reply"""
+        at = max(at, self.last_delivery)
+        self.last_delivery = at
+        if at <= loop.time():
+            self._write(line)
+        else:
+            loop.call_at(at, self._write, line)
+
+    def _write(self, line: str):
+        if not self.writer.is_closing():
+            self.writer.write(f"{line}\n".encode('utf-8'))
+
+
+class ConsoleSimulator:
+    """RCP console stand-in with full parameter state
+
+    Answers get/set/ssrecall_ex with OK/OKm/ERROR lines, sends NOTIFY to every
+    other connection on changes, and can add latency, jitter, silent command
+    drops and a maximum processing rate (commands/second) like a busy desk.
+    """
+
+    def __init__(self, table: Optional[AddressTable] = None, latency: float = 0.0,
+                 jitter: float = 0.0, drop_rate: float = 0.0, max_rate: Optional[float] = None,
+                 seed: Optional[int] = None):
+        self.mirror = ConsoleStateMirror(table)
+        self.latency = latency
+        self.jitter = jitter
+        self.drop_rate = drop_rate
+        self.max_rate = max_rate
+        self.random = random.Random(seed)
+        self.clients: Dict[asyncio.StreamWriter, SimulatedClient] = {}
+        self.scenes: Dict[str, List[str]] = {}  # Stored scene name -> set lines
+        self.current_scene: Optional[str] = None
+        self.server: Optional[asyncio.AbstractServer] = None
+        self.commands = 0
+        self.dropped = 0
+        self.notifies = 0
+        self._next_slot = 0.0
+
+    async def start(self, host: str = '0.0.0.0', port: int = RCP_PORT) -> int:
+        """Start listening, returns the bound port (useful with port 0)"""
+        self.server = await asyncio.start_server(self.handle_client, host, port)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            for writer in list(self.clients):
+                writer.close()
+            await self.server.wait_closed()
+            self.server = None
+
+    def disconnect_all(self):
+        """Drop every client connection but keep listening, like a network glitch"""
+        for writer in list(self.clients):
+            transport = writer.transport
+            transport.abort()
+
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        client = SimulatedClient(writer)
+        self.clients[writer] = client
+        framer = LineFramer()
+        try:
+            while True:
+                data = await reader.read(64 * 1024)
+                if not data:
+                    break
+                for line in framer.feed_text(data):
+                    self.receive(client, line)
+        except ConnectionError:
+            pass
+        finally:
+            self.clients.pop(writer, None)
+            writer.close()
+
+    def receive(self, client: SimulatedClient, line: str):
+        """Queue one command for processing, honouring drops and the rate limit"""
+        self.commands += 1
+        if self.drop_rate and self.random.random() < self.drop_rate:
+            self.dropped += 1
+            return
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        if self.max_rate:
+            self._next_slot = max(now, self._next_slot) + 1.0 / self.max_rate
+            loop.call_at(self._next_slot, self.process, client, line)
+        else:
+            self.process(client, line)
+
+    def process(self, client: SimulatedClient, line: str):
+        """Apply a command and schedule its reply and NOTIFYs"""
+        if client.writer.is_closing():
+            return  # Still queued when the connection dropped: lost like on a real desk
+        reply, notify = self.execute(line)
+        loop = asyncio.get_running_loop()
+        at = loop.time() + self.latency
+        if self.jitter:
+            at += self.random.uniform(0.0, self.jitter)
+        client.deliver(loop, at, reply)
+        if notify:
+            for other in list(self.clients.values()):
+                if other is not client:
+                    self.notifies += 1
+                    other.deliver(loop, at, notify)
+
+    def execute(self, line: str):
+        """Run one RCP command against the state, returns (reply, notify or None)"""
+        verb = line.split(' ', 1)[0]
+        if verb == 'ssrecall_ex':
+            return self.recall_scene(line)
+
+        message = parse_line(line)
+        if message is None or message.status is not None:
+            return f"ERROR {verb} WrongFormat" if verb in ('get', 'set') else "ERROR unknowncommand", None
+        info = self.mirror.table.get(message.address)
+        if info is None or not info.supported:
+            return f"ERROR {verb} UnknownAddress", None
+        current = self.mirror.get(message.address, message.x, message.y)
+        if current is None:
+            return f"ERROR {verb} InvalidArgument", None
+        echo = f"{message.address} {message.x} {message.y}"
+
+        if message.verb == 'get':
+            return f"OK get {echo} {format_value(current)}", None
+
+        if message.value is None:
+            return "ERROR set WrongFormat", None
+        if not info.writable:
+            return "ERROR set ReadOnly", None
+        if info.is_integer and not isinstance(message.value, int):
+            return "ERROR set InvalidArgument", None
+        self.mirror.set(message.address, message.x, message.y, message.value)
+        stored = self.mirror.get(message.address, message.x, message.y)
+        status = "OK" if stored == message.value else "OKm"
+        changed = f"set {echo} {format_value(stored)}"
+        return f"{status} {changed}", (f"NOTIFY {changed}" if stored != current else None)
+
+    def recall_scene(self, line: str):
+        tokens = tokenize(line)
+        if len(tokens) < 2 or not str(tokens[1]).startswith('scene_'):
+            return "ERROR ssrecall_ex WrongFormat", None
+        scene = tokens[1]
+        suffix = scene[len('scene_'):]
+        if not suffix.isdigit() or not 0 <= int(suffix) <= SCENE_COUNT:
+            return "ERROR ssrecall_ex InvalidArgument", None
+        for stored in self.scenes.get(scene, []):
+            self.mirror.apply_line(stored)
+        self.current_scene = scene
+        return f"OK ssrecall_ex {scene}", f"NOTIFY ssrecall_ex {scene}"
+
+    def store_scene(self, name: str, lines: List[str]):
+        """Define the set lines a later ``ssrecall_ex <name>`` applies"""
+        self.scenes[name] = list(lines)
+
+
+async def run_simulator(args):
+    table = AddressTable.load(args.catalog)
+    simulator = ConsoleSimulator(
+        table,
+        latency=args.latency_ms / 1000.0,
+        jitter=args.jitter_ms / 1000.0,
+        drop_rate=args.drop,
+        max_rate=args.max_rate,
+        seed=args.seed,
+    )
+    port = await simulator.start(args.host, args.port)
+    print(f"🎛️  Yamaha console simulator listening on {args.host}:{port}")
+    print(f"📋 {len(table)} addresses, {sum(info.size for info in table)} parameters")
+    print(f"⏱️  Latency {args.latency_ms} ms ± {args.jitter_ms} ms, drop {args.drop:.1%}, "
+          f"max rate {args.max_rate or 'unlimited'} cmd/s")
+    print("🔄 Waiting for connections...\n")
+    started = time.monotonic()
+    try:
+        while True:
+            await asyncio.sleep(10)
+            elapsed = time.monotonic() - started
+            print(f"📊 {simulator.commands} commands ({simulator.commands / elapsed:.0f}/s), "
+                  f"{simulator.dropped} dropped, {simulator.notifies} notifies, "
+                  f"{len(simulator.clients)} clients")
+    finally:
+        await simulator.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Yamaha RCP console simulator for load and latency testing')
+    parser.add_argument('--port', type=int, default=RCP_PORT, help='Port to listen on (default: 49280)')
+    parser.add_argument('--host', default='0.0.0.0', help='Host to bind to (default: 0.0.0.0)')
+    parser.add_argument('--catalog', default=str(DEFAULT_CATALOG), help='Address catalog CSV (default: research/commands.csv)')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='Fixed reply latency in ms')
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help='Random extra latency up to this many ms')
+    parser.add_argument('--drop', type=float, default=0.0, help='Fraction of commands silently dropped (0-1)')
+    parser.add_argument('--max-rate', type=float, default=None, help='Maximum commands processed per second')
+    parser.add_argument('--seed', type=int, default=None, help='Random seed for reproducible runs')
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(run_simulator(args))
+    except KeyboardInterrupt:
+        print("\n🛑 Simulator stopped.")
+    except OSError as e:
+        print(f"❌ Failed to start simulator: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
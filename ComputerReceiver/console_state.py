@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Console State Mirror for Yamaha RCP consoles
+Keeps a local copy of every mixer parameter, built from the address catalog
+in docs/yamaha-rcp/.../research/commands.csv
+"""
+
+import csv
+from array import array
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+from rcp_protocol import RCPValue, parse_line
+
+DEFAULT_CATALOG = (Path(__file__).resolve().parent.parent / 'docs' / 'yamaha-rcp' /
+                   'official-docs' / 'yamaha-rcp-docs' / 'research' / 'commands.csv')
+
+
+@dataclass
+class AddressInfo:
+    """One parameter address from the RCP catalog"""
+    address_id: int
+    address: str
+    x_count: int
+    y_count: int
+    minimum: int
+    maximum: int
+    default: RCPValue
+    unit: str
+    value_type: str  # integer, string or binary
+    writable: bool
+    supported: bool  # False for rows the TF answered with '--'
+    scale: int = 1
+
+    @property
+    def size(self) -> int:
+        """Number of (x, y) slots, a count of 0 in the catalog means 1"""
+        return max(self.x_count, 1) * max(self.y_count, 1)
+
+    @property
+    def is_integer(self) -> bool:
+        return self.value_type == 'integer'
+
+    def slot(self, x: int, y: int) -> int:
+        """Flat index for (x, y), raises IndexError when out of range"""
+        if not (0 <= x < max(self.x_count, 1) and 0 <= y < max(self.y_count, 1)):
+            raise IndexError(f"{self.address} has no index {x} {y}")
+        return x * max(self.y_count, 1) + y
+
+    def clamp(self, value: int) -> int:
+        """Clamp an integer value to the parameter range"""
+        return max(self.minimum, min(self.maximum, value))
+
+
+class AddressTable:
+    """Parameter catalog indexed by address string and numeric id"""
+
+    def __init__(self, entries: List[AddressInfo]):
+        self.entries = entries
+        self.by_address: Dict[str, AddressInfo] = {e.address: e for e in entries}
+        self.by_id: Dict[int, AddressInfo] = {e.address_id: e for e in entries}
+
+    @classmethod
+    def load(cls, path: Union[str, Path] = DEFAULT_CATALOG) -> 'AddressTable':
+        """Load a prminfo catalog CSV (Ok,Command,Index,Address,X,Y,Min,Max,...)"""
+        entries = []
+        with open(path, newline='') as f:
+            for row in csv.DictReader(f):
+                if row['Command'] != 'prminfo':
+                    continue
+                value_type = row['Type']
+                default = row['Default']
+                entries.append(AddressInfo(
+                    address_id=int(row['Index']),
+                    address=row['Address'],
+                    x_count=int(row['X']),
+                    y_count=int(row['Y']),
+                    minimum=int(row['Min']),
+                    maximum=int(row['Max']),
+                    default=int(default) if value_type == 'integer' else default,
+                    unit=row['Unit'],
+                    value_type=value_type,
+                    writable='w' in row['RW'],
+                    supported=row['Ok'] == 'OK',
+                    scale=int(row['Scale'] or 1),
+                ))
+        return cls(entries)
+
+    def get(self, address: str) -> Optional[AddressInfo]:
+        return self.by_address.get(address)
+
+    def __contains__(self, address: str) -> bool:
+        return address in self.by_address
+
+    def __iter__(self) -> Iterator[AddressInfo]:
+        return iter(self.entries)
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class ConsoleStateMirror:
+    """Local copy of console parameter values
+
+    Integer parameters live in one ``array('i')`` per address (4 bytes per
+    slot, ~5k slots for a TF); string and binary parameters use plain lists.
+    Until a slot has been set (by a sync, a NOTIFY or a command we sent) it
+    holds the catalog default, which says nothing about the desk; ``known``
+    tells the two apart.
+    """
+
+    def __init__(self, table: Optional[AddressTable] = None):
+        self.table = table or AddressTable.load()
+        self.values: Dict[str, Union[array, List[str]]] = {}
+        self.seen: Dict[str, bytearray] = {}  # 1 per slot whose value came from the desk or from us
+        self.version = 0  # Bumped on every change, cheap staleness check
+        self.reset()
+
+    def reset(self):
+        """Return every parameter to its catalog default"""
+        for info in self.table:
+            if info.is_integer:
+                self.values[info.address] = array('i', [int(info.default)]) * info.size
+            else:
+                self.values[info.address] = [str(info.default)] * info.size
+            self.seen[info.address] = bytearray(info.size)
+        self.version += 1
+
+    def get(self, address: str, x: int, y: int) -> Optional[RCPValue]:
+        """Current value, or None for an unknown address or index"""
+        info = self.table.get(address)
+        if info is None:
+            return None
+        try:
+            return self.values[address][info.slot(x, y)]
+        except IndexError:
+            return None
+
+    def known(self, address: str, x: int, y: int) -> bool:
+        """Whether a slot holds an observed value rather than the catalog default"""
+        info = self.table.get(address)
+        if info is None:
+            return False
+        try:
+            return bool(self.seen[address][info.slot(x, y)])
+        except IndexError:
+            return False
+
+    def set(self, address: str, x: int, y: int, value: RCPValue) -> Optional[RCPValue]:
+        """Store a value and return the previous one, None if the address is unknown"""
+        info = self.table.get(address)
+        if info is None:
+            return None
+        try:
+            slot = info.slot(x, y)
+        except IndexError:
+            return None
+        values = self.values[address]
+        previous = values[slot]
+        self.seen[address][slot] = 1
+        if info.is_integer:
+            if not isinstance(value, int):
+                value = int(value)
+            value = info.clamp(value)
+        else:
+            value = str(value)
+        if previous != value:
+            values[slot] = value
+            self.version += 1
+        return previous
+
+    def apply_line(self, line: str) -> bool:
+        """Apply a set, OK get/set or NOTIFY line, returns True if it carried a value"""
+        message = parse_line(line)
+        if message is None or message.value is None or message.status == 'ERROR':
+            return False
+        return self.set(message.address, message.x, message.y, message.value) is not None
+
+    def items(self, address: str) -> Iterator[Tuple[int, int, RCPValue]]:
+        """Yield (x, y, value) for every slot of an address"""
+        info = self.table.get(address)
+        if info is None:
+            return
+        y_count = max(info.y_count, 1)
+        for slot, value in enumerate(self.values[address]):
+            yield slot // y_count, slot % y_count, value
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Console State Sync
+Warms the state mirror on connect by pipelining a get for every parameter
+in the address table and applying the replies as they stream in
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from console_client import ConsoleConnection
+from console_state import AddressTable, ConsoleStateMirror
+from rcp_protocol import format_get, parse_line
+
+
+@dataclass
+class SyncReport:
+    """Outcome of one bulk state dump"""
+    requested: int
+    applied: int
+    errors: int
+    elapsed: float
+
+    @property
+    def complete(self) -> bool:
+        return self.applied == self.requested
+
+
+def dump_requests(table: AddressTable, prefixes: Optional[Tuple[str, ...]] = None) -> Iterator[str]:
+    """Yield a get line for every slot of every supported address
+
+    ``prefixes`` limits the dump, e.g. ('MIXER:Current/InCh/',) for channels only.
+    """
+    for info in table:
+        if not info.supported or (prefixes and not info.address.startswith(prefixes)):
+            continue
+        for x in range(max(info.x_count, 1)):
+            for y in range(max(info.y_count, 1)):
+                yield format_get(info.address, x, y)
+
+
+async def sync_mirror(connection: ConsoleConnection, mirror: ConsoleStateMirror, window: int = 256,
+                      prefixes: Optional[Tuple[str, ...]] = None,
+                      progress: Optional[Callable[[int, int], None]] = None) -> SyncReport:
+    """Fill ``mirror`` from the console, keeping at most ``window`` gets in flight"""
+    lines = list(dump_requests(mirror.table, prefixes))
+    total = len(lines)
+    applied = errors = done = 0
+    step = max((total + 9) // 10, 1)
+    in_flight = set()
+    start = time.perf_counter()
+
+    def on_reply(future: asyncio.Future):
+        nonlocal applied, errors, done
+        done += 1
+        if future.cancelled() or future.exception() is not None:
+            errors += 1
+        elif mirror.apply_line(future.result().line):
+            applied += 1
+        if progress is not None and (done % step == 0 or done == total):
+            progress(done, total)
+
+    burst = max(window // 4, 1)
+    for offset in range(0, total, burst):
+        while len(in_flight) >= window:
+            _, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+        for future in await connection.request_many(lines[offset:offset + burst]):
+            future.add_done_callback(on_reply)
+            in_flight.add(future)
+    if in_flight:
+        await asyncio.wait(in_flight)
+
+    return SyncReport(total, applied, errors, time.perf_counter() - start)
+
+
+def print_progress(done: int, total: int):
+    print(f"  🔄 Sync {done}/{total} ({done * 100 // total}%)")
+
+
+async def warm_up(connection: ConsoleConnection, mirror: ConsoleStateMirror, window: int = 256) -> SyncReport:
+    """Dump the whole console into the mirror and print how it went"""
+    print(f"📥 Syncing console state from {connection.host}:{connection.port}...")
+    report = await sync_mirror(connection, mirror, window, progress=print_progress)
+    icon = "✅" if report.complete else "⚠️ "
+    print(f"{icon} Synced {report.applied}/{report.requested} parameters in "
+          f"{report.elapsed * 1000:.0f} ms ({report.errors} errors)")
+    return report
+
+
+def still_relevant(mirror: ConsoleStateMirror, line: str) -> bool:
+    """True if a set line would still change the freshly synced console state"""
+    message = parse_line(line)
+    if message is None or message.verb != 'set' or message.value is None:
+        return False
+    current = mirror.get(message.address, message.x, message.y)
+    return current is not None and current != message.value
+
+
+def resync_handler(mirror: ConsoleStateMirror, window: int = 256):
+    """Build an ``on_reconnect`` hook: full resync, then only the lost commands still needed"""
+
+    async def resync(connection: ConsoleConnection, unacknowledged: List[str]) -> List[str]:
+        await warm_up(connection, mirror, window)
+        return [line for line in unacknowledged if still_relevant(mirror, line)]
+
+    return resync
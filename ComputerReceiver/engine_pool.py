@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Voice Command Engine Worker Pool
+Runs VoiceCommandEngine in worker processes so slow parses never stall a
+receiver's event loop; label state is shared across the workers
+"""
+
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from command_scheduler import CommandScheduler
+from rcp_protocol import command_lines
+from undo_journal import UndoJournal
+from voice_command_engine import VoiceCommandEngine
+
+# Parsed once per worker at start-up so the first real command does not pay
+# for building the engine and compiling its patterns
+WARM_UP_COMMANDS = (
+    "set channel 1 to unity", "mute channel 2", "pan channel 3 left", "send channel 4 to mix 1",
+    "recall scene 1", "set dca 1 to minus 6 db", "mute channels 1 to 8",
+)
+
+LabelState = Dict[str, dict]
+
+_engine: Optional[VoiceCommandEngine] = None
+_labels_version = 0
+
+
+@dataclass
+class EngineResult:
+    """RCP lines and descriptions for one utterance"""
+    text: str
+    lines: List[str] = field(default_factory=list)
+    descriptions: List[str] = field(default_factory=list)
+    confidence: float = 0.0
+    elapsed: float = 0.0  # Seconds spent parsing in the worker
+
+
+def label_state(engine: VoiceCommandEngine) -> LabelState:
+    return {
+        'channel_labels': dict(engine.channel_labels),
+        'dca_labels': dict(engine.dca_labels),
+        'label_by_channel': dict(engine.label_by_channel),
+    }
+
+
+def apply_label_state(engine: VoiceCommandEngine, state: LabelState):
+    """Replace an engine's labels, rebuilding its word index"""
+    engine.channel_labels = dict(state['channel_labels'])
+    engine.dca_labels = dict(state['dca_labels'])
+    engine.label_by_channel = {}
+    engine.label_index = {}
+    for channel_num, label in state['label_by_channel'].items():
+        engine.index_channel_label(channel_num, label)
+
+
+def engine_result(text: str, results: list, elapsed: float) -> EngineResult:
+    return EngineResult(
+        text=text,
+        lines=list(command_lines(results)),
+        descriptions=[r.description for r in results],
+        confidence=max((r.confidence for r in results), default=0.0),
+        elapsed=elapsed,
+    )
+
+
+def label_changes(before: LabelState, after: LabelState) -> LabelState:
+    """Entries each label table gained or changed (new value) or lost (None)"""
+    return {
+        name: {key: after[name].get(key) for key in before[name].keys() | after[name].keys()
+               if before[name].get(key) != after[name].get(key)}
+        for name in after
+    }
+
+
+def merge_label_changes(state: LabelState, changes: LabelState) -> LabelState:
+    merged = {name: dict(table) for name, table in state.items()}
+    for name, table in changes.items():
+        for key, value in table.items():
+            if value is None:
+                merged[name].pop(key, None)
+            else:
+                merged[name][key] = value
+    return merged
+
+
+def warm_engine():
+    """Worker initializer: build the engine and run it once"""
+    global _engine, _labels_version
+    _engine = VoiceCommandEngine()
+    for command in WARM_UP_COMMANDS:
+        _engine.translate_command(command)
+    _labels_version = 0
+
+
+def translate(text: str, version: int, state: Optional[LabelState]) -> Tuple[EngineResult, Optional[LabelState]]:
+    """Run in a worker: sync labels if they changed, parse, and return the label changes it made"""
+    global _labels_version
+    if _engine is None:
+        warm_engine()
+    if version != _labels_version and state is not None:
+        apply_label_state(_engine, state)
+        _labels_version = version
+    before = label_state(_engine)
+    start = time.perf_counter()
+    results = _engine.process_command(text)
+    result = engine_result(text, results, time.perf_counter() - start)
+    after = label_state(_engine)
+    return result, label_changes(before, after) if after != before else None
+
+
+def _ready() -> int:
+    return os.getpid()
+
+
+class EnginePool:
+    """Pool of warm VoiceCommandEngines in worker processes
+
+    The pool keeps the authoritative label state. Each task carries the
+    current label version (and the labels, a few KB at most) so a worker
+    that is behind catches up before parsing; a task that renames a channel
+    or DCA returns only what it changed, merged into the pool's labels, so
+    renames parsed at the same time in different workers all survive. With
+    ``workers=0`` commands are parsed inline, for tests and tiny setups.
+
+    A ``scheduler`` and an undo ``journal`` stay in the receiver process:
+    schedule control ("fire cue 5") and undo/redo are handled here, for "in
+    10 seconds recall scene 4" only the deferred part is parsed in a worker
+    before its lines are scheduled, and the lines workers return are
+    journalled here in the order their results arrive.
+    """
+
+    def __init__(self, workers: Optional[int] = None, scheduler: Optional[CommandScheduler] = None,
+                 journal: Optional[UndoJournal] = None):
+        self.workers = min(4, os.cpu_count() or 1) if workers is None else workers
+        self.executor = None
+        if self.workers > 0:
+            # spawn: receivers already run threads (console loop, logger), which fork does not survive
+            self.executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'),
+                                                initializer=warm_engine)
+        self.version = 0
+        self.labels: LabelState = {'channel_labels': {}, 'dca_labels': {}, 'label_by_channel': {}}
+        self.parsed = 0
+        self.parse_time = 0.0
+        self.journal = journal
+        self.control = None
+        if scheduler is not None or journal is not None:
+            self.control = VoiceCommandEngine(scheduler=scheduler, journal=journal)
+
+    async def start(self):
+        """Start and warm every worker now instead of on the first commands"""
+        if self.executor is not None:
+            loop = asyncio.get_running_loop()
+            await asyncio.gather(*(loop.run_in_executor(self.executor, _ready) for _ in range(self.workers)))
+
+    async def translate(self, text: str) -> EngineResult:
+        """Parse one utterance in a worker; awaiting it keeps the caller's loop free"""
+        if self.control is not None:
+            start = time.perf_counter()
+            results = self.control.process_undo_redo(text)
+            if results is None:
+                results = self.control.process_schedule_control(text)
+            if results is not None:
+                return engine_result(text, results, time.perf_counter() - start)
+            spec = self.control.parse_schedule(text)
+            if spec is not None and spec.unreadable is not None:
+                return engine_result(text, self.control.schedule_batch(spec, [], spec.command), time.perf_counter() - start)
+            if spec is not None:
+                deferred = await self.parse(spec.command)
+                if not deferred.lines:
+                    return EngineResult(text, elapsed=deferred.elapsed)
+                results = self.control.schedule_batch(spec, deferred.lines, "; ".join(deferred.descriptions))
+                return engine_result(text, results, deferred.elapsed)
+        result = await self.parse(text)
+        if self.journal is not None and result.lines:
+            self.journal.record(result.lines, "; ".join(result.descriptions))
+        return result
+
+    async def parse(self, text: str) -> EngineResult:
+        """Parse one utterance in a worker, without the scheduling done in ``translate``"""
+        version, labels = self.version, self.labels
+        if self.executor is None:
+            result, changes = translate(text, version, labels)
+        else:
+            loop = asyncio.get_running_loop()
+            result, changes = await loop.run_in_executor(self.executor, translate, text, version, labels)
+        if changes is not None:
+            # Merge into the labels as they are now, not as they were when this task was sent
+            self.labels = merge_label_changes(self.labels, changes)
+            self.version += 1
+        self.parsed += 1
+        self.parse_time += result.elapsed
+        return result
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
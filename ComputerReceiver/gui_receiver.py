@@ -11,6 +11,15 @@ import json
 import threading
 from datetime import datetime
 import queue
+from log_history import LogHistory
+from rcp_protocol import LineFramer
+
+TICK_MS = 100              # Queued log lines are inserted once per tick
+MAX_VISIBLE_LINES = 2000   # Lines kept in the log widget
+TRIM_SLACK = 200           # Lines over the cap before the oldest are deleted in one go
+HISTORY_LINES = 20_000     # Lines kept in memory for the filter view
+FILTER_DELAY_MS = 200      # Typing pause before the filter is applied
+LEVELS = ["All", "VOICE", "RCP", "CONNECT", "ERROR", "INFO"]
 
 class VoiceControlGUI:
     def __init__(self, root):
@@ -23,6 +32,8 @@ class VoiceControlGUI:
         self.is_running = False
         self.clients = []
         self.message_queue = queue.Queue()
+        self.history = LogHistory(HISTORY_LINES)
+        self.filter_job = None
         
         # Setup GUI
         self.setup_gui()
@@ -75,6 +86,18 @@ class VoiceControlGUI:
         log_frame = ttk.LabelFrame(main_frame, text="Messages & RCP Commands", padding="10")
         log_frame.grid(row=3, column=0, columnspan=2, sticky=(tk.W, tk.E, tk.N, tk.S))
         
+        filter_frame = ttk.Frame(log_frame)
+        filter_frame.pack(fill=tk.X, pady=(0, 5))
+        ttk.Label(filter_frame, text="🔍 Filter:").pack(side=tk.LEFT)
+        self.filter_var = tk.StringVar()
+        ttk.Entry(filter_frame, textvariable=self.filter_var, width=30).pack(side=tk.LEFT, padx=(5, 10))
+        self.filter_var.trace_add('write', self.schedule_filter)
+        self.level_var = tk.StringVar(value=LEVELS[0])
+        level_combo = ttk.Combobox(filter_frame, textvariable=self.level_var, values=LEVELS,
+                                   state="readonly", width=10)
+        level_combo.pack(side=tk.LEFT)
+        level_combo.bind('<<ComboboxSelected>>', self.schedule_filter)
+        
         self.log_text = scrolledtext.ScrolledText(log_frame, height=20, state=tk.DISABLED, 
                                                 font=("Monaco", 11))
         self.log_text.pack(fill=tk.BOTH, expand=True)
@@ -125,22 +148,60 @@ class VoiceControlGUI:
         log_entry = f"[{timestamp}] {prefix} {message}\n"
         
         # Queue the message for thread-safe GUI update
-        self.message_queue.put(log_entry)
+        self.message_queue.put((level, log_entry))
     
     def process_messages(self):
-        """Process queued messages in main thread"""
+        """Move queued messages to the history and the log view, one batch per tick"""
+        batch = []
         try:
             while True:
-                message = self.message_queue.get_nowait()
-                self.log_text.config(state=tk.NORMAL)
-                self.log_text.insert(tk.END, message)
-                self.log_text.see(tk.END)
-                self.log_text.config(state=tk.DISABLED)
+                batch.append(self.message_queue.get_nowait())
         except queue.Empty:
             pass
         
+        if batch:
+            query, level = self.current_filter()
+            lines = [self.history.append(level_name, entry) for level_name, entry in batch]
+            if query or level:
+                lines = [line for line in lines if self.history.matches(line, query, level)]
+            # Lines beyond the cap would be trimmed right away, so never insert them
+            visible = [line.text for line in lines[-MAX_VISIBLE_LINES:]]
+            if visible:
+                self.append_to_view(''.join(visible))
+        
         # Schedule next check
-        self.root.after(100, self.process_messages)
+        self.root.after(TICK_MS, self.process_messages)
+    
+    def append_to_view(self, text):
+        """Insert a batch of lines and trim the oldest in bulk once over the cap"""
+        self.log_text.config(state=tk.NORMAL)
+        self.log_text.insert(tk.END, text)
+        line_count = int(self.log_text.index('end-1c').split('.')[0])
+        if line_count > MAX_VISIBLE_LINES + TRIM_SLACK:
+            self.log_text.delete('1.0', f'{line_count - MAX_VISIBLE_LINES}.0')
+        self.log_text.see(tk.END)
+        self.log_text.config(state=tk.DISABLED)
+    
+    def current_filter(self):
+        level = self.level_var.get()
+        return self.filter_var.get().strip(), None if level == LEVELS[0] else level
+    
+    def schedule_filter(self, *args):
+        """Re-filter once typing pauses instead of on every keystroke"""
+        if self.filter_job is not None:
+            self.root.after_cancel(self.filter_job)
+        self.filter_job = self.root.after(FILTER_DELAY_MS, self.apply_filter)
+    
+    def apply_filter(self):
+        """Redraw the view from the history index"""
+        self.filter_job = None
+        query, level = self.current_filter()
+        lines = self.history.search(query, level, MAX_VISIBLE_LINES)
+        self.log_text.config(state=tk.NORMAL)
+        self.log_text.delete(1.0, tk.END)
+        self.log_text.insert(tk.END, ''.join(line.text for line in lines))
+        self.log_text.see(tk.END)
+        self.log_text.config(state=tk.DISABLED)
     
     def start_server(self):
         """Start the server in a separate thread"""
@@ -236,18 +297,15 @@ class VoiceControlGUI:
     
     def handle_tcp_client(self, client_socket, addr):
         """Handle TCP client connection"""
-        buffer = ""
+        framer = LineFramer(max_line=64 * 1024)
         try:
             while self.is_running:
-                data = client_socket.recv(1024)
+                data = client_socket.recv(65536)
                 if not data:
                     break
                 
-                buffer += data.decode('utf-8')
-                while '\n' in buffer:
-                    message, buffer = buffer.split('\n', 1)
-                    if message.strip():
-                        self.process_tcp_message(message.strip(), addr)
+                for message in framer.feed_text(data):
+                    self.process_tcp_message(message, addr)
         except Exception as e:
             self.log_message(f"Client error {addr[0]}: {e}", "ERROR")
         finally:
@@ -299,6 +357,7 @@ class VoiceControlGUI:
     
     def clear_log(self):
         """Clear the message log"""
+        self.history.clear()
         self.log_text.config(state=tk.NORMAL)
         self.log_text.delete(1.0, tk.END)
         self.log_text.config(state=tk.DISABLED)
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+HTTP helpers for the receivers
+Framework-free ETag matching and gzip negotiation, so they can be tested
+without starting a server
+"""
+
+import gzip
+from typing import Optional, Tuple
+
+GZIP_MIN_SIZE = 1024  # Smaller bodies fit in a packet or two anyway
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    bare = etag[2:] if etag.startswith('W/') else etag
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == bare:
+            return True
+    return False
+
+
+def accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    """True if an Accept-Encoding header allows gzip (q=0 refuses it)"""
+    for part in (accept_encoding or '').split(','):
+        coding, _, params = part.strip().partition(';')
+        if coding.strip().lower() not in ('gzip', '*'):
+            continue
+        quality = params.strip()
+        if quality.startswith('q='):
+            try:
+                return float(quality[2:]) > 0
+            except ValueError:
+                return False
+        return True
+    return False
+
+
+def encode_body(body: bytes, accept_encoding: Optional[str],
+                min_size: int = GZIP_MIN_SIZE) -> Tuple[bytes, Optional[str]]:
+    """Gzip ``body`` when the client accepts it and it is large enough
+
+    Returns the bytes to send and the Content-Encoding to set, if any.
+    """
+    if len(body) < min_size or not accepts_gzip(accept_encoding):
+        return body, None
+    return gzip.compress(body, compresslevel=5), 'gzip'
@@ -1,36 +1,54 @@
 #!/usr/bin/env python3
 """
-iOS RCP Receiver - Flask HTTP Server
+iOS RCP Receiver - Flask HTTP Server (or ASGI with --asgi)
 Receives RCP commands from iOS Voice Control App via HTTP POST
 Matches the RCPCommandPayload structure from iOS client
 """
 
-from flask import Flask, request, jsonify, render_template_string
+from flask import Flask, Response, request, jsonify, render_template_string
 from flask_cors import CORS
+import argparse
+import asyncio
 import json
 import logging
 from datetime import datetime
+from itertools import groupby
 import sys
 import os
+from command_store import CommandStore, astream_events, page_etag, stream_events
+from http_helpers import encode_body, etag_matches
+from async_logging import AsyncLogger, ConsoleSink, JsonLinesSink
+from command_coalescer import OutputCoalescer
+from command_scheduler import CommandScheduler
+from console_client import ConsoleLoopThread, ConsolePool, RCP_PORT
+from rcp_payloads import MAX_BATCH, validate_batch, validate_payload
+from rcp_protocol import command_lines
+from voice_command_engine import VoiceCommandEngine
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('ios_rcp_receiver.log'),
-        logging.StreamHandler(sys.stdout)
-    ]
-)
-logger = logging.getLogger(__name__)
+# Configure logging: request threads only queue events, a writer thread does the I/O.
+# JSON lines get their own file, apart from the plain-text ios_rcp_receiver.log of older versions
+log = AsyncLogger([ConsoleSink(), JsonLinesSink('ios_rcp_receiver.log.jsonl')])
+logging.getLogger('werkzeug').setLevel(logging.WARNING)  # No synchronous per-request access lines
 
 # Initialize Flask app
 app = Flask(__name__)
 CORS(app)
 
 # Store received commands for display
-received_commands = []
-MAX_COMMANDS = 100  # Keep last 100 commands
+MAX_COMMANDS = 100_000  # Keep last 100k commands
+DEFAULT_PAGE = 1000  # /api/commands page size without ?limit=
+MAX_PAGE = 10_000
+
+# Optional console the received commands are forwarded to (--console)
+console = None
+console_host = None
+console_port = RCP_PORT
+coalescer = None  # Collapses fader rides before they reach the console
+FORWARD_TIMEOUT = 5.0  # Seconds a burst may wait on the console before it is given up
+# Commands spoken with a time or cue ("in 10 seconds ...") wait here while forwarding
+scheduler = CommandScheduler()
+schedules = VoiceCommandEngine(scheduler=scheduler)  # Reads the time or cue of originalText
+received_commands = CommandStore(MAX_COMMANDS)
 
 # HTML template for web GUI
 HTML_TEMPLATE = """
@@ -178,68 +196,270 @@ HTML_TEMPLATE = """
             <button class="btn danger" onclick="clearCommands()">🗑️ Clear All</button>
         </div>
         
-        <div id="commands">
-            {% if commands %}
-                {% for command in commands %}
-                <div class="command">
-                    <div class="command-header">
-                        <span class="timestamp">{{ command.timestamp }}</span>
-                        <span class="device-info">{{ command.device_id }}</span>
-                    </div>
-                    
-                    <div class="voice-text">
-                        🗣️ "{{ command.original_text }}"
-                    </div>
-                    
-                    <div class="description">
-                        {{ command.description }}
-                    </div>
-                    
-                    <div class="rcp-command">
-                        🎛️ {{ command.command }}
-                    </div>
-                    
-                    <div>
-                        <span class="confidence {{ 'high' if command.confidence >= 0.8 else 'medium' if command.confidence >= 0.5 else 'low' }}">
-                            Confidence: {{ "%.1f%%"|format(command.confidence * 100) }}
-                        </span>
-                    </div>
+        <div id="commands" data-last-id="{{ last_id }}">
+            {% for command in commands %}
+            <div class="command">
+                <div class="command-header">
+                    <span class="timestamp">{{ command.timestamp }}</span>
+                    <span class="device-info">{{ command.device_id }}</span>
+                </div>
+                
+                <div class="voice-text">
+                    🗣️ "{{ command.original_text }}"
+                </div>
+                
+                <div class="description">
+                    {{ command.description }}
+                </div>
+                
+                <div class="rcp-command">
+                    🎛️ {{ command.command }}
                 </div>
-                {% endfor %}
-            {% else %}
-                <div class="no-commands">
-                    📱 No commands received yet.<br>
-                    Send a command from your iOS Voice Control App to see it here!
+                
+                <div>
+                    <span class="confidence {{ 'high' if command.confidence >= 0.8 else 'medium' if command.confidence >= 0.5 else 'low' }}">
+                        Confidence: {{ "%.1f%%"|format(command.confidence * 100) }}
+                    </span>
                 </div>
-            {% endif %}
+            </div>
+            {% endfor %}
+        </div>
+        
+        <div class="no-commands" id="no-commands" {% if commands %}style="display: none"{% endif %}>
+            📱 No commands received yet.<br>
+            Send a command from your iOS Voice Control App to see it here!
         </div>
     </div>
     
     <script>
+        const MAX_VISIBLE = 200;  // Older cards are dropped from the page
+        const list = document.getElementById('commands');
+        const empty = document.getElementById('no-commands');
+        
+        function element(tag, className, text) {
+            const node = document.createElement(tag);
+            node.className = className;
+            if (text !== undefined) node.textContent = text;
+            return node;
+        }
+        
+        function renderCommand(command) {
+            const card = element('div', 'command');
+            const header = element('div', 'command-header');
+            header.append(element('span', 'timestamp', command.timestamp),
+                          element('span', 'device-info', command.device_id));
+            const level = command.confidence >= 0.8 ? 'high' : command.confidence >= 0.5 ? 'medium' : 'low';
+            const confidence = element('div', '');
+            confidence.append(element('span', 'confidence ' + level,
+                                      'Confidence: ' + (command.confidence * 100).toFixed(1) + '%'));
+            card.append(header,
+                        element('div', 'voice-text', '🗣️ "' + command.original_text + '"'),
+                        element('div', 'description', command.description),
+                        element('div', 'rcp-command', '🎛️ ' + command.command),
+                        confidence);
+            return card;
+        }
+        
+        // New commands are pushed as they arrive; only the new card is added
+        const events = new EventSource('/events?since=' + list.dataset.lastId);
+        events.addEventListener('command', (event) => {
+            list.prepend(renderCommand(JSON.parse(event.data)));
+            while (list.childElementCount > MAX_VISIBLE) list.lastElementChild.remove();
+            empty.style.display = 'none';
+        });
+        events.addEventListener('clear', () => {
+            list.replaceChildren();
+            empty.style.display = '';
+        });
+        
         function refreshPage() {
             location.reload();
         }
         
         function clearCommands() {
             if (confirm('Clear all received commands?')) {
-                fetch('/clear', { method: 'POST' })
-                    .then(() => location.reload());
+                fetch('/clear', { method: 'POST' });
             }
         }
-        
-        // Auto-refresh every 5 seconds
-        setInterval(() => {
-            location.reload();
-        }, 5000);
     </script>
 </body>
 </html>
 """
 
+def accept_command(data, client_ip):
+    """Validate, store and log one RCPCommandPayload
+
+    Shared by the Flask and ASGI apps. Returns (response body, HTTP status,
+    lines to forward to the console).
+    """
+    try:
+        if not data:
+            return {'error': 'No JSON data provided'}, 400, []
+        
+        # Validate required fields and create command record, exactly as /rcp/batch does
+        command_record, error = validate_payload(data, client_ip)
+        if error:
+            log.error("❌ {error}", error=error)
+            return {'error': error}, 400, []
+        
+        # Add to the ring buffer, oldest records drop out past MAX_COMMANDS
+        command_id = received_commands.append(command_record)
+        
+        # Log the received command as one structured event, formatted off the request thread
+        log.info("📱 Received from {device_id} ({client_ip})\n"
+                 "🗣️  Voice: \"{original_text}\"\n"
+                 "🎛️  RCP: {command}\n"
+                 "📊 Confidence: {confidence:.1%}\n"
+                 "📝 Description: {description}", **command_record)
+        
+        # Success response
+        response_data = {
+            'success': True,
+            'message': 'RCP command received successfully',
+            'command_id': command_id,
+            'timestamp': datetime.now().isoformat()
+        }
+        lines, scheduled = defer_scheduled(command_record['original_text'], [command_record['command']])
+        if scheduled:
+            response_data['scheduled'] = scheduled
+        
+        return response_data, 200, lines
+        
+    except Exception as e:
+        error_msg = f"Server error: {str(e)}"
+        log.error("❌ {error}", error=error_msg)
+        return {'error': error_msg}, 500, []
+
+def accept_batch(data, client_ip):
+    """Validate a batch in one pass, store the valid payloads together and log them
+
+    Returns (response body, HTTP status, lines to forward as one burst).
+    """
+    items = data.get('commands') if isinstance(data, dict) else data
+    if not isinstance(items, list) or not items:
+        return {'error': 'Expected a non-empty JSON array of commands'}, 400, []
+    if len(items) > MAX_BATCH:
+        return {'error': f'At most {MAX_BATCH} commands per batch'}, 413, []
+    
+    records, statuses = validate_batch(items, client_ip)
+    command_ids = received_commands.extend(records)
+    
+    ids = iter(command_ids)
+    for item in statuses:
+        if item['success']:
+            item['command_id'] = next(ids)
+    
+    if records:
+        log.info("📦 Batch of {count} from {device_id} ({client_ip}): {commands}",
+                 count=len(records), device_id=records[0]['device_id'], client_ip=client_ip,
+                 commands=' | '.join(record['command'] for record in records))
+    rejected = len(statuses) - len(records)
+    if rejected:
+        log.error("❌ {rejected} of {total} batch commands rejected", rejected=rejected, total=len(statuses))
+    
+    # Payloads of one utterance share its text, and are scheduled together
+    lines, scheduled = [], []
+    for original_text, group in groupby(records, key=lambda record: record['original_text']):
+        now, note = defer_scheduled(original_text, [record['command'] for record in group])
+        lines.extend(now)
+        if note:
+            scheduled.append(note)
+    
+    body = {
+        'success': rejected == 0,
+        'accepted': len(records),
+        'rejected': rejected,
+        'results': statuses,
+        'timestamp': datetime.now().isoformat()
+    }
+    if scheduled:
+        body['scheduled'] = scheduled
+    return body, 200 if records else 400, lines
+
+def defer_scheduled(original_text, lines):
+    """Hold lines whose utterance starts or ends with a time or cue
+
+    Returns (lines to forward now, scheduling note or None). "Fire cue 5"
+    and the other scheduling commands act on the scheduler instead of being
+    forwarded. Without a console nothing is held, there is nothing to run.
+    """
+    if console_host is None or not lines:
+        return lines, None
+    control = schedules.process_schedule_control(original_text)
+    if control is not None:
+        return [], "; ".join(result.description for result in control)
+    spec = schedules.parse_schedule(original_text)
+    if spec is None:
+        return lines, None
+    return [], schedules.schedule_batch(spec, lines, spec.command)[0].description
+
+def scheduled_batch_lines(batch):
+    """RCP lines of a scheduled batch whose time or cue has come"""
+    log.info("⏱️  Running scheduled #{batch_id}: {label}", batch_id=batch.batch_id, label=batch.label)
+    return list(command_lines(batch.commands))
+
+def status_report():
+    """Server status and statistics"""
+    last_command = received_commands.get(received_commands.last_id)
+    return {
+        'status': 'running',
+        'message': 'iOS RCP Receiver is operational',
+        'commands_received': len(received_commands),
+        'last_command_id': received_commands.last_id,
+        'last_command_time': last_command['received_at'] if last_command else None,
+        'logging': log.metrics(),
+        'forwarding_to': f"{console_host}:{console_port}" if console_host else None,
+        'server_start_time': datetime.now().isoformat()
+    }
+
+def commands_page(since, limit, if_none_match, accept_encoding):
+    """One /api/commands page: (HTTP status, body bytes or None, headers)"""
+    try:
+        since = int(since)
+        limit = min(int(limit), MAX_PAGE)
+    except ValueError:
+        return 400, b'{"error":"since and limit must be integers"}', {'Content-Type': 'application/json'}
+    if limit < 1:
+        return 400, b'{"error":"limit must be at least 1"}', {'Content-Type': 'application/json'}
+
+    page = received_commands.page(since, limit)
+    etag = page_etag(page)
+    headers = {'ETag': etag, 'Cache-Control': 'no-cache', 'Vary': 'Accept-Encoding'}
+    if etag_matches(if_none_match, etag):
+        return 304, None, headers
+
+    body = json.dumps(page, separators=(',', ':')).encode('utf-8')
+    body, encoding = encode_body(body, accept_encoding)
+    if encoding:
+        headers['Content-Encoding'] = encoding
+    headers['Content-Type'] = 'application/json'
+    return 200, body, headers
+
+def event_cursor(last_event_id, since):
+    """Where a /events stream starts: Last-Event-ID on reconnect, else ?since="""
+    try:
+        return int(last_event_id if last_event_id is not None else since)
+    except ValueError:
+        return received_commands.last_id
+
+def render_index(render):
+    commands = received_commands.latest(20)
+    last_id = commands[-1]['id'] if commands else received_commands.last_id
+    return render(commands=list(reversed(commands)), last_id=last_id)
+
+SSE_HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+
 @app.route('/')
 def index():
     """Serve the web GUI showing received commands"""
-    return render_template_string(HTML_TEMPLATE, commands=list(reversed(received_commands[-20:])))
+    return render_index(lambda **context: render_template_string(HTML_TEMPLATE, **context))
+
+@app.route('/events')
+def events():
+    """Server-Sent Events stream of new commands for the web GUI"""
+    after_id = event_cursor(request.headers.get('Last-Event-ID'), request.args.get('since', 0))
+    return Response(stream_events(received_commands, after_id), mimetype='text/event-stream',
+                    headers=SSE_HEADERS)
 
 @app.route('/rcp', methods=['POST'])
 def receive_rcp_command():
@@ -256,121 +476,240 @@ def receive_rcp_command():
         "commandType": "voice_command"
     }
     """
-    try:
-        # Get JSON payload
-        if not request.is_json:
-            return jsonify({'error': 'Content-Type must be application/json'}), 400
-            
-        data = request.get_json()
-        if not data:
-            return jsonify({'error': 'No JSON data provided'}), 400
-        
-        # Validate required fields
-        required_fields = ['command', 'description', 'confidence', 'originalText', 'timestamp', 'deviceId']
-        for field in required_fields:
-            if field not in data:
-                return jsonify({'error': f'Missing required field: {field}'}), 400
-        
-        # Create command record
-        command_record = {
-            'command': data['command'],
-            'description': data['description'],
-            'confidence': float(data['confidence']),
-            'original_text': data['originalText'],
-            'timestamp': data['timestamp'],
-            'device_id': data['deviceId'],
-            'command_type': data.get('commandType', 'unknown'),
-            'received_at': datetime.now().isoformat(),
-            'client_ip': request.remote_addr
-        }
-        
-        # Add to received commands list
-        received_commands.append(command_record)
-        
-        # Keep only last MAX_COMMANDS
-        if len(received_commands) > MAX_COMMANDS:
-            received_commands.pop(0)
-        
-        # Log the received command
-        logger.info(f"📱 Received from {command_record['device_id']} ({command_record['client_ip']})")
-        logger.info(f"🗣️  Voice: \"{command_record['original_text']}\"")
-        logger.info(f"🎛️  RCP: {command_record['command']}")
-        logger.info(f"📊 Confidence: {command_record['confidence']:.1%}")
-        logger.info(f"📝 Description: {command_record['description']}")
-        
-        # Success response
-        response_data = {
-            'success': True,
-            'message': 'RCP command received successfully',
-            'command_id': len(received_commands),
-            'timestamp': datetime.now().isoformat()
-        }
-        
-        logger.info(f"✅ Response sent: {response_data['message']}")
-        return jsonify(response_data), 200
-        
-    except ValueError as e:
-        error_msg = f"Invalid data format: {str(e)}"
-        logger.error(f"❌ {error_msg}")
-        return jsonify({'error': error_msg}), 400
-        
-    except Exception as e:
-        error_msg = f"Server error: {str(e)}"
-        logger.error(f"❌ {error_msg}")
-        return jsonify({'error': error_msg}), 500
+    if not request.is_json:
+        return jsonify({'error': 'Content-Type must be application/json'}), 400
+    body, status_code, lines = accept_command(request.get_json(silent=True), request.remote_addr)
+    forward_to_console(lines)
+    return jsonify(body), status_code
+
+@app.route('/rcp/batch', methods=['POST'])
+def receive_rcp_batch():
+    """
+    Receive several RCP commands from one utterance in a single request
+    Body is a JSON array of RCPCommandPayload objects (or {"commands": [...]}).
+    Valid payloads are stored together and forwarded as one burst; the
+    response has a status per item, in order.
+    """
+    if not request.is_json:
+        return jsonify({'error': 'Content-Type must be application/json'}), 400
+    body, status_code, lines = accept_batch(request.get_json(silent=True), request.remote_addr)
+    forward_to_console(lines)
+    return jsonify(body), status_code
+
+def start_forwarding(host, port=RCP_PORT):
+    """Forward received commands to a console from a background loop thread"""
+    global console, console_host, console_port, coalescer
+    console_host, console_port = host, port
+    console = ConsoleLoopThread()
+    coalescer = OutputCoalescer(_send_burst)
+    coalescer.bind(console.loop)
+    scheduler.dispatch = lambda batch: forward_to_console(scheduled_batch_lines(batch))
+    console.submit(scheduler.run())
+
+def stop_forwarding():
+    global console, coalescer
+    if console is not None:
+        console.loop.call_soon_threadsafe(scheduler.stop)
+        console.loop.call_soon_threadsafe(coalescer.flush)
+        console.stop()
+    console = coalescer = None
+
+def forward_to_console(lines):
+    """Coalesce lines for the console (if one is configured), sent as pipelined bursts"""
+    if coalescer is None or not lines:
+        return
+    coalescer.submit(lines)
+
+def _send_burst(lines):
+    """Coalescer sink, runs on the console loop"""
+    task = asyncio.ensure_future(asyncio.wait_for(console.pool.send(console_host, console_port, lines),
+                                                  FORWARD_TIMEOUT))
+    task.add_done_callback(_report_console_error)
+
+def _report_console_error(future):
+    error = future.exception()
+    if error is not None:
+        log.error("❌ Console {host}:{port} error: {error}", host=console_host, port=console_port,
+                  error=str(error) or type(error).__name__)
 
 @app.route('/clear', methods=['POST'])
 def clear_commands():
     """Clear all received commands"""
-    global received_commands
     received_commands.clear()
-    logger.info("🗑️ All commands cleared")
+    log.info("🗑️ All commands cleared")
     return jsonify({'success': True, 'message': 'Commands cleared'})
 
 @app.route('/status', methods=['GET'])
 def status():
     """Get server status and statistics"""
-    return jsonify({
-        'status': 'running',
-        'message': 'iOS RCP Receiver is operational',
-        'commands_received': len(received_commands),
-        'last_command_time': received_commands[-1]['received_at'] if received_commands else None,
-        'server_start_time': datetime.now().isoformat()
-    })
+    return jsonify(status_report())
 
 @app.route('/api/commands', methods=['GET'])
 def get_commands_api():
-    """Get all received commands as JSON API"""
-    return jsonify({
-        'commands': received_commands,
-        'total': len(received_commands)
-    })
+    """Received commands as JSON API, paged with ?since=<id>&limit=<n>
+
+    Pass the returned ``next_since`` as the next ``since`` to fetch only new
+    commands; repeat requests with If-None-Match get a 304 when nothing changed.
+    """
+    status_code, body, headers = commands_page(
+        request.args.get('since', 0), request.args.get('limit', DEFAULT_PAGE),
+        request.headers.get('If-None-Match'), request.headers.get('Accept-Encoding'))
+    return Response(body, status=status_code, headers=headers)
+
+def create_asgi_app():
+    """The same routes as an ASGI app for uvicorn (--asgi)
+
+    Requests are handled on one event loop: forwarded lines are queued and
+    sent by a ConsolePool running on that loop, each burst given up after
+    FORWARD_TIMEOUT, and /events viewers wait without holding a thread
+    each. Needs starlette (and uvicorn to serve it).
+    """
+    from contextlib import asynccontextmanager
+    from jinja2 import Template
+    from starlette.applications import Starlette
+    from starlette.middleware import Middleware
+    from starlette.middleware.cors import CORSMiddleware
+    from starlette.responses import HTMLResponse, JSONResponse, Response as ASGIResponse, StreamingResponse
+    from starlette.routing import Route
+
+    template = Template(HTML_TEMPLATE, autoescape=True)
+    pool = ConsolePool() if console_host else None
+
+    async def send_burst(lines):
+        try:
+            # Bounded, so a desk that stops answering cannot pile up sends on the server loop
+            await asyncio.wait_for(pool.send(console_host, console_port, lines), FORWARD_TIMEOUT)
+        except (OSError, asyncio.TimeoutError) as e:
+            log.error("❌ Console {host}:{port} error: {error}", host=console_host, port=console_port,
+                      error=str(e) or type(e).__name__)
+
+    # Bound to the server loop on first use; requests return once their lines are queued
+    asgi_coalescer = OutputCoalescer(send_burst) if pool is not None else None
+
+    def forward(lines):
+        if asgi_coalescer is not None and lines:
+            asgi_coalescer.submit(lines)
+
+    async def json_payload(request):
+        if 'json' not in request.headers.get('content-type', ''):
+            return None, JSONResponse({'error': 'Content-Type must be application/json'}, 400)
+        try:
+            return await request.json(), None
+        except ValueError:
+            return None, None
+
+    async def index(request):
+        return HTMLResponse(render_index(template.render))
+
+    async def events(request):
+        after_id = event_cursor(request.headers.get('last-event-id'), request.query_params.get('since', 0))
+        return StreamingResponse(astream_events(received_commands, after_id), media_type='text/event-stream',
+                                 headers=SSE_HEADERS)
+
+    async def receive_rcp_command(request):
+        data, error = await json_payload(request)
+        if error:
+            return error
+        body, status_code, lines = accept_command(data, request.client.host if request.client else None)
+        forward(lines)
+        return JSONResponse(body, status_code)
+
+    async def receive_rcp_batch(request):
+        data, error = await json_payload(request)
+        if error:
+            return error
+        body, status_code, lines = accept_batch(data, request.client.host if request.client else None)
+        forward(lines)
+        return JSONResponse(body, status_code)
+
+    async def clear_commands(request):
+        received_commands.clear()
+        log.info("🗑️ All commands cleared")
+        return JSONResponse({'success': True, 'message': 'Commands cleared'})
+
+    async def status(request):
+        return JSONResponse(status_report())
+
+    async def get_commands_api(request):
+        status_code, body, headers = commands_page(
+            request.query_params.get('since', 0), request.query_params.get('limit', DEFAULT_PAGE),
+            request.headers.get('if-none-match'), request.headers.get('accept-encoding'))
+        return ASGIResponse(body, status_code, headers)
+
+    @asynccontextmanager
+    async def lifespan(app):
+        if pool is not None:
+            scheduler.dispatch = lambda batch: forward(scheduled_batch_lines(batch))
+            scheduled = asyncio.ensure_future(scheduler.run())
+        yield
+        if pool is not None:
+            scheduled.cancel()
+            asgi_coalescer.flush()
+            await asyncio.sleep(0)  # Let the flushed burst start before the connections close
+            await pool.close_all()
+
+    return Starlette(
+        routes=[
+            Route('/', index),
+            Route('/events', events),
+            Route('/rcp', receive_rcp_command, methods=['POST']),
+            Route('/rcp/batch', receive_rcp_batch, methods=['POST']),
+            Route('/clear', clear_commands, methods=['POST']),
+            Route('/status', status),
+            Route('/api/commands', get_commands_api),
+        ],
+        middleware=[Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])],
+        lifespan=lifespan,
+    )
 
 def main():
     """Main entry point"""
+    global console_host, console_port
+    parser = argparse.ArgumentParser(description='HTTP receiver and web GUI for the iOS Voice Control app')
+    parser.add_argument('--port', type=int, default=8080, help='HTTP port (default: 8080)')
+    parser.add_argument('--console', help='Yamaha console IP to forward received commands to (default: display only)')
+    parser.add_argument('--console-port', type=int, default=RCP_PORT, help='Yamaha console RCP port (default: 49280)')
+    parser.add_argument('--asgi', action='store_true', help='Serve the ASGI app with uvicorn instead of the Flask server')
+    args = parser.parse_args()
+    if args.console:
+        if args.asgi:
+            console_host, console_port = args.console, args.console_port
+        else:
+            start_forwarding(args.console, args.console_port)
+    
     print("=" * 60)
     print("🎙️  iOS RCP Command Receiver")
     print("=" * 60)
     print()
     print("📡 Starting HTTP server for iOS Voice Control App...")
     print()
-    print("🌐 Web GUI: http://localhost:8080")
-    print("📍 RCP Endpoint: http://localhost:8080/rcp")
-    print("📊 Status API: http://localhost:8080/status")  
+    print(f"🌐 Web GUI: http://localhost:{args.port}")
+    print(f"📍 RCP Endpoint: http://localhost:{args.port}/rcp")
+    print(f"📦 Batch Endpoint: http://localhost:{args.port}/rcp/batch")
+    print(f"📊 Status API: http://localhost:{args.port}/status")
+    print(f"🗂️  Commands API: http://localhost:{args.port}/api/commands?since=0&limit=1000")
+    print(f"📺 Live events: http://localhost:{args.port}/events")
+    if console_host:
+        print(f"🎛️  Forwarding to Yamaha console {console_host}:{console_port}")
     print()
     print("📱 Configure your iOS app to send commands to:")
     print("   • IP: Your Mac's IP address")
-    print("   • Port: 8080")
+    print(f"   • Port: {args.port}")
     print("   • Target: Mac GUI (Testing)")
     print()
     print("Press Ctrl+C to stop the server")
     print()
     
     try:
+        if args.asgi:
+            import uvicorn  # Needs uvicorn and starlette
+            print("⚡ ASGI mode (uvicorn)")
+            uvicorn.run(create_asgi_app(), host='0.0.0.0', port=args.port, access_log=False, log_level='warning')
+            return
         # Run Flask server
         app.run(
             host='0.0.0.0',  # Accept connections from any IP
-            port=8080,
+            port=args.port,
             debug=False,
             threaded=True
         )
@@ -379,6 +718,9 @@ def main():
     except Exception as e:
         print(f"❌ Server error: {e}")
         sys.exit(1)
+    finally:
+        stop_forwarding()
+        log.close()
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
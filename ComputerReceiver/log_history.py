@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Log History for the GUI receiver
+Bounded in-memory log lines with a level and word index, so the log view
+can be filtered without scanning widget text
+"""
+
+import re
+from collections import deque
+from typing import Deque, Dict, List, NamedTuple, Optional, Set
+
+WORD = re.compile(r"[0-9a-z]+")
+
+
+class LogLine(NamedTuple):
+    seq: int
+    level: str
+    text: str
+
+
+class LogHistory:
+    """The last ``max_lines`` log lines, indexed by level and by word
+
+    Every index keeps its sequence numbers in ascending order, so the entries
+    of the oldest line are always at the front of their lists and dropping
+    it costs only the words of that line. Memory stays flat however long the
+    session runs.
+    """
+
+    def __init__(self, max_lines: int = 20_000):
+        self.max_lines = max_lines
+        self.lines: Deque[LogLine] = deque()
+        self.next_seq = 0
+        self.by_level: Dict[str, Deque[int]] = {}
+        self.by_word: Dict[str, Deque[int]] = {}
+
+    def append(self, level: str, text: str) -> LogLine:
+        line = LogLine(self.next_seq, level, text)
+        self.next_seq += 1
+        self.lines.append(line)
+        self.by_level.setdefault(level, deque()).append(line.seq)
+        for word in words(text):
+            self.by_word.setdefault(word, deque()).append(line.seq)
+        if len(self.lines) > self.max_lines:
+            self._drop_oldest()
+        return line
+
+    def search(self, query: str = '', level: Optional[str] = None, limit: Optional[int] = None) -> List[LogLine]:
+        """Lines of ``level`` containing every query word (as a word prefix), oldest first"""
+        candidates: Optional[Set[int]] = None
+        if level:
+            candidates = set(self.by_level.get(level, ()))
+        for term in words(query):
+            # The vocabulary is far smaller than the text it indexes
+            matches = set()
+            for word, seqs in self.by_word.items():
+                if word.startswith(term):
+                    matches.update(seqs)
+            candidates = matches if candidates is None else candidates & matches
+            if not candidates:
+                return []
+        if candidates is None:
+            found = list(self.lines)
+        else:
+            found = [line for line in self.lines if line.seq in candidates]
+        return found[-limit:] if limit else found
+
+    def matches(self, line: LogLine, query: str = '', level: Optional[str] = None) -> bool:
+        """Whether one line passes the same filter as ``search``, for lines as they arrive"""
+        if level and line.level != level:
+            return False
+        line_words = words(line.text)
+        return all(any(word.startswith(term) for word in line_words) for term in words(query))
+
+    def clear(self):
+        self.lines.clear()
+        self.by_level.clear()
+        self.by_word.clear()
+
+    def _drop_oldest(self):
+        line = self.lines.popleft()
+        _unindex(self.by_level, line.level, line.seq)
+        for word in words(line.text):
+            _unindex(self.by_word, word, line.seq)
+
+    def __len__(self):
+        return len(self.lines)
+
+
+def words(text: str) -> Set[str]:
+    """Lower-case words of a log line or query, split at anything but letters and digits"""
+    return set(WORD.findall(text.lower()))
+
+
+def _unindex(index: Dict[str, Deque[int]], key: str, seq: int):
+    seqs = index[key]
+    if seqs and seqs[0] == seq:
+        seqs.popleft()
+    if not seqs:
+        del index[key]
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+NOTIFY Consumer for Yamaha RCP consoles
+Parses the console's unsolicited change lines as they stream in, keeps the
+state mirror current and publishes change events to subscribers
+"""
+
+import argparse
+import asyncio
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+from console_state import ConsoleStateMirror
+from rcp_protocol import LineFramer, RCPValue, parse_line, tokenize
+from traffic_recorder import RECEIVED, TrafficRecorder
+
+RCP_PORT = 49280
+SCENE_ADDRESS = 'ssrecall_ex'  # Pseudo-address of scene recall events
+
+
+@dataclass
+class ChangeEvent:
+    """One parameter change reported by the console"""
+    address: str
+    x: int
+    y: int
+    value: RCPValue
+    previous: Optional[RCPValue] = None
+
+
+class ChangeSubscription:
+    """Last-value-wins queue of change events for one async subscriber
+
+    Pending events are keyed by (address, x, y), so a subscriber that falls
+    behind a fader-bank grab holds at most one event per parameter instead
+    of an ever-growing backlog.
+    """
+
+    def __init__(self):
+        self.pending: Dict[tuple, ChangeEvent] = {}
+        self.received = 0
+        self.delivered = 0
+        self._ready = asyncio.Event()
+
+    def put(self, event: ChangeEvent):
+        key = (event.address, event.x, event.y)
+        self.pending.pop(key, None)  # Move to the end: newest change last
+        self.pending[key] = event
+        self.received += 1
+        self._ready.set()
+
+    @property
+    def conflated(self) -> int:
+        """Events replaced by a newer value before the subscriber read them"""
+        return self.received - self.delivered - len(self.pending)
+
+    async def get_batch(self) -> List[ChangeEvent]:
+        """Wait for changes and return every pending event, oldest first"""
+        while not self.pending:
+            self._ready.clear()
+            await self._ready.wait()
+        batch = list(self.pending.values())
+        self.pending.clear()
+        self.delivered += len(batch)
+        return batch
+
+
+class NotifyConsumer:
+    """Feeds NOTIFY lines from a console byte stream into a state mirror
+
+    Use ``feed`` with raw socket bytes, ``run`` with an asyncio reader, or add
+    ``on_line`` to a ConsoleConnection's ``line_handlers``. Callbacks run inline
+    for every real change; subscriptions conflate per parameter.
+    """
+
+    def __init__(self, mirror: ConsoleStateMirror, max_line: int = 4096):
+        self.mirror = mirror
+        self.framer = LineFramer(max_line)
+        self.callbacks: List[Callable[[ChangeEvent], None]] = []
+        self.subscriptions: List[ChangeSubscription] = []
+        self.line_taps: List[Callable[[str], None]] = []  # Every framed line, e.g. a recorder
+        self.notifies = 0
+        self.changes = 0
+        self.ignored = 0
+
+    def subscribe(self, callback: Optional[Callable[[ChangeEvent], None]] = None) -> Optional[ChangeSubscription]:
+        """Register a callback, or return a new subscription when none is given"""
+        if callback is not None:
+            self.callbacks.append(callback)
+            return None
+        subscription = ChangeSubscription()
+        self.subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscriber):
+        if subscriber in self.callbacks:
+            self.callbacks.remove(subscriber)
+        elif subscriber in self.subscriptions:
+            self.subscriptions.remove(subscriber)
+
+    def feed(self, data: bytes):
+        """Consume a chunk of bytes from the console"""
+        for line in self.framer.feed(data):
+            text = line.decode('utf-8', errors='replace')
+            for tap in self.line_taps:
+                tap(text)
+            self.on_line(text)
+
+    def on_line(self, line: str):
+        """Apply one console line if it is a NOTIFY"""
+        if not line.startswith('NOTIFY'):
+            self.ignored += 1
+            return
+        self.notifies += 1
+        message = parse_line(line)
+        if message is None:
+            tokens = tokenize(line)
+            if len(tokens) >= 3 and tokens[1] == SCENE_ADDRESS:
+                self.publish(ChangeEvent(SCENE_ADDRESS, 0, 0, tokens[2]))
+            else:
+                self.ignored += 1
+            return
+        if message.value is None:
+            self.ignored += 1
+            return
+        previous = self.mirror.set(message.address, message.x, message.y, message.value)
+        if previous is None:
+            self.ignored += 1
+            return
+        value = self.mirror.get(message.address, message.x, message.y)
+        if value != previous:
+            self.publish(ChangeEvent(message.address, message.x, message.y, value, previous))
+
+    def publish(self, event: ChangeEvent):
+        self.changes += 1
+        for callback in self.callbacks:
+            try:
+                callback(event)
+            except Exception as e:
+                print(f"❌ NOTIFY subscriber failed: {e}")
+        for subscription in self.subscriptions:
+            subscription.put(event)
+
+    async def run(self, reader: asyncio.StreamReader, chunk_size: int = 64 * 1024):
+        """Consume a stream until the console closes it"""
+        while True:
+            data = await reader.read(chunk_size)
+            if not data:
+                break
+            self.feed(data)
+
+
+async def listen(args):
+    consumer = NotifyConsumer(ConsoleStateMirror())
+    recorder = TrafficRecorder(args.record, consumer.mirror.table) if args.record else None
+    if recorder is not None:
+        consumer.line_taps.append(lambda line: recorder.record(RECEIVED, line))
+
+    def show(event: ChangeEvent):
+        print(f"🔔 {event.address} {event.x} {event.y}: {event.previous} → {event.value}")
+
+    consumer.subscribe(show)
+    reader, writer = await asyncio.open_connection(args.console, args.port)
+    print(f"🎛️  Listening for NOTIFY from {args.console}:{args.port}")
+    try:
+        await consumer.run(reader)
+    finally:
+        writer.close()
+        if recorder is not None:
+            recorder.close()
+        print(f"📊 {consumer.notifies} notifies, {consumer.changes} changes")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Follow Yamaha console NOTIFY changes')
+    parser.add_argument('--console', default='192.168.0.128', help='Console IP (default: 192.168.0.128)')
+    parser.add_argument('--port', type=int, default=RCP_PORT, help='Console RCP port (default: 49280)')
+    parser.add_argument('--record', help='Append the traffic to this binary recording (see traffic_recorder.py)')
+    args = parser.parse_args()
+    try:
+        asyncio.run(listen(args))
+    except KeyboardInterrupt:
+        print("\n🛑 Stopped.")
+    except OSError as e:
+        print(f"❌ Console connection failed: {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+RCPCommandPayload validation for the HTTP receivers
+Turns the iOS app's JSON payloads into command records, one at a time or a
+whole batch in a single pass
+"""
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+REQUIRED_FIELDS = frozenset(('command', 'description', 'confidence', 'originalText', 'timestamp', 'deviceId'))
+FIELD_ORDER = ('command', 'description', 'confidence', 'originalText', 'timestamp', 'deviceId')
+MAX_BATCH = 1000  # Payloads accepted by one /rcp/batch request
+
+
+def payload_error(data: Any) -> Optional[str]:
+    """Why a payload is invalid, or None if it can become a record"""
+    if not isinstance(data, dict):
+        return 'Payload must be a JSON object'
+    missing = REQUIRED_FIELDS.difference(data)
+    if missing:
+        return f"Missing required field: {min(missing, key=FIELD_ORDER.index)}"
+    if not isinstance(data['command'], str) or not data['command'].strip():
+        return 'command must be a non-empty string'
+    return None
+
+
+def validate_payload(data: Any, client_ip: Optional[str],
+                     received_at: Optional[str] = None) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """(record, None) for a valid payload, (None, reason) otherwise; used by /rcp and /rcp/batch alike
+
+    A command may hold several RCP lines separated by newlines, they are
+    forwarded as one burst.
+    """
+    error = payload_error(data)
+    if error is not None:
+        return None, error
+    try:
+        return to_record(data, client_ip, received_at), None
+    except (TypeError, ValueError) as e:
+        return None, f"Invalid data format: {e}"
+
+
+def to_record(data: Dict[str, Any], client_ip: Optional[str],
+              received_at: Optional[str] = None) -> Dict[str, Any]:
+    """Command record for the store; raises ValueError or TypeError for a bad confidence"""
+    return {
+        'command': data['command'],
+        'description': data['description'],
+        'confidence': float(data['confidence']),
+        'original_text': data['originalText'],
+        'timestamp': data['timestamp'],
+        'device_id': data['deviceId'],
+        'command_type': data.get('commandType', 'unknown'),
+        'received_at': received_at or datetime.now().isoformat(),
+        'client_ip': client_ip,
+    }
+
+
+def validate_batch(items: List[Any], client_ip: Optional[str]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Validate every payload of a batch in one pass
+
+    Returns the records of the valid payloads, in order, and one status per
+    item: ``{'index', 'success': True}`` or ``{'index', 'success': False, 'error'}``.
+    """
+    received_at = datetime.now().isoformat()
+    records = []
+    statuses = []
+    for index, data in enumerate(items):
+        record, error = validate_payload(data, client_ip, received_at)
+        if record is not None:
+            records.append(record)
+        statuses.append({'index': index, 'success': True} if error is None
+                        else {'index': index, 'success': False, 'error': error})
+    return records, statuses
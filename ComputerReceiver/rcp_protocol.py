@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Yamaha RCP protocol helpers
+Parsing and formatting of the newline-delimited RCP text messages
+"""
+
+import re
+from typing import Iterator, List, NamedTuple, Optional, Union
+
+RCPValue = Union[int, str]
+
+# Prefixes the console puts in front of an echoed command
+REPLY_STATUSES = ('OK', 'OKm', 'NOTIFY', 'ERROR')
+
+_PARAM_LINE = re.compile(
+    r'^(?:(OK|OKm|NOTIFY|ERROR)\s+)?(get|set)\s+(\S+)\s+(\d+)\s+(\d+)(?:\s+(.*?))?\s*$'
+)
+
+
+class RCPMessage(NamedTuple):
+    """A parsed get/set line, optionally prefixed by a console status"""
+    status: Optional[str]
+    verb: str
+    address: str
+    x: int
+    y: int
+    value: Optional[RCPValue]
+
+
+def parse_value(token: str) -> RCPValue:
+    """Convert an RCP value token to int, or to str for quoted strings"""
+    if token.startswith('"'):
+        return token[1:-1] if token.endswith('"') and len(token) > 1 else token[1:]
+    try:
+        return int(token)
+    except ValueError:
+        return token
+
+
+def format_value(value: RCPValue) -> str:
+    """Render a value as it appears on the wire"""
+    if isinstance(value, str):
+        return f'"{value}"'
+    return str(int(value))
+
+
+def parse_line(line: str) -> Optional[RCPMessage]:
+    """Parse a get/set line such as 'OK set MIXER:Current/InCh/Fader/On 0 0 1'"""
+    match = _PARAM_LINE.match(line)
+    if not match:
+        return None
+    status, verb, address, x, y, value = match.groups()
+    return RCPMessage(status, verb, address, int(x), int(y),
+                      parse_value(value) if value else None)
+
+
+def format_set(address: str, x: int, y: int, value: RCPValue) -> str:
+    """Build a set line without the trailing newline"""
+    return f"set {address} {x} {y} {format_value(value)}"
+
+
+def format_get(address: str, x: int, y: int) -> str:
+    """Build a get line without the trailing newline"""
+    return f"get {address} {x} {y}"
+
+
+class LineFramer:
+    """Incremental newline framer for an RCP byte stream
+
+    Bytes are appended to one ``bytearray``; each ``feed`` cuts every complete
+    line off the front in a single split, so a multi-megabyte burst costs one
+    pass no matter how it is chunked, instead of re-copying the remainder of
+    a text buffer for every line. A partial line longer than
+    ``max_line`` is discarded (counted in ``overflows``) so a misbehaving peer
+    cannot grow the buffer.
+    """
+
+    def __init__(self, max_line: int = 4096):
+        self.buffer = bytearray()
+        self.max_line = max_line
+        self.overflows = 0
+        self._skipping = False  # Dropping the rest of an oversized line
+
+    def feed(self, data: bytes) -> List[bytes]:
+        """Add received bytes and return every complete non-empty line, without newlines"""
+        buffer = self.buffer
+        buffer += data
+        end = buffer.rfind(b'\n')
+        lines = []
+        if end >= 0:
+            block = bytes(buffer[:end])
+            lines = block.split(b'\n')
+            del buffer[:end + 1]
+            if self._skipping:
+                del lines[0]
+                self._skipping = False
+            # Checked on the completed lines, not this read: a \r\n may be split across two reads
+            if b'\r' in block:
+                lines = [line.rstrip(b'\r') for line in lines]
+            lines = [line for line in lines if line]
+        if len(buffer) > self.max_line:
+            buffer.clear()
+            if not self._skipping:
+                self.overflows += 1
+            self._skipping = True
+        return lines
+
+    def feed_text(self, data: bytes) -> List[str]:
+        """Like ``feed`` but decoded and stripped, blank lines dropped"""
+        lines = []
+        for line in self.feed(data):
+            text = line.decode('utf-8', errors='replace').strip()
+            if text:
+                lines.append(text)
+        return lines
+
+
+_TOKEN = re.compile(r'"((?:[^"\\]|\\.)*)"?|(\S+)')
+
+
+def tokenize(line: str) -> List[RCPValue]:
+    """Split an RCP line into tokens: quoted strings (spaces kept), ints, bare words
+
+    'OK set MIXER:Current/InCh/Label/Name 0 0 "Lead Vox"' ->
+    ['OK', 'set', 'MIXER:Current/InCh/Label/Name', 0, 0, 'Lead Vox']
+    """
+    tokens: List[RCPValue] = []
+    for quoted, word in _TOKEN.findall(line):
+        if word:
+            try:
+                tokens.append(int(word))
+            except ValueError:
+                tokens.append(word)
+        else:
+            tokens.append(quoted.replace('\\"', '"'))
+    return tokens
+
+
+def command_lines(commands) -> Iterator[str]:
+    """Expand RCPCommand, BulkRCPCommand or plain strings into single RCP lines"""
+    for command in commands:
+        if isinstance(command, str):
+            text = command
+        elif hasattr(command, 'lines'):
+            yield from command.lines()
+            continue
+        else:
+            text = command.command
+        for line in text.split('\n'):
+            line = line.strip()
+            if line and not line.startswith('#'):
+                yield line
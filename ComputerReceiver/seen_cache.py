@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Seen-Message Cache for duplicate suppression
+Remembers recently handled message IDs with their reply, for a fixed time
+window and up to a fixed number of entries
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+class SeenCache:
+    """Bounded, time-windowed map of message ID to cached reply
+
+    Entries are kept in insertion order, which is also expiry order because
+    every entry lives for the same ``ttl``. Lookups and inserts are O(1);
+    expired entries are dropped from the old end as they are met, and the
+    oldest entry is evicted once ``max_entries`` is reached.
+    """
+
+    def __init__(self, max_entries: int = 10_000, ttl: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.evicted = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """The reply cached for ``key``, or None if it was not seen within the window"""
+        self._expire()
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: Hashable, reply: Any):
+        """Remember ``key`` as handled, with the reply to repeat for duplicates"""
+        self._expire()
+        self._entries.pop(key, None)
+        self._entries[key] = (self.clock() + self.ttl, reply)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evicted += 1
+
+    def _expire(self):
+        now = self.clock()
+        while self._entries:
+            key, (expires, _) = next(iter(self._entries.items()))
+            if expires > now:
+                break
+            del self._entries[key]
+
+    def __len__(self):
+        return len(self._entries)
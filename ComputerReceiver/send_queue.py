@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Priority Send Queue toward the console
+Token-bucket rate limiting with priority lanes so mutes always overtake
+queued fader ramps and label updates, and scene recalls jump the queue
+without being overwritten by writes queued before them
+"""
+
+import asyncio
+import inspect
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from rcp_protocol import command_lines, parse_line
+
+# Lanes, drained in this order
+URGENT = 0    # Mutes (…/On), scene recalls and the writes queued before a recall
+FADER = 1     # Levels, pans, sends and every other parameter
+METADATA = 2  # Labels, colours and icons
+LANE_NAMES = ('urgent', 'fader', 'metadata')
+
+METADATA_MARKERS = ('/Label/', '/Color', '/Icon')
+
+
+def classify(line: str) -> int:
+    """Pick the lane for one RCP line"""
+    if line.startswith('ssrecall_ex'):
+        return URGENT
+    message = parse_line(line)
+    if message is None:
+        return FADER
+    if message.verb == 'set' and message.address.endswith('/On'):
+        return URGENT
+    if any(marker in message.address for marker in METADATA_MARKERS):
+        return METADATA
+    return FADER
+
+
+def write_key(line: str) -> Optional[Tuple[str, int, int]]:
+    """The parameter a set line writes, None for anything else"""
+    message = parse_line(line)
+    if message is None or message.verb != 'set':
+        return None
+    return message.address, message.x, message.y
+
+
+@dataclass
+class LaneStats:
+    """Queue metrics for one lane"""
+    depth: int = 0
+    sent: int = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+
+    @property
+    def mean_wait(self) -> float:
+        return self.total_wait / self.sent if self.sent else 0.0
+
+
+class PrioritySendQueue:
+    """Rate-limited, prioritised buffer between the engine and a console connection
+
+    A token bucket refills at ``rate`` lines/second up to ``burst`` tokens.
+    Each time tokens are available the queue sends one burst, taken from the
+    urgent lane first, then faders, then metadata, so a fader ramp already in
+    the queue yields to a "mute channel 1" that arrives after it.
+
+    A scene recall is the exception: it overwrites fader and label values,
+    so anything still queued in the lower lanes is moved into the urgent
+    lane ahead of it rather than being sent after the recall and undoing it.
+    Lines submitted before ``bind``/``run`` attach a loop are held and queued
+    once it is known.
+
+    A sink that takes longer than ``timeout`` seconds is abandoned and the
+    queue is marked ``stalled`` until a burst gets through again; while
+    stalled a new write to a parameter that is still queued replaces the
+    queued value in place, so a desk that is down does not collect a
+    backlog of stale fader moves to flush when it comes back.
+    """
+
+    def __init__(self, sink: Callable[[List[str]], Any], rate: float = 500.0, burst: int = 40,
+                 clock: Callable[[], float] = time.monotonic, timeout: Optional[float] = None):
+        self.sink = sink
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.timeout = timeout
+        # Entries are [line, queued at, parameter key] so a superseding write can update them in place
+        self.lanes: Tuple[Deque[list], ...] = (deque(), deque(), deque())
+        self._latest: Dict[Tuple[str, int, int], list] = {}  # Queued entry per parameter
+        self.stats = tuple(LaneStats() for _ in LANE_NAMES)
+        self.tokens = float(burst)
+        self._refilled = clock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._bind_lock = threading.Lock()
+        self._early: List[str] = []  # Submitted before a loop was attached
+        self._wakeup = asyncio.Event()
+        self._stopped = False
+        self.promoted = 0  # Lower-lane lines moved ahead of a scene recall
+        self.stalled = False  # The last burst failed or timed out
+        self.superseded = 0  # Queued writes replaced by a newer value while stalled
+
+    def bind(self, loop: asyncio.AbstractEventLoop):
+        """Attach to the event loop that runs the queue"""
+        with self._bind_lock:
+            self._loop = loop
+            early, self._early = self._early, []
+        if early:
+            self._dispatch(loop, early)
+
+    def submit(self, commands):
+        """Queue RCPCommands, bulk commands or raw lines, safe from any thread"""
+        lines = list(command_lines(commands))
+        if not lines:
+            return
+        with self._bind_lock:
+            loop = self._loop
+            if loop is None:
+                self._early.extend(lines)
+                return
+        self._dispatch(loop, lines)
+
+    def _dispatch(self, loop: asyncio.AbstractEventLoop, lines: List[str]):
+        try:
+            on_loop = asyncio.get_running_loop() is loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            self._enqueue(lines)
+        else:
+            loop.call_soon_threadsafe(self._enqueue, lines)
+
+    @property
+    def depth(self) -> int:
+        return sum(len(lane) for lane in self.lanes)
+
+    def metrics(self) -> dict:
+        """Depth and wait times per lane, waits in milliseconds"""
+        return {
+            name: {
+                'depth': len(lane),
+                'sent': stats.sent,
+                'mean_wait_ms': round(stats.mean_wait * 1000, 3),
+                'max_wait_ms': round(stats.max_wait * 1000, 3),
+            }
+            for name, lane, stats in zip(LANE_NAMES, self.lanes, self.stats)
+        }
+
+    def take(self) -> List[str]:
+        """Pop as many lines as the bucket allows, highest priority first"""
+        now = self.clock()
+        self.tokens = min(self.burst, self.tokens + (now - self._refilled) * self.rate)
+        self._refilled = now
+        burst = []
+        for lane, stats in zip(self.lanes, self.stats):
+            while lane and self.tokens >= 1:
+                entry = lane.popleft()
+                line, queued, key = entry
+                if self._latest.get(key) is entry:
+                    del self._latest[key]
+                self.tokens -= 1
+                wait = now - queued
+                stats.sent += 1
+                stats.total_wait += wait
+                stats.max_wait = max(stats.max_wait, wait)
+                burst.append(line)
+            stats.depth = len(lane)
+        return burst
+
+    def delay(self) -> float:
+        """Seconds until the next token is available"""
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+    async def run(self):
+        """Drain the lanes until ``stop`` is called"""
+        if self._loop is not asyncio.get_running_loop():
+            self.bind(asyncio.get_running_loop())
+        while not self._stopped:
+            if not self.depth:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            burst = self.take()
+            if burst:
+                await self._emit(burst)
+            if self.depth:
+                await asyncio.sleep(self.delay())
+
+    def stop(self):
+        self._stopped = True
+        self._wakeup.set()
+
+    def _enqueue(self, lines: List[str]):
+        now = self.clock()
+        urgent = self.lanes[URGENT]
+        for line in lines:
+            lane = classify(line)
+            if line.startswith('ssrecall_ex'):
+                # Earlier writes must land before the recall, not overwrite it afterwards
+                for lower in self.lanes[FADER:]:
+                    self.promoted += len(lower)
+                    urgent.extend(lower)
+                    lower.clear()
+                self._latest.clear()
+            key = write_key(line)
+            queued = self._latest.get(key) if key is not None else None
+            if queued is not None and self.stalled:
+                queued[0] = line
+                self.superseded += 1
+                continue
+            entry = [line, now, key]
+            self.lanes[lane].append(entry)
+            if key is not None:
+                self._latest[key] = entry
+        for lane, stats in zip(self.lanes, self.stats):
+            stats.depth = len(lane)
+        self._wakeup.set()
+
+    async def _emit(self, burst: List[str]):
+        try:
+            result = self.sink(burst)
+            if inspect.isawaitable(result):
+                await asyncio.wait_for(result, self.timeout)
+            self.stalled = False
+        except asyncio.TimeoutError:
+            self.stalled = True
+            print(f"❌ Send queue sink took more than {self.timeout:g}s, dropped {len(burst)} lines")
+        except Exception as e:
+            self.stalled = True
+            print(f"❌ Send queue sink failed: {e}")
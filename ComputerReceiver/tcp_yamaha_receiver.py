@@ -4,53 +4,88 @@ TCP Receiver for Yamaha RCP Protocol
 Compatible with Yamaha TF, CL, QL, Rivage, DM3 series mixing consoles
 """
 
-import socket
+import asyncio
+import errno
 import json
 import threading
 from datetime import datetime
 import argparse
 import sys
+from async_logging import AsyncLogger, ConsoleSink, JsonLinesSink
+from command_coalescer import OutputCoalescer
+from command_scheduler import CommandScheduler
+from console_client import ConsoleConnection, ConsoleLoopThread, ConsolePool, RCP_PORT
+from console_router import ConsoleRouter, parse_route
+from console_state import ConsoleStateMirror
+from console_sync import resync_handler, warm_up
+from engine_pool import EnginePool
+from notify_consumer import NotifyConsumer
+from rcp_protocol import LineFramer, command_lines
+from send_queue import PrioritySendQueue
+from undo_journal import UndoJournal
+
+BACKLOG = 1024                 # Pending connections, e.g. a room of phones reconnecting at once
+WRITE_HIGH_WATER = 64 * 1024   # Unsent reply bytes per client before we stop reading from it
+DRAIN_TIMEOUT = 10.0           # Seconds a client may leave replies unread before it is dropped
+FORWARD_TIMEOUT = 5.0          # Seconds a burst may wait on the console before it is given up
 
 class YamahaTCPReceiver:
-    def __init__(self, host='0.0.0.0', port=49280):
+    def __init__(self, host='0.0.0.0', port=49280, console_host=None, console_port=RCP_PORT, rate=500.0,
+                 routes=None, log=None, workers=None):
         self.host = host
         self.port = port
-        self.server_socket = None
         self.is_running = False
-        self.clients = []
+        self.clients = {}  # StreamWriter -> handler task
+        self.loop = None
+        self._stop_requested = None
+        self._served = threading.Event()
+        self._stop_lock = threading.Lock()
+        self._stopped = False
+        # Hot-path messages are queued and written by a background thread
+        self.log = log or AsyncLogger([ConsoleSink()])
+        # Shared connection to the real console, used by every iOS client
+        self.console_host = console_host
+        self.console_port = console_port
+        self.mirror = ConsoleStateMirror() if console_host else None
+        # Changes made at the desk (or by other clients) keep the mirror current after warm-up
+        self.notifications = NotifyConsumer(self.mirror) if console_host else None
+        
+        # "In 10 seconds ..." and cue batches wait here, then go out like any other command
+        self.scheduler = CommandScheduler(self.dispatch_scheduled)
+        # "Undo" restores what the last batch changed, prior values come from the mirror
+        self.journal = UndoJournal(self.mirror if self.mirror is not None else ConsoleStateMirror())
+        # Warm VoiceCommandEngines in worker processes, parsing never blocks client I/O
+        self.engine = EnginePool(workers, self.scheduler, self.journal)
+        self.console = None
+        self.router = None
+        self.send_queue = None
+        self.coalescer = None
+        self.console_sync = None  # Future of the mirror warm-up on the console loop
+        if console_host:
+            pool = ConsolePool(self.open_console)
+            self.console = ConsoleLoopThread(pool)
+            sink = lambda lines: self.console.pool.send(console_host, console_port, lines)
+        elif routes:
+            # Several desks (e.g. FOH and monitors), each command goes to the consoles owning its namespace
+            self.console = ConsoleLoopThread()
+            self.router = ConsoleRouter(routes, self.console.pool)
+            sink = self.router.send
+        
+        if self.console:
+            # Mutes and recalls overtake fader moves, everything under the desk's rate limit
+            self.send_queue = PrioritySendQueue(sink, rate=rate, timeout=FORWARD_TIMEOUT)
+            self.send_queue.bind(self.console.loop)
+            self.console.submit(self.send_queue.run())
+            # Fader rides collapse to their last value before they are queued for the desk
+            self.coalescer = OutputCoalescer(self.send_queue.submit)
+            self.coalescer.bind(self.console.loop)
         
     def start_server(self):
+        """Serve clients on an asyncio event loop until stop_server (or Ctrl+C)"""
         try:
-            self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-            self.server_socket.bind((self.host, self.port))
-            self.server_socket.listen(5)
-            self.is_running = True
-            
-            print(f"🎛️  Yamaha RCP TCP Receiver listening on {self.host}:{self.port}")
-            print("📱 Ready for iOS Voice Control app connections")
-            print("🎵 Compatible with Yamaha TF, CL, QL, Rivage, DM3 series")
-            print("🔄 Waiting for connections...\n")
-            
-            while self.is_running:
-                try:
-                    client_socket, addr = self.server_socket.accept()
-                    print(f"📱 New connection from {addr[0]}:{addr[1]}")
-                    
-                    # Handle client in separate thread
-                    client_thread = threading.Thread(
-                        target=self.handle_client, 
-                        args=(client_socket, addr)
-                    )
-                    client_thread.daemon = True
-                    client_thread.start()
-                    
-                except Exception as e:
-                    if self.is_running:
-                        print(f"❌ Error accepting connection: {e}")
-                        
+            asyncio.run(self.serve())
         except OSError as e:
-            if e.errno == 48:  # Address already in use
+            if e.errno in (errno.EADDRINUSE, 48):  # Address already in use (48 on macOS)
                 print(f"❌ Port {self.port} is already in use.")
                 print(f"💡 Try: sudo lsof -i :{self.port} to find what's using it")
                 sys.exit(1)
@@ -58,147 +93,218 @@ class YamahaTCPReceiver:
                 print(f"❌ Failed to start server: {e}")
                 sys.exit(1)
     
-    def handle_client(self, client_socket, addr):
+    async def serve(self):
+        """Accept clients until stop_server; every client is one coroutine, not a thread"""
+        self._stop_requested = asyncio.Event()
+        self.loop = asyncio.get_running_loop()
+        if self._stopped:  # stop_server ran before the loop existed
+            self._stop_requested.set()
+        server = await asyncio.start_server(self.handle_client, self.host, self.port,
+                                            reuse_address=True, backlog=BACKLOG)
+        self.port = server.sockets[0].getsockname()[1]
+        self.is_running = True
+        
+        print(f"🎛️  Yamaha RCP TCP Receiver listening on {self.host}:{self.port}")
+        print("📱 Ready for iOS Voice Control app connections")
+        print("🎵 Compatible with Yamaha TF, CL, QL, Rivage, DM3 series")
+        print("🔄 Waiting for connections...\n")
+        
+        if self.mirror is not None:
+            self.console_sync = self.console.submit(self.sync_console())
+            self.console_sync.add_done_callback(self._report_console_error)
+        warm_up_engines = asyncio.ensure_future(self.engine.start())
+        scheduler = asyncio.ensure_future(self.scheduler.run())
+        
+        try:
+            await self._stop_requested.wait()
+        finally:
+            # Stop accepting, then close every client and wait for their handlers to finish
+            self.is_running = False
+            server.close()
+            for writer in list(self.clients):
+                writer.close()
+            if self.clients:
+                await asyncio.gather(*self.clients.values(), return_exceptions=True)
+            await server.wait_closed()
+            if not warm_up_engines.done():
+                warm_up_engines.cancel()
+            scheduler.cancel()
+            self.loop = None
+            self._served.set()
+    
+    async def handle_client(self, reader, writer):
         """Handle individual client connection"""
-        self.clients.append(client_socket)
-        buffer = ""
+        addr = writer.get_extra_info('peername')
+        self.clients[writer] = asyncio.current_task()
+        writer.transport.set_write_buffer_limits(high=WRITE_HIGH_WATER)
+        framer = LineFramer(max_line=64 * 1024)
+        self.log.info("📱 New connection from {ip}:{port}", ip=addr[0], port=addr[1])
         
         try:
             while self.is_running:
-                data = client_socket.recv(1024)
+                data = await reader.read(65536)
                 if not data:
                     break
-                    
-                # Decode and add to buffer
-                buffer += data.decode('utf-8')
                 
                 # Process complete messages (newline-delimited for RCP)
-                while '\n' in buffer:
-                    message, buffer = buffer.split('\n', 1)
-                    if message.strip():
-                        self.process_message(message.strip(), addr, client_socket)
+                for message in framer.feed_text(data):
+                    if writer.is_closing():  # Server stopping while this chunk was parsed
+                        break
+                    await self.process_message(message, addr, writer)
+                
+                # Backpressure: stop reading from a client that is not reading its replies
+                if writer.transport.get_write_buffer_size() > WRITE_HIGH_WATER:
+                    await asyncio.wait_for(writer.drain(), DRAIN_TIMEOUT)
                         
+        except asyncio.TimeoutError:
+            self.log.error("❌ Client {ip} stopped reading replies, disconnecting", ip=addr[0])
         except Exception as e:
-            print(f"❌ Error handling client {addr[0]}: {e}")
+            if self.is_running:
+                self.log.error("❌ Error handling client {ip}: {error}", ip=addr[0], error=str(e) or type(e).__name__)
         finally:
-            if client_socket in self.clients:
-                self.clients.remove(client_socket)
-            client_socket.close()
-            print(f"🔌 Disconnected: {addr[0]}:{addr[1]}")
+            self.clients.pop(writer, None)
+            writer.close()
+            self.log.info("🔌 Disconnected: {ip}:{port}", ip=addr[0], port=addr[1])
     
-    def process_message(self, message, addr, client_socket):
+    async def process_message(self, message, addr, writer):
         """Process incoming message and convert to RCP if needed"""
-        timestamp = datetime.now().strftime('%H:%M:%S')
-        
         try:
             # Try to parse as JSON first (from iOS app)
             data = json.loads(message)
-            self.handle_ios_message(data, addr, client_socket)
         except json.JSONDecodeError:
+            data = None
+        if isinstance(data, dict):
+            await self.handle_ios_message(data, addr, writer)
+        else:
             # Handle as plain RCP command
-            self.handle_rcp_command(message, addr, client_socket)
+            self.handle_rcp_command(message, addr, writer)
     
-    def handle_ios_message(self, data, addr, client_socket):
+    async def handle_ios_message(self, data, addr, writer):
         """Handle structured message from iOS Voice Control app"""
-        timestamp = datetime.now().strftime('%H:%M:%S')
         content = data.get('content', '')
         
-        print(f"📱 [{timestamp}] iOS Voice Message from {addr[0]}")
-        print(f"   🗣️  Speech: \"{content}\"")
+        # Convert voice command to RCP, other clients keep being served meanwhile
+        result = await self.voice_to_rcp(content)
+        self.log.info("📱 iOS Voice Message from {ip}\n   🗣️  Speech: \"{speech}\"\n   {result}",
+                      ip=addr[0], speech=content, rcp_commands=result.lines,
+                      parse_ms=round(result.elapsed * 1000, 3),
+                      result="\n   ".join(f"🎛️  RCP Command: {line}" for line in result.lines)
+                      or "\n   ".join(f"⏱️  {description}" for description in result.descriptions)
+                      or "❓ Could not convert to RCP command")
+        if result.lines:
+            # Send every resulting RCP command to the consoles as one burst
+            self.forward_to_yamaha(result.lines)
         
-        # Convert voice command to RCP
-        rcp_command = self.voice_to_rcp(content)
-        if rcp_command:
-            print(f"   🎛️  RCP Command: {rcp_command}")
-            
-            # Send RCP command to any connected Yamaha consoles
-            self.forward_to_yamaha(rcp_command)
-            
-            # Send acknowledgment back to iOS
+        if result.descriptions:
+            # Send acknowledgment back to iOS, scheduling commands have no lines to send yet
             response = json.dumps({
-                "status": "converted_to_rcp",
-                "rcp_command": rcp_command,
+                "status": "converted_to_rcp" if result.lines else "handled",
+                "rcp_command": result.lines[0] if result.lines else None,
+                "rcp_commands": result.lines,
+                "descriptions": result.descriptions,
                 "timestamp": datetime.now().isoformat()
             })
-            client_socket.send((response + '\n').encode('utf-8'))
-        else:
-            print(f"   ❓ Could not convert to RCP command")
-        
-        print("")
+            writer.write((response + '\n').encode('utf-8'))
     
-    def handle_rcp_command(self, command, addr, client_socket):
+    def handle_rcp_command(self, command, addr, writer):
         """Handle direct RCP command"""
-        timestamp = datetime.now().strftime('%H:%M:%S')
-        print(f"🎛️  [{timestamp}] Direct RCP from {addr[0]}: {command}")
+        self.log.info("🎛️  Direct RCP from {ip}: {command}", ip=addr[0], command=command)
         
         # Forward to any connected Yamaha consoles
-        self.forward_to_yamaha(command)
-        print("")
+        self.forward_to_yamaha([command])
     
-    def voice_to_rcp(self, voice_text):
-        """Convert natural language to Yamaha RCP commands"""
-        voice_lower = voice_text.lower()
-        
-        # Channel fader controls
-        if 'channel' in voice_lower and any(level in voice_lower for level in ['unity', 'zero', '0']):
-            # Extract channel number
-            for word in voice_text.split():
-                if word.isdigit():
-                    ch = int(word)
-                    if 1 <= ch <= 32:  # Typical channel range
-                        return f"set MIXER:Current/InCh/Fader/Level {ch-1} 0 0"
-        
-        elif 'mute' in voice_lower and 'channel' in voice_lower:
-            for word in voice_text.split():
-                if word.isdigit():
-                    ch = int(word)
-                    if 1 <= ch <= 32:
-                        return f"set MIXER:Current/InCh/Fader/On {ch-1} 0 0"
-        
-        elif 'unmute' in voice_lower and 'channel' in voice_lower:
-            for word in voice_text.split():
-                if word.isdigit():
-                    ch = int(word)
-                    if 1 <= ch <= 32:
-                        return f"set MIXER:Current/InCh/Fader/On {ch-1} 0 1"
-        
-        elif 'gain' in voice_lower and 'channel' in voice_lower:
-            # Basic gain control - would need more sophisticated parsing
-            for word in voice_text.split():
-                if word.isdigit():
-                    ch = int(word)
-                    if 1 <= ch <= 32:
-                        return f"set MIXER:Current/InCh/Gain {ch-1} 0 0"
+    async def voice_to_rcp(self, voice_text):
+        """Convert natural language to Yamaha RCP commands with the full engine, in a worker"""
+        return await self.engine.translate(voice_text)
+    
+    def forward_to_yamaha(self, lines):
+        """Coalesce RCP lines, then queue them for the Yamaha console by priority, sent pipelined"""
+        if self.console is None:
+            self.log.info("   📤 Would send to Yamaha: {commands}", commands=" | ".join(lines))
+            return
         
-        return None
+        self.coalescer.submit(lines)
+        target = self.console_host or ", ".join(self.router.targets)
+        self.log.info("   📤 Forwarding to Yamaha {target}: {commands}", target=target, commands=" | ".join(lines))
     
-    def forward_to_yamaha(self, rcp_command):
-        """Forward RCP command to actual Yamaha console (future implementation)"""
-        # Future: Connect to actual Yamaha console on port 49280
-        # For now, just log what would be sent
-        print(f"   📤 Would send to Yamaha: {rcp_command}")
+    def open_console(self, host, port):
+        """Connection factory for the console pool"""
+        # Reconnects resync the mirror and replay only commands the desk never applied
+        connection = ConsoleConnection(host, port, on_reconnect=resync_handler(self.mirror))
+        connection.line_handlers.append(self.notifications.on_line)
+        return connection
     
-    def stop_server(self):
-        """Gracefully stop the server"""
-        self.is_running = False
-        for client in self.clients:
-            client.close()
-        if self.server_socket:
-            self.server_socket.close()
+    def dispatch_scheduled(self, batch):
+        """Send a scheduled batch whose time or cue has come"""
+        self.log.info("⏱️  Running scheduled #{batch_id}: {label}", batch_id=batch.batch_id, label=batch.label)
+        lines = list(command_lines(batch.commands))
+        self.journal.record(lines, batch.label)
+        self.forward_to_yamaha(lines)
+    
+    async def sync_console(self):
+        """Warm the state mirror with a full dump of the console"""
+        connection = await self.console.pool.get(self.console_host, self.console_port)
+        await warm_up(connection, self.mirror)
+    
+    def _report_console_error(self, future):
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            self.log.error("❌ Console {host}:{port} error: {error}",
+                           host=self.console_host, port=self.console_port, error=str(error))
+    
+    def stop_server(self, timeout=5.0):
+        """Gracefully stop the server, safe to call from any thread and more than once"""
+        with self._stop_lock:
+            if self._stopped:
+                return
+            self._stopped = True
+        loop = self.loop
+        if loop is not None and loop.is_running():
+            loop.call_soon_threadsafe(self._stop_requested.set)
+            try:
+                on_loop = asyncio.get_running_loop() is loop
+            except RuntimeError:
+                on_loop = False
+            if not on_loop:
+                self._served.wait(timeout)
+        if self.console:
+            if self.console_sync is not None:
+                self.console_sync.cancel()  # A warm-up still running would outlive the loop
+            self.console.loop.call_soon_threadsafe(self.send_queue.stop)
+            self.console.stop()
+        self.engine.close()
+        self.log.close()
 
 def main():
     parser = argparse.ArgumentParser(description='Yamaha RCP TCP Receiver for iOS Voice Control')
     parser.add_argument('--port', type=int, default=49280, help='Port to listen on (default: 49280 - Yamaha RCP)')
     parser.add_argument('--host', default='0.0.0.0', help='Host to bind to (default: 0.0.0.0)')
     parser.add_argument('--dev-port', type=int, default=8080, help='Development port for iOS testing (default: 8080)')
+    parser.add_argument('--console', help='Yamaha console IP to forward RCP commands to (default: log only)')
+    parser.add_argument('--console-port', type=int, default=RCP_PORT, help='Yamaha console RCP port (default: 49280)')
+    parser.add_argument('--rate', type=float, default=500.0, help='Maximum commands/second sent to the console (default: 500)')
+    parser.add_argument('--route', action='append', default=[], metavar='NAME=HOST[:PORT][/NS,...][@CATALOG]',
+                        help='Route namespaces to a console, repeatable, with an optional catalog CSV for its model '
+                             '(e.g. mon=192.168.0.129/Mix,Scene@tf1.csv)')
+    parser.add_argument('--log-file', help='Also write structured JSON-lines logs to this file')
+    parser.add_argument('--workers', type=int, help='Voice engine worker processes, 0 parses inline (default: up to 4)')
     args = parser.parse_args()
     
+    try:
+        routes = [parse_route(spec) for spec in args.route]
+    except ValueError as e:
+        parser.error(str(e))
+    
     if args.port == 49280:
         print("🎛️  Starting in YAMAHA RCP MODE (port 49280)")
     else:
         print(f"🔧 Starting in DEVELOPMENT MODE (port {args.port})")
     
-    receiver = YamahaTCPReceiver(args.host, args.port)
+    sinks = [ConsoleSink()] + ([JsonLinesSink(args.log_file)] if args.log_file else [])
+    receiver = YamahaTCPReceiver(args.host, args.port, args.console, args.console_port, args.rate, routes,
+                                 AsyncLogger(sinks), args.workers)
     
     try:
         receiver.start_server()
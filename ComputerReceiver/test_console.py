@@ -0,0 +1,638 @@
+#!/usr/bin/env python3
+"""
+Test script for the console-side pipeline
+Exercises coalescing, the console connection and the state mirror locally,
+no Yamaha desk required
+"""
+
+import asyncio
+import dataclasses
+import socket
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from command_coalescer import OutputCoalescer
+from console_client import ConsoleConnection, ConsolePool, RCPError, RCPTimeout, ReplayBuffer, _Pending, request_key
+from console_router import ConsoleRouter, ConsoleTarget, parse_route
+from console_simulator import ConsoleSimulator
+from console_state import DEFAULT_CATALOG, AddressTable, ConsoleStateMirror
+from console_sync import resync_handler, sync_mirror
+from notify_consumer import NotifyConsumer
+from rcp_protocol import LineFramer, tokenize
+from send_queue import PrioritySendQueue
+from test_support import report, summarize
+from traffic_recorder import INDEX as INDEX_ENTRY, RECEIVED, SENT, TrafficReader, TrafficRecorder, replay
+
+
+class StandInConsole:
+    """Minimal local console that answers every line with OK
+
+    Lines mentioning an unknown address get a bare ``ERROR`` like a real desk,
+    and ``delay`` holds each reply back without blocking later ones.
+    """
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.connections = 0
+        self.lines = []
+        self.server = None
+        self.port = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, '127.0.0.1', 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                data = await reader.readline()
+                if not data:
+                    break
+                line = data.decode().strip()
+                self.lines.append(line)
+                reply = f"ERROR {line.split()[0]} UnknownAddress\n" if 'Bogus' in line else f"OK {line}\n"
+                if self.delay:
+                    asyncio.get_running_loop().call_later(self.delay, writer.write, reply.encode())
+                else:
+                    writer.write(reply.encode())
+        except ConnectionError:
+            pass
+        writer.close()
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+
+def test_output_coalescer():
+    """Test that fader rides collapse while mutes pass straight through"""
+    bursts = []
+
+    async def run():
+        coalescer = OutputCoalescer(bursts.append, window=0.01)
+        coalescer.submit([
+            "set MIXER:Current/InCh/Fader/Level 0 0 -1000",
+            "set MIXER:Current/InCh/Fader/Level 0 0 -900",
+            "set MIXER:Current/InCh/Fader/On 3 0 0",
+            "set MIXER:Current/InCh/Fader/Level 0 0 -800",
+        ])
+        immediate = list(bursts)
+        await asyncio.sleep(0.03)
+        coalescer.submit(["set MIXER:Current/InCh/Fader/Level 1 0 0", "ssrecall_ex scene_01"])
+        return coalescer, immediate
+
+    coalescer, immediate = asyncio.run(run())
+    return report("🧹 Testing Output Coalescer", [
+        ("mute sent immediately", immediate == [["set MIXER:Current/InCh/Fader/On 3 0 0"]]),
+        ("fader ride collapsed to last value", bursts[1] == ["set MIXER:Current/InCh/Fader/Level 0 0 -800"]),
+        ("recall flushes pending writes first", bursts[2:] == [["set MIXER:Current/InCh/Fader/Level 1 0 0"], ["ssrecall_ex scene_01"]]),
+        ("coalesced count", coalescer.coalesced == 2),
+    ])
+
+
+def test_console_pool():
+    """Test that every sender shares one persistent, low-latency connection"""
+
+    async def run():
+        console = await StandInConsole().start()
+        pool = ConsolePool()
+        await asyncio.gather(*(
+            pool.send('127.0.0.1', console.port, [f"set MIXER:Current/InCh/Fader/On {ch} 0 0"])
+            for ch in range(8)
+        ))
+        connection = await pool.get('127.0.0.1', console.port)
+        sock = connection.writer.get_extra_info('socket')
+        nodelay = sock.getsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY)
+
+        start = time.perf_counter()
+        await connection.request("get MIXER:Current/InCh/Fader/Level 0 0")
+        round_trip = time.perf_counter() - start
+
+        await pool.close_all()
+        await console.stop()
+        return console, nodelay, round_trip
+
+    console, nodelay, round_trip = asyncio.run(run())
+    print(f"  Round trip to stand-in console: {round_trip * 1000:.2f} ms")
+    return report("🔌 Testing Console Pool", [
+        ("one connection for all senders", console.connections == 1),
+        ("all lines delivered", len(console.lines) == 9),
+        ("TCP_NODELAY enabled", nodelay != 0),
+        ("round trip under 10 ms", round_trip < 0.01),
+    ])
+
+
+def test_pipelined_requests():
+    """Test that a 40-channel burst costs about one round trip and errors stay per command"""
+
+    async def run():
+        console = await StandInConsole(delay=0.02).start()
+        pool = ConsolePool()
+        connection = await pool.get('127.0.0.1', console.port)
+        lines = [f"set MIXER:Current/InCh/Fader/Level {ch} 0 -1000" for ch in range(40)]
+        lines[7] = "set MIXER:Current/Bogus 0 0 1"
+
+        start = time.perf_counter()
+        futures = await connection.request_many(lines)
+        results = await asyncio.gather(*futures, return_exceptions=True)
+        elapsed = time.perf_counter() - start
+
+        await pool.close_all()
+        await console.stop()
+        return results, elapsed, connection.in_flight
+
+    results, elapsed, in_flight = asyncio.run(run())
+    print(f"  40 pipelined requests with 20 ms replies: {elapsed * 1000:.1f} ms")
+    errors = [i for i, r in enumerate(results) if isinstance(r, RCPError)]
+    return report("🚀 Testing Pipelined Requests", [
+        ("ERROR surfaces on the failing command only", errors == [7]),
+        ("replies matched to their requests", results[39].request.endswith("39 0 -1000")),
+        ("whole burst in about one round trip", elapsed < 0.1),
+        ("nothing left in flight", in_flight == 0),
+    ])
+
+
+def test_reply_timeouts():
+    """Test that lines the desk drops time out and free their slots instead of blocking sends"""
+
+    async def run():
+        simulator = ConsoleSimulator(drop_rate=1.0)
+        port = await simulator.start('127.0.0.1', 0)
+        connection = ConsoleConnection('127.0.0.1', port, max_in_flight=4, reply_timeout=0.1)
+        await connection.connect()
+        lost = await connection.request_many([f"set MIXER:Current/InCh/Fader/Level {ch} 0 0" for ch in range(4)])
+
+        # The window is full of lost lines: an urgent mute must still get out
+        start = time.perf_counter()
+        await asyncio.wait_for(connection.send_lines(["set MIXER:Current/InCh/Fader/On 0 0 0"]), 2.0)
+        blocked = time.perf_counter() - start
+        errors = await asyncio.gather(*lost, return_exceptions=True)
+        single = await asyncio.gather(connection.request("get MIXER:Current/InCh/Fader/On 0 0"),
+                                      return_exceptions=True)
+
+        simulator.drop_rate = 0.0
+        answered = await connection.request("get MIXER:Current/InCh/Fader/On 1 0")
+        await asyncio.sleep(0.2)
+        state = (connection.in_flight, len(connection._order), dict(connection._by_key), connection.timeouts)
+        await connection.close()
+        after_close = await asyncio.gather(connection.send_lines(["set MIXER:Current/InCh/Fader/On 0 0 1"]),
+                                           return_exceptions=True)
+        reopened = connection.connected
+        await simulator.stop()
+        return blocked, errors, single, answered, state, (after_close[0], reopened)
+
+    blocked, errors, single, answered, (in_flight, order, by_key, timeouts), (after_close, reopened) = asyncio.run(run())
+    print(f"  Send behind 4 lost lines waited {blocked * 1000:.0f} ms")
+    return report("⏳ Testing Reply Timeouts", [
+        ("full window of lost lines frees up", blocked < 1.0),
+        ("lost requests fail with a timeout", all(isinstance(e, RCPTimeout) for e in errors)),
+        ("single request times out", isinstance(single[0], RCPTimeout)),
+        ("connection keeps working afterwards", answered.status == 'OK'),
+        ("no slots or pending entries leak", in_flight == 0 and order == 0 and not by_key),
+        ("timeouts counted", timeouts == 6),
+        ("send after close fails instead of reconnecting", isinstance(after_close, ConnectionError) and not reopened),
+    ])
+
+
+def test_console_simulator():
+    """Test simulator replies, NOTIFY fan-out, latency and drops"""
+
+    async def run():
+        simulator = ConsoleSimulator(latency=0.01)
+        port = await simulator.start('127.0.0.1', 0)
+        sender = ConsoleConnection('127.0.0.1', port)
+        listener = ConsoleConnection('127.0.0.1', port)
+        await sender.connect()
+        await listener.connect()
+        notifies = []
+        listener.line_handlers.append(notifies.append)
+
+        start = time.perf_counter()
+        reply = await sender.request("set MIXER:Current/InCh/Fader/Level 2 0 -1000")
+        latency = time.perf_counter() - start
+        clamped = await sender.request("set MIXER:Current/InCh/Fader/Level 2 0 99999")
+        got = await sender.request("get MIXER:Current/InCh/Fader/Level 2 0")
+        errors = await asyncio.gather(
+            sender.request("get MIXER:Current/Bogus 0 0"),
+            sender.request("get MIXER:Current/InCh/Fader/Level 999 0"),
+            return_exceptions=True)
+        recall = await sender.request("ssrecall_ex scene_01")
+        await asyncio.sleep(0.02)
+
+        simulator.drop_rate = 1.0
+        pending = asyncio.ensure_future(sender.request("get MIXER:Current/InCh/Fader/On 0 0"))
+        dropped = await asyncio.wait([pending], timeout=0.05)
+        pending.cancel()
+
+        await sender.close()
+        await listener.close()
+        await simulator.stop()
+        return reply, latency, clamped, got, errors, recall, notifies, dropped
+
+    reply, latency, clamped, got, errors, recall, notifies, (done, _) = asyncio.run(run())
+    return report("🎚️ Testing Console Simulator", [
+        ("set answered with OK", reply.status == 'OK'),
+        ("latency applied", latency >= 0.01),
+        ("out-of-range set answered with OKm", clamped.status == 'OKm' and clamped.value == 1000),
+        ("get returns stored value", got.value == 1000),
+        ("unknown address and index answered with ERROR", all(isinstance(e, RCPError) for e in errors)),
+        ("scene recall answered", recall.status == 'OK'),
+        ("other connection notified", notifies == [
+            "NOTIFY set MIXER:Current/InCh/Fader/Level 2 0 -1000",
+            "NOTIFY set MIXER:Current/InCh/Fader/Level 2 0 1000",
+            "NOTIFY ssrecall_ex scene_01",
+        ]),
+        ("dropped command never answered", not done),
+    ])
+
+
+def test_notify_consumer():
+    """Test incremental NOTIFY framing, mirror updates and bounded subscribers"""
+    framer = LineFramer(max_line=64)
+    framed = framer.feed(b"NOTIFY set A 0 0 1\nNOTI") + framer.feed(b"FY set B 0 0 2\r\n")
+    framer.feed(b"x" * 100)
+    recovered = framer.feed(b"tail of junk\nNOTIFY set C 0 0 3\n")
+
+    mirror = ConsoleStateMirror()
+    consumer = NotifyConsumer(mirror)
+    events = []
+    consumer.subscribe(events.append)
+    subscription = consumer.subscribe()
+
+    # Someone grabs a fader bank: 8 channels x 500 steps, split into odd chunks
+    stream = b"".join(
+        f"NOTIFY set MIXER:Current/InCh/Fader/Level {ch} 0 {-step * 10}\n".encode()
+        for step in range(1, 501) for ch in range(8))
+    start = time.perf_counter()
+    for offset in range(0, len(stream), 1000):
+        consumer.feed(stream[offset:offset + 1000])
+    elapsed = time.perf_counter() - start
+    consumer.feed(b"OK set MIXER:Current/InCh/Fader/On 0 0 0\nNOTIFY ssrecall_ex scene_02\n")
+    batch = asyncio.run(subscription.get_batch())
+
+    print(f"  4000 NOTIFY lines consumed in {elapsed * 1000:.1f} ms")
+    return report("🔔 Testing NOTIFY Consumer", [
+        ("lines framed across chunks", framed == [b"NOTIFY set A 0 0 1", b"NOTIFY set B 0 0 2"]),
+        ("oversized line dropped, stream recovers", recovered == [b"NOTIFY set C 0 0 3"] and framer.overflows == 1),
+        ("mirror follows the desk", mirror.get("MIXER:Current/InCh/Fader/Level", 7, 0) == -5000),
+        ("every change published to callbacks", len(events) == 4001),
+        ("subscriber backlog bounded per parameter", len(batch) == 9 and batch[-1].value == "scene_02"),
+        ("replies ignored", consumer.ignored == 1),
+        ("framer buffer drained", len(consumer.framer.buffer) == 0),
+    ])
+
+
+def test_console_sync():
+    """Test that a bulk dump brings a fresh mirror in line with the desk"""
+
+    async def run():
+        simulator = ConsoleSimulator()
+        simulator.mirror.set("MIXER:Current/InCh/Fader/Level", 12, 0, -2500)
+        simulator.mirror.set("MIXER:Current/InCh/Label/Name", 3, 0, "Kick")
+        port = await simulator.start('127.0.0.1', 0)
+        connection = ConsoleConnection('127.0.0.1', port)
+        await connection.connect()
+        mirror = ConsoleStateMirror(simulator.mirror.table)
+        steps = []
+        result = await sync_mirror(connection, mirror, window=128,
+                                   progress=lambda done, total: steps.append(done))
+        await connection.close()
+        await simulator.stop()
+        return simulator, mirror, result, steps
+
+    simulator, mirror, result, steps = asyncio.run(run())
+    print(f"  {result.requested} parameters synced in {result.elapsed * 1000:.0f} ms")
+    return report("📥 Testing Console Sync", [
+        ("every supported parameter requested", result.requested == 5095),
+        ("every reply applied", result.complete and result.errors == 0),
+        ("mirror matches the desk", mirror.values == simulator.mirror.values),
+        ("progress reported to completion", steps[-1] == result.requested),
+        ("synced in well under a second", result.elapsed < 1.0),
+    ])
+
+
+def test_priority_send_queue():
+    """Test that an emergency mute overtakes a long fader ramp under the rate limit"""
+    sent = []
+
+    async def run():
+        queue = PrioritySendQueue(lambda lines: sent.append((time.perf_counter(), lines)), rate=1000, burst=10)
+        task = asyncio.create_task(queue.run())
+        queue.submit([f"set MIXER:Current/InCh/Fader/Level 0 0 {-i * 10}" for i in range(200)])
+        queue.submit(["set MIXER:Current/InCh/Label/Name 0 0 \"Vox\""])
+        await asyncio.sleep(0.02)
+        queue.submit(["set MIXER:Current/InCh/Fader/On 0 0 0"])
+        start = time.perf_counter()
+        while queue.depth:
+            await asyncio.sleep(0.005)
+        queue.stop()
+        await task
+        return queue, start
+
+    queue, start = asyncio.run(run())
+    lines = [line for _, burst in sent for line in burst]
+    mute_at = next(at for at, burst in sent if "set MIXER:Current/InCh/Fader/On 0 0 0" in burst)
+    elapsed = sent[-1][0] - sent[0][0]
+    metrics = queue.metrics()
+    print(f"  Mute waited {(mute_at - start) * 1000:.1f} ms behind a 200-step ramp; "
+          f"fader max wait {metrics['fader']['max_wait_ms']:.0f} ms")
+    return report("🚦 Testing Priority Send Queue", [
+        ("mute sent within 10 ms", mute_at - start < 0.01),
+        ("mute overtook queued fader moves", lines.index("set MIXER:Current/InCh/Fader/On 0 0 0") < 100),
+        ("label sent last", lines[-1].startswith("set MIXER:Current/InCh/Label/Name")),
+        ("rate limit respected", elapsed >= (len(lines) - 10) / 1000 * 0.9),
+        ("metrics per lane", metrics['urgent']['sent'] == 1 and metrics['fader']['depth'] == 0),
+    ])
+
+
+def test_stalled_send_queue():
+    """Test that a hung console is given up on and stale writes collapse instead of piling up"""
+    sent = []
+
+    async def run():
+        desk_up = asyncio.Event()
+
+        async def sink(lines):
+            await desk_up.wait()
+            sent.extend(lines)
+
+        queue = PrioritySendQueue(sink, rate=10_000, burst=10, timeout=0.05)
+        task = asyncio.create_task(queue.run())
+        queue.submit(["set MIXER:Current/InCh/Fader/Level 0 0 0"])
+        while not queue.stalled:
+            await asyncio.sleep(0.01)
+        queue.submit([f"set MIXER:Current/InCh/Fader/Level {ch} 0 {-i}" for i in range(1000) for ch in range(2)])
+        queue.submit(["set MIXER:Current/InCh/Fader/On 0 0 0", "set MIXER:Current/InCh/Fader/On 0 0 1"])
+        depth = queue.depth
+        desk_up.set()
+        while queue.depth:
+            await asyncio.sleep(0.005)
+        await asyncio.sleep(0.01)
+        queue.stop()
+        await task
+        return queue, depth
+
+    queue, depth = asyncio.run(run())
+    return report("🧊 Testing Stalled Send Queue", [
+        ("hung sink is given up, queue recovers", not queue.stalled),
+        ("stale writes collapse while stalled", depth == 3 and queue.superseded == 1999),
+        ("latest values sent once the desk is back", sent == ["set MIXER:Current/InCh/Fader/On 0 0 1",
+                                                             "set MIXER:Current/InCh/Fader/Level 0 0 -999",
+                                                             "set MIXER:Current/InCh/Fader/Level 1 0 -999"]),
+    ])
+
+
+def test_scene_recall_ordering():
+    """Test that a recall never overtakes fader writes queued before it, and early submits are kept"""
+    sent = []
+    queue = PrioritySendQueue(sent.extend, rate=1000, burst=4)
+    queue.submit(["set MIXER:Current/InCh/Fader/Level 0 0 -1000"])  # Before any loop is attached
+
+    async def run():
+        submitter = threading.Thread(target=queue.submit, args=(["set MIXER:Current/InCh/Fader/Level 1 0 -1000"],))
+        submitter.start()
+        submitter.join()
+        task = asyncio.create_task(queue.run())
+        await asyncio.sleep(0)
+        queue.submit([f"set MIXER:Current/InCh/Fader/Level 2 0 {-i * 10}" for i in range(20)])
+        queue.submit(["set MIXER:Current/InCh/Label/Name 2 0 \"Gtr\"", "ssrecall_ex scene_05",
+                      "set MIXER:Current/InCh/Fader/Level 3 0 0"])
+        queue.submit(["set MIXER:Current/InCh/Fader/On 4 0 0"])
+        while queue.depth:
+            await asyncio.sleep(0.005)
+        queue.stop()
+        await task
+
+    asyncio.run(run())
+    recall = sent.index("ssrecall_ex scene_05")
+    return report("🎬 Testing Scene Recall Ordering", [
+        ("lines submitted before the loop are sent", sent[:2] == ["set MIXER:Current/InCh/Fader/Level 0 0 -1000",
+                                                                "set MIXER:Current/InCh/Fader/Level 1 0 -1000"]),
+        ("queued fader and label writes land before the recall", recall == 23 and all(
+            "InCh/Fader/Level 2" in line or "Label" in line for line in sent[2:recall])),
+        ("later writes stay after the recall", sent.index("set MIXER:Current/InCh/Fader/Level 3 0 0") > recall),
+        ("mute after the recall still overtakes later faders", sent[recall + 1] == "set MIXER:Current/InCh/Fader/On 4 0 0"),
+        ("promotions counted", queue.promoted == 21),
+    ])
+
+
+def test_reconnect_and_replay():
+    """Test that a dropped link reconnects, resyncs and replays only lost commands"""
+    buffer = ReplayBuffer(max_entries=2)
+    for line in ["set A 0 0 1", "set A 0 0 2", "set B 0 0 1", "get C 0 0", "set D 0 0 1"]:
+        buffer.track(_Pending(line, request_key(line), None))
+
+    async def run():
+        simulator = ConsoleSimulator(max_rate=20000)
+        port = await simulator.start('127.0.0.1', 0)
+        mirror = ConsoleStateMirror(simulator.mirror.table)
+        connection = ConsoleConnection('127.0.0.1', port, on_reconnect=resync_handler(mirror))
+        await connection.connect()
+        lines = [f"set MIXER:Current/InCh/Fader/Level {i % 40} 0 {-i}" for i in range(800)]
+        await connection.send_lines(lines)
+        while connection.in_flight > 400:
+            await asyncio.sleep(0.0005)
+        simulator.disconnect_all()
+        while connection.reconnects == 0:
+            await asyncio.sleep(0.005)
+        after = await connection.request("get MIXER:Current/InCh/Fader/Level 0 0")
+        await connection.close()
+        await simulator.stop()
+        return simulator, connection, after
+
+    simulator, connection, after = asyncio.run(run())
+    final = {i % 40: -i for i in range(800)}
+    return report("🔁 Testing Reconnect and Replay", [
+        ("replay buffer collapses per address and stays bounded",
+         buffer.drain() == ["set B 0 0 1", "set D 0 0 1"] and buffer.evicted == 1),
+        ("reconnected once", connection.reconnects == 1),
+        ("console consistent after replay", all(
+            simulator.mirror.get("MIXER:Current/InCh/Fader/Level", ch, 0) == value for ch, value in final.items())),
+        ("requests work after reconnect", after.value == -760),
+        ("recovery time measured", connection.last_recovery is not None and connection.last_recovery < 2.0),
+    ])
+
+
+def test_console_router():
+    """Test namespace fan-out to FOH and monitor desks with independent latency"""
+    full = AddressTable.load()
+    # A smaller monitor desk: only 16 input channels
+    small = AddressTable([info if info.address != "MIXER:Current/InCh/Fader/Level"
+                          else dataclasses.replace(info, x_count=16) for info in full])
+
+    async def run():
+        foh = ConsoleSimulator(full, latency=0.2)
+        monitor = ConsoleSimulator(small)
+        foh_port = await foh.start('127.0.0.1', 0)
+        monitor_port = await monitor.start('127.0.0.1', 0)
+        router = ConsoleRouter([
+            ConsoleTarget('foh', '127.0.0.1', foh_port, ('InCh', 'DCA', 'Scene'), full),
+            ConsoleTarget('monitor', '127.0.0.1', monitor_port, ('InCh', 'Mix'), small),
+        ], timeout=1.0)
+        result = await router.dispatch([
+            "set MIXER:Current/InCh/Fader/Level 3 0 -500",
+            "set MIXER:Current/InCh/Fader/Level 20 0 -500",
+            "set MIXER:Current/Mix/Fader/Level 2 0 0",
+            "set MIXER:Current/DCA/Fader/On 1 0 0",
+            "set MIXER:Current/St/Fader/Level 0 0 0",
+        ])
+        await router.close()
+        await foh.stop()
+        await monitor.stop()
+        return result, foh, monitor
+
+    result, foh, monitor = asyncio.run(run())
+    acks = result.acks
+    print(f"  FOH acked in {acks['foh'].elapsed * 1000:.0f} ms, monitor in {acks['monitor'].elapsed * 1000:.0f} ms")
+    return report("🔀 Testing Console Router", [
+        ("channels fan out to both desks", foh.mirror.get("MIXER:Current/InCh/Fader/Level", 3, 0) == -500
+         and monitor.mirror.get("MIXER:Current/InCh/Fader/Level", 3, 0) == -500),
+        ("mixes and DCAs only reach their owner", acks['foh'].sent == 3 and acks['monitor'].sent == 2),
+        ("model limits skip channel 21 on the small desk", acks['monitor'].skipped == ["set MIXER:Current/InCh/Fader/Level 20 0 -500"]),
+        ("unowned namespace reported", result.unrouted == ["set MIXER:Current/St/Fader/Level 0 0 0"]),
+        ("acknowledgements aggregated", acks['foh'].complete and acks['monitor'].complete),
+        ("slow desk does not delay the fast one", acks['monitor'].elapsed < 0.1 <= acks['foh'].elapsed),
+    ])
+
+
+def test_route_catalogs():
+    """Test that routes parsed from the CLI each get their own desk catalog"""
+    with tempfile.TemporaryDirectory() as directory:
+        # A 16-channel monitor desk: the default catalog with fewer input faders
+        small = Path(directory) / 'small.csv'
+        rows = DEFAULT_CATALOG.read_text().splitlines()
+        small.write_text("\n".join(row.replace('"MIXER:Current/InCh/Fader/Level",40,', '"MIXER:Current/InCh/Fader/Level",16,')
+                                   for row in rows) + "\n")
+        foh = parse_route("foh=192.168.0.128/InCh,DCA")
+        monitor = parse_route(f"mon=192.168.0.129:49281/InCh,Mix@{small}")
+        shared = parse_route(f"mon2=192.168.0.130@{small}")
+        try:
+            parse_route(f"bad=192.168.0.131@{Path(directory) / 'missing.csv'}")
+            missing = False
+        except ValueError:
+            missing = True
+
+    router = ConsoleRouter([foh, monitor])
+    lines, skipped, _ = router.route(["set MIXER:Current/InCh/Fader/Level 20 0 -500"])
+    return report("🗂️  Testing Route Catalogs", [
+        ("route without a catalog gets the default", foh.table.get("MIXER:Current/InCh/Fader/Level").x_count == 40),
+        ("route catalog read from the spec", monitor.table.get("MIXER:Current/InCh/Fader/Level").x_count == 16
+         and monitor.port == 49281 and monitor.namespaces == ('InCh', 'Mix')),
+        ("each desk checked against its own catalog", lines['foh'] and skipped['mon'] and not lines['mon']),
+        ("desks of one model share the catalog", shared.table is monitor.table),
+        ("unreadable catalog rejected", missing),
+    ])
+
+
+def test_traffic_recorder():
+    """Test binary recording of console traffic and memory-mapped replay at N× speed"""
+    table = AddressTable.load()
+    sent = [
+        "set MIXER:Current/InCh/Fader/Level 0 0 -1000",
+        "set MIXER:Current/InCh/Label/Name 5 0 \"Snare\"",
+        "get MIXER:Current/InCh/Fader/On 2 0",
+        "ssrecall_ex scene_04",
+    ]
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "show.rcpt"
+        recorder = TrafficRecorder(path, table, index_every=2)
+        for i, line in enumerate(sent):
+            recorder.record(SENT, line, timestamp=100.0 + i * 0.1)
+            recorder.record(RECEIVED, f"OK {line}", timestamp=100.05 + i * 0.1)
+        recorder.record(RECEIVED, "NOTIFY set MIXER:Current/InCh/Fader/Level 1 0 -200", timestamp=100.5)
+        recorder.record(RECEIVED, "ERROR set UnknownAddress", timestamp=100.6)
+        # Lines that do not fit a record are skipped by the tap, never raised into the send path
+        recorder.tap(True, "set MIXER:Current/InCh/Fader/Level 70000 0 0")
+        recorder.tap(False, f"NOTIFY set MIXER:Current/InCh/Fader/Level 1 0 {2 ** 40}")
+        recorder.close()
+        recorder.tap(True, "set MIXER:Current/InCh/Fader/Level 1 0 0")
+        size = path.stat().st_size
+
+        reader = TrafficReader(path, table)
+        lines = [record.line() for record in reader.records()]
+        seek = reader.find_time(100.3)
+        mirror = ConsoleStateMirror(table)
+        bursts = []
+
+        async def run():
+            start = time.perf_counter()
+            await replay(reader, bursts.append, speed=10.0, direction=SENT)
+            timed = time.perf_counter() - start
+            await replay(reader, lambda burst: [mirror.apply_line(line) for line in burst],
+                         speed=0, direction=RECEIVED)
+            return timed
+
+        timed = asyncio.run(run())
+        reader.close()
+
+        # A crash mid-write leaves part of a record (and of its index entry) behind
+        with path.open('ab') as f:
+            f.write(b"\x01" * 7)
+        with Path(f"{path}.idx").open('ab') as f:
+            f.write(INDEX_ENTRY.pack(101.0, 9) + b"\x02" * 5)
+        reopened = TrafficRecorder(path, table, index_every=2)
+        resumed = reopened.count
+        reopened.record(SENT, "set MIXER:Current/InCh/Fader/Level 2 0 -300", timestamp=101.0)
+        reopened.close()
+        reader = TrafficReader(path, table)
+        after_crash = [record.line() for record in reader.records()]
+        index_after = list(zip(reader.index_times, reader.index_records))
+        reader.close()
+
+    return report("📼 Testing Traffic Recorder", [
+        ("fixed-width records", size == 8 + 9 * 20),
+        ("unknown and unrecordable lines skipped", recorder.skipped == 4 and recorder.count == 9),
+        ("lines rebuilt exactly", lines[:2 * len(sent):2] == sent and lines[-1].startswith("NOTIFY set")),
+        ("index seeks by time", seek == 6),
+        ("replay keeps timing at 10× speed", 0.025 <= timed < 0.1 and sum(map(len, bursts)) == 4),
+        ("reopen drops the partial record", resumed == 9 and len(after_crash) == 10
+         and after_crash[:9] == lines and after_crash[-1] == "set MIXER:Current/InCh/Fader/Level 2 0 -300"),
+        ("reopen drops index entries without a record", index_after[-1] == (100.5, 8)),
+        ("replay drives the state mirror", mirror.get("MIXER:Current/InCh/Fader/Level", 1, 0) == -200
+         and mirror.get("MIXER:Current/InCh/Label/Name", 5, 0) == "Snare"),
+    ])
+
+
+def test_stream_parsing():
+    """Test that framing is independent of chunking and tokens keep quoted spaces"""
+    stream = "".join(f"NOTIFY set MIXER:Current/InCh/Fader/Level {i % 40} 0 {-i}\r\n" for i in range(5000)).encode()
+    stream += 'OK set MIXER:Current/InCh/Label/Name 0 0 "Lead Vöx"\n'.encode()
+    whole = LineFramer().feed_text(stream)
+    framer = LineFramer()
+    pieces = [line for i in range(0, len(stream), 7) for line in framer.feed_text(stream[i:i + 7])]
+    framer = LineFramer()
+    split_crlf = framer.feed(b"OK set MIXER:Current/InCh/Fader/On 0 0 1\r") + framer.feed(b"\nOK set X 1 0 0\n")
+    return report("🧵 Testing Stream Parsing", [
+        ("same lines whatever the chunking", whole == pieces and len(whole) == 5001),
+        ("\\r\\n split between reads", split_crlf == [b"OK set MIXER:Current/InCh/Fader/On 0 0 1", b"OK set X 1 0 0"]),
+        ("multi-byte characters split across reads", whole[-1].endswith('"Lead Vöx"')),
+        ("tokens: ints and quoted strings", tokenize(whole[-1]) ==
+         ['OK', 'set', 'MIXER:Current/InCh/Label/Name', 0, 0, 'Lead Vöx']),
+        ("negative values and empty strings", tokenize('set X 1 0 -3200 ""') == ['set', 'X', 1, 0, -3200, '']),
+    ])
+
+
+if __name__ == "__main__":
+    results = [
+        test_output_coalescer(),
+        test_console_pool(),
+        test_pipelined_requests(),
+        test_reply_timeouts(),
+        test_console_simulator(),
+        test_notify_consumer(),
+        test_stream_parsing(),
+        test_console_sync(),
+        test_priority_send_queue(),
+        test_stalled_send_queue(),
+        test_scene_recall_ordering(),
+        test_reconnect_and_replay(),
+        test_console_router(),
+        test_route_catalogs(),
+        test_traffic_recorder(),
+    ]
+    sys.exit(summarize(results))
@@ -0,0 +1,716 @@
+#!/usr/bin/env python3
+"""
+Test script for the receiver-side building blocks
+Exercises the command store and HTTP helpers without starting a server
+"""
+
+import asyncio
+import contextlib
+import gzip
+import io
+import json
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+from async_logging import AsyncLogger, ConsoleSink, JsonLinesSink
+from console_client import ConsoleLoopThread
+from console_simulator import ConsoleSimulator
+from console_state import ConsoleStateMirror
+from command_store import CommandStore, astream_events, page_etag, sse_message, stream_events
+from engine_pool import EnginePool
+from http_helpers import accepts_gzip, encode_body, etag_matches
+import ios_rcp_receiver
+from log_history import LogHistory
+from rcp_payloads import payload_error, validate_batch, validate_payload
+from seen_cache import SeenCache
+from tcp_yamaha_receiver import YamahaTCPReceiver
+from test_support import report, summarize
+from udp_receiver import WiFiTextReceiver
+from undo_journal import UndoJournal
+
+
+def test_command_store():
+    """Test stable ids, since-reads across wraparound and concurrent appends"""
+    store = CommandStore(capacity=5)
+    ids = [store.append({'command': f"set X {i} 0 0"}) for i in range(12)]
+    since = [record['id'] for record in store.since(9)]
+    wrapped = [record['id'] for record in store.since(0)]
+    paged = [record['id'] for record in store.since(0, limit=2)]
+    store.clear()
+    cleared_page = store.page(0)
+    after_clear = store.append({'command': "set Y 0 0 0"})
+
+    big = CommandStore(capacity=100_000)
+
+    def writer():
+        for i in range(5000):
+            big.append({'command': f"set Z {i} 0 0"})
+
+    threads = [threading.Thread(target=writer) for _ in range(8)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    all_ids = [record['id'] for record in big.since(0)]
+
+    start = time.perf_counter()
+    for _ in range(1000):
+        big.since(big.last_id - 10)
+    tail_read = (time.perf_counter() - start) / 1000
+
+    print(f"  40k concurrent appends in {elapsed * 1000:.0f} ms, since-read of 10 in {tail_read * 1e6:.1f} µs")
+    return report("🗃️ Testing Command Store", [
+        ("ids increase monotonically", ids == list(range(1, 13))),
+        ("since reads the delta", since == [10, 11, 12]),
+        ("capacity keeps the newest records", wrapped == [8, 9, 10, 11, 12] and len(store) == 1),
+        ("limit pages from the oldest", paged == [8, 9]),
+        ("page after clear is empty and final", cleared_page['commands'] == [] and not cleared_page['has_more']
+         and cleared_page['next_since'] == 12),
+        ("ids never repeat after clear", after_clear == 13),
+        ("concurrent appends get unique consecutive ids", all_ids == list(range(1, 40001))),
+        ("since-read cost independent of store size", tail_read < 0.0005),
+    ])
+
+
+def test_event_stream():
+    """Test Server-Sent Events formatting and live delivery of new commands"""
+    message = sse_message('command', {'id': 3, 'command': "set X 0 0 1"}, 3)
+    store = CommandStore(capacity=10)
+    store.append({'command': "set A 0 0 0"})
+    stream = stream_events(store, after_id=1, keepalive=0.05)
+    retry = next(stream)
+    keepalive = next(stream)
+
+    timer = threading.Timer(0.02, store.append, [{'command': "set B 0 0 0"}])
+    start = time.perf_counter()
+    timer.start()
+    pushed = next(stream)
+    latency = time.perf_counter() - start
+    threading.Timer(0.02, store.clear).start()
+    cleared = next(stream)
+    store.append({'command': "set C 0 0 0"})
+    after_clear = next(stream)
+    stale = stream_events(store, after_id=500, keepalive=0.05)
+    next(stale)
+    store.append({'command': "set D 0 0 0"})
+    from_stale = next(stale)
+
+    print(f"  Command pushed {latency * 1000:.1f} ms after append (20 ms timer)")
+    return report("📺 Testing Event Stream", [
+        ("message format", message == 'id: 3\nevent: command\ndata: {"id":3,"command":"set X 0 0 1"}\n\n'),
+        ("stream starts with a retry hint", retry == "retry: 2000\n\n"),
+        ("idle stream sends keepalives", keepalive == ": keepalive\n\n"),
+        ("append wakes the stream", pushed.startswith("id: 2\nevent: command") and latency < 0.5),
+        ("clear is pushed", cleared.startswith("event: clear")),
+        ("stream continues after clear", after_clear.startswith("id: 3\n")),
+        ("ids from a previous run are reset", from_stale.startswith("id: 4\n")),
+    ])
+
+
+def test_async_event_stream():
+    """Test the event-loop SSE stream used by the ASGI app"""
+    store = CommandStore(capacity=10)
+
+    async def scenario():
+        stream = astream_events(store, after_id=0, keepalive=0.05)
+        retry = await stream.__anext__()
+        keepalive = await stream.__anext__()
+        # A worker thread appends while the stream waits on the loop
+        threading.Timer(0.02, store.append, [{'command': "set A 0 0 0"}]).start()
+        start = time.perf_counter()
+        pushed = await stream.__anext__()
+        latency = time.perf_counter() - start
+        store.clear()
+        cleared = await stream.__anext__()
+        listeners = len(store._listeners)
+        await stream.aclose()
+        return retry, keepalive, pushed, latency, cleared, listeners
+
+    retry, keepalive, pushed, latency, cleared, listeners = asyncio.run(scenario())
+    return report("⚡ Testing Async Event Stream", [
+        ("retry hint then keepalive", retry.startswith("retry") and keepalive == ": keepalive\n\n"),
+        ("append from another thread wakes the loop", pushed.startswith("id: 1\nevent: command") and latency < 0.5),
+        ("clear is pushed", cleared.startswith("event: clear")),
+        ("closing the stream removes its listener", listeners == 1 and not store._listeners),
+    ])
+
+
+def test_commands_api_helpers():
+    """Test cursor pages, ETags and gzip negotiation behind /api/commands"""
+    store = CommandStore(capacity=1000)
+    store.extend([{'command': f"set MIXER:Current/InCh/Fader/Level {i} 0 -1000"} for i in range(250)])
+    first = store.page(0, 100)
+    second = store.page(first['next_since'], 100)
+    tail = store.page(second['next_since'], 100)
+    idle = store.page(tail['next_since'], 100)
+    idle_etag = page_etag(idle)
+    store.append({'command': "set MIXER:Current/InCh/Fader/On 0 0 0"})
+    fresh = store.page(tail['next_since'], 100)
+    restarted = store.page(10_000, 100)
+
+    body = json.dumps(first, separators=(',', ':')).encode('utf-8')
+    compressed, encoding = encode_body(body, 'gzip, deflate, br')
+    small, small_encoding = encode_body(b'{"commands":[]}', 'gzip')
+    print(f"  100-command page: {len(body)} bytes, {len(compressed)} gzipped")
+    return report("🗂️ Testing Commands API Helpers", [
+        ("pages follow the cursor", [p['total'] for p in (first, second, tail)] == [100, 100, 50]),
+        ("has_more until the end", first['has_more'] and second['has_more'] and not tail['has_more']),
+        ("idle poll is empty and keeps the cursor", idle['total'] == 0 and idle['next_since'] == 250),
+        ("ETag stable while nothing changes", page_etag(store.page(250, 100)) != idle_etag
+         and page_etag(idle) == idle_etag),
+        ("new command reaches the cursor", [c['id'] for c in fresh['commands']] == [251]),
+        ("stale cursor falls back to the newest id", restarted['next_since'] == 251),
+        ("If-None-Match comparison", etag_matches(f'"x", {idle_etag}', idle_etag)
+         and etag_matches(idle_etag[2:], idle_etag) and not etag_matches('"other"', idle_etag)
+         and etag_matches('*', idle_etag) and not etag_matches(None, idle_etag)),
+        ("gzip negotiation", accepts_gzip('gzip;q=0.5') and not accepts_gzip('gzip;q=0')
+         and not accepts_gzip('identity') and not accepts_gzip(None)),
+        ("large pages are gzipped losslessly", encoding == 'gzip' and gzip.decompress(compressed) == body
+         and len(compressed) < len(body) // 4),
+        ("small pages are sent as is", small_encoding is None and small == b'{"commands":[]}'),
+    ])
+
+
+def test_batch_payloads():
+    """Test one-pass validation of /rcp/batch payloads"""
+    payload = {'command': "set MIXER:Current/InCh/Fader/On 0 0 0", 'description': "Mute channel 1",
+               'confidence': 0.9, 'originalText': "mute channel one", 'timestamp': "2024-01-15T10:30:45Z",
+               'deviceId': "iPhone"}
+    items = [payload, {**payload, 'confidence': "high"}, {k: v for k, v in payload.items() if k != 'deviceId'},
+             "set X 0 0 0", {**payload, 'command': "set A 0 0 0\nset B 0 0 0"}, {**payload, 'commandType': "voice_command"}]
+    records, statuses = validate_batch(items, "192.168.0.20")
+    store = CommandStore(capacity=10)
+    ids = store.extend(records)
+
+    many = [payload] * 1000
+    start = time.perf_counter()
+    validate_batch(many, "192.168.0.20")
+    elapsed = time.perf_counter() - start
+
+    print(f"  1000 payloads validated in {elapsed * 1000:.2f} ms")
+    return report("📦 Testing Batch Payloads", [
+        ("valid payloads become records", len(records) == 3 and records[2]['command_type'] == "voice_command"),
+        ("one status per item, in order", [s['success'] for s in statuses] == [True, False, False, False, True, True]),
+        ("bad confidence reported", statuses[1]['error'].startswith("Invalid data format")),
+        ("missing field named", statuses[2]['error'] == "Missing required field: deviceId"),
+        ("non-object rejected, multi-line commands kept", not statuses[3]['success'] and records[1]['command'].count("\n") == 1),
+        ("batch shares one receive time", records[0]['received_at'] == records[1]['received_at']),
+        ("batch stored with consecutive ids", ids == [1, 2, 3]),
+        ("single payload check", payload_error(payload) is None and payload_error({}) is not None),
+        ("/rcp and /rcp/batch reject a bad confidence alike", validate_payload(items[1], None)[1] == statuses[1]['error']
+         and all(validate_payload({**payload, 'confidence': value}, None)[1].startswith("Invalid data format")
+                 for value in (None, [1]))),
+    ])
+
+
+def http_route_checks(client, json_of, events):
+    """Checks for /rcp, /rcp/batch, /api/commands and /events, shared by the Flask and ASGI apps
+
+    ``json_of`` reads a (possibly gzipped) JSON response, ``events`` returns
+    the first chunks of an /events stream.
+    """
+    payload = {'command': "set MIXER:Current/InCh/Fader/On 0 0 0", 'description': "Mute channel 1",
+               'confidence': 0.9, 'originalText': "mute channel one", 'timestamp': "2024-01-15T10:30:45Z",
+               'deviceId': "iPhone"}
+    client.post('/clear')
+    single = client.post('/rcp', json=payload)
+    form = client.post('/rcp', data={'command': payload['command']})
+    missing = client.post('/rcp', json={k: v for k, v in payload.items() if k != 'deviceId'})
+    batch = client.post('/rcp/batch', json=[payload] * 40 + [{**payload, 'confidence': "high"}])
+    empty = client.post('/rcp/batch', json=[])
+    first = json_of(single)['command_id']  # Ids keep counting across /clear
+    page = client.get(f'/api/commands?since={first - 1}', headers={'Accept-Encoding': 'gzip'})
+    cached = client.get(f'/api/commands?since={first - 1}', headers={'If-None-Match': page.headers['ETag']})
+    bad_cursor = client.get('/api/commands?since=x')
+    stream = events(first + 39)
+    commands = json_of(page)['commands']
+    return [
+        ("/rcp stores a valid payload", single.status_code == 200 and first == ios_rcp_receiver.received_commands.first_id),
+        ("/rcp rejects non-JSON and missing fields", form.status_code == 400 and missing.status_code == 400
+         and json_of(missing)['error'] == "Missing required field: deviceId"),
+        ("/rcp/batch reports each item", batch.status_code == 200 and json_of(batch)['accepted'] == 40
+         and not json_of(batch)['results'][40]['success']),
+        ("/rcp/batch rejects an empty batch", empty.status_code == 400),
+        ("/api/commands is gzipped", page.headers.get('Content-Encoding') == 'gzip'
+         and [c['id'] for c in commands] == list(range(first, first + 41))),
+        ("/api/commands answers a matching ETag with 304", cached.status_code == 304),
+        ("/api/commands rejects a bad cursor", bad_cursor.status_code == 400),
+        ("/events resumes after the cursor", stream[0].startswith("retry:") and stream[1].startswith(f"id: {first + 40}\n")),
+    ]
+
+
+def test_flask_routes():
+    """Test the receiver's Flask routes through the test client"""
+    client = ios_rcp_receiver.app.test_client()
+
+    def json_of(response):
+        if response.headers.get('Content-Encoding') == 'gzip':
+            return json.loads(gzip.decompress(response.data))
+        return response.get_json()
+
+    def events(since):
+        response = client.get(f'/events?since={since}', buffered=False)
+        chunks = iter(response.response)
+        first = [next(chunks).decode(), next(chunks).decode()]
+        response.close()
+        return first
+
+    return report("🌶️ Testing Flask Routes", http_route_checks(client, json_of, events))
+
+
+def test_asgi_routes():
+    """Test the receiver's ASGI app through Starlette's TestClient"""
+    from starlette.testclient import TestClient
+
+    app = ios_rcp_receiver.create_asgi_app()
+
+    async def first_chunks(since, count=2):
+        # TestClient reads a response to the end, an event stream never ends: drive the app directly
+        chunks = []
+        enough = asyncio.Event()
+
+        async def receive():
+            await enough.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            if message['type'] == 'http.response.body' and message.get('body'):
+                chunks.append(message['body'].decode())
+                if len(chunks) >= count:
+                    enough.set()
+
+        scope = {'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+                 'scheme': 'http', 'path': '/events', 'raw_path': b'/events',
+                 'query_string': f'since={since}'.encode(), 'headers': [],
+                 'client': ('127.0.0.1', 50000), 'server': ('127.0.0.1', 80)}
+        task = asyncio.ensure_future(app(scope, receive, send))
+        try:
+            await asyncio.wait_for(enough.wait(), 2.0)
+            await asyncio.wait_for(task, 2.0)  # The disconnect ends the stream
+        finally:
+            task.cancel()
+        return chunks
+
+    with TestClient(app) as client:
+        checks = http_route_checks(client, lambda response: response.json(),
+                                   lambda since: asyncio.run(first_chunks(since)))
+    return report("⚡ Testing ASGI Routes", checks)
+
+
+def test_engine_pool():
+    """Test engine workers: full pipeline, labels shared between workers, loop kept free"""
+    async def run():
+        pool = EnginePool(2, journal=UndoJournal(ConsoleStateMirror()))
+        try:
+            await pool.start()
+            multi = await pool.translate("mute channels 1 to 3")
+            named = await pool.translate("name channel 5 kick drum")
+            # Both workers must see the new label, whichever one gets the task
+            labelled = await asyncio.gather(*(pool.translate("mute kick drum") for _ in range(4)))
+            # Two renames parsed at once in different workers must both survive
+            await asyncio.gather(pool.translate("name channel 7 snare"), pool.translate("name dca 2 drums"))
+            renamed = await asyncio.gather(*(pool.translate(text) for text in ("mute snare", "mute drums") * 2))
+            # Undo history is kept here, whichever worker parsed the batch
+            await pool.translate("set channel 9 to minus 10")
+            guessed = await pool.translate("undo")
+            await pool.translate("set channel 9 to minus 20")
+            undone = await pool.translate("undo")
+
+            # A ticker on the loop keeps running while a burst is parsed
+            gaps = []
+            async def ticker(done):
+                last = time.perf_counter()
+                while not done.is_set():
+                    await asyncio.sleep(0.005)
+                    now = time.perf_counter()
+                    gaps.append(now - last)
+                    last = now
+            done = asyncio.Event()
+            ticks = asyncio.create_task(ticker(done))
+            start = time.perf_counter()
+            await asyncio.gather(*(pool.translate(f"set channel {n % 32 + 1} to minus {n % 20} db") for n in range(200)))
+            burst = time.perf_counter() - start
+            done.set()
+            await ticks
+            return multi, named, labelled, renamed, guessed, undone, gaps, burst, pool.parsed, pool.version
+        finally:
+            pool.close()
+
+    multi, named, labelled, renamed, guessed, undone, gaps, burst, parsed, version = asyncio.run(run())
+    inline = asyncio.run(EnginePool(0).translate("set channel 2 to unity"))
+    print(f"  200 commands in {burst * 1000:.0f} ms, longest loop stall {max(gaps) * 1000:.1f} ms")
+    return report("⚙️  Testing Voice Engine Worker Pool", [
+        ("one utterance gives every RCP command", len(multi.lines) == 3
+         and multi.lines[2] == "set MIXER:Current/InCh/Fader/On 2 0 0"),
+        ("descriptions returned with the lines", multi.descriptions == ["Turn off channels 1-3"]),
+        ("label changes bump the shared version", named.lines and version == 3),
+        ("every worker resolves the new label", all(r.lines == ["set MIXER:Current/InCh/Fader/On 4 0 0"] for r in labelled)),
+        ("concurrent renames in two workers both kept", [r.lines for r in renamed] == [
+            ["set MIXER:Current/InCh/Fader/On 6 0 0"], ["set MIXER:Current/DCA/Fader/On 1 0 0"]] * 2),
+        ("unknown prior value is never replayed", not guessed.lines and guessed.descriptions[0].startswith("Cannot undo")),
+        ("undo replays the journal held by the pool", undone.lines == ["set MIXER:Current/InCh/Fader/Level 8 0 -1000"]),
+        ("loop keeps ticking while parsing", max(gaps) < 0.1),
+        ("parse count tracked", parsed == 214),
+        ("inline mode without workers", inline.lines == ["set MIXER:Current/InCh/Fader/Level 1 0 0"]),
+    ])
+
+
+def test_udp_receiver():
+    """Test batched UDP receive and acks, and workers sharing a port with SO_REUSEPORT"""
+    receiver = WiFiTextReceiver('127.0.0.1', 0, batch_size=64)
+    receiver.socket.bind(('127.0.0.1', 0))
+    address = receiver.socket.getsockname()
+    phone = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    phone.settimeout(2.0)
+    for i in range(100):
+        phone.sendto(json.dumps({'id': f'msg-{i}', 'content': f'mute channel {i % 32 + 1}'}).encode(), address)
+    phone.sendto(b'plain hello', address)
+    time.sleep(0.1)
+
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        sizes = [receiver.receive_batch(), receiver.receive_batch(), receiver.receive_batch()]
+    acks = [json.loads(phone.recv(4096)) for _ in range(100)]
+    phone.settimeout(0.2)
+    try:
+        extra = phone.recv(4096)
+    except socket.timeout:
+        extra = None
+    receiver.stop_server()
+    phone.close()
+
+    # Two workers on one port, phones from different source ports are spread between them
+    workers = [WiFiTextReceiver('127.0.0.1', 0, reuse_port=True) for _ in range(2)]
+    workers[0].socket.bind(('127.0.0.1', 0))
+    shared = workers[0].socket.getsockname()
+    workers[1].socket.bind(shared)
+    phones = [socket.socket(socket.AF_INET, socket.SOCK_DGRAM) for _ in range(16)]
+    for n, sender in enumerate(phones):
+        for i in range(5):
+            sender.sendto(json.dumps({'id': f'{n}-{i}', 'content': 'hello'}).encode(), shared)
+    time.sleep(0.1)
+    with contextlib.redirect_stdout(io.StringIO()):
+        for worker in workers:
+            while worker.receive_batch():
+                pass
+    counts = [worker.received for worker in workers]
+    for sock in phones:
+        sock.close()
+    for worker in workers:
+        worker.stop_server()
+
+    return report("📡 Testing Batched UDP Receiver", [
+        ("one wakeup drains up to a batch", sizes == [64, 37, 0]),
+        ("every JSON message acknowledged in order", [a['messageId'] for a in acks] == [f'msg-{i}' for i in range(100)]),
+        ("plain text gets no ack", extra is None),
+        ("every message printed", output.getvalue().count("📨") == 100 and "Plain text" in output.getvalue()),
+        ("workers share the port", sum(counts) == 80),
+        ("load spread across workers", all(counts)),
+    ])
+
+
+def test_duplicate_suppression():
+    """Test the seen-ID cache and resent UDP messages getting the original ack"""
+    now = [0.0]
+    cache = SeenCache(max_entries=3, ttl=10.0, clock=lambda: now[0])
+    cache.put('a', 1)
+    now[0] = 5.0
+    cache.put('b', 2)
+    hit = cache.get('a')
+    now[0] = 10.0
+    expired = cache.get('a')
+    within = cache.get('b')
+    for key in 'cde':
+        cache.put(key, key)
+
+    receiver = WiFiTextReceiver('127.0.0.1', 0)
+    receiver.socket.bind(('127.0.0.1', 0))
+    address = receiver.socket.getsockname()
+    phone = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    phone.settimeout(2.0)
+    message = json.dumps({'id': 'resent-1', 'content': 'bring up channel 3 by 3 db'}).encode()
+    phone.sendto(message, address)
+    phone.sendto(message, address)
+    phone.sendto(json.dumps({'id': 'other', 'content': 'hello'}).encode(), address)
+    time.sleep(0.1)
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        receiver.receive_batch()
+        time.sleep(0.01)
+        phone.sendto(message, address)
+        time.sleep(0.1)
+        receiver.receive_batch()
+    acks = [phone.recv(4096) for _ in range(4)]
+    receiver.stop_server()
+    phone.close()
+
+    return report("🔁 Testing Duplicate Suppression", [
+        ("seen ID returns its reply", hit == 1),
+        ("entries expire after the window", expired is None and within == 2),
+        ("oldest evicted when full", len(cache) == 3 and cache.evicted == 1 and cache.get('b') is None),
+        ("newer entries kept", cache.get('c') == 'c' and cache.get('e') == 'e'),
+        ("duplicate handled once", output.getvalue().count("Content: bring up") == 1 and receiver.duplicates == 2),
+        ("duplicates get the original ack", acks[0] == acks[1] == acks[3] and json.loads(acks[2])['messageId'] == 'other'),
+    ])
+
+
+def test_log_history():
+    """Test the GUI log history: bounded over a long show, filtered through its index"""
+    history = LogHistory(max_lines=20_000)
+    levels = ["VOICE", "RCP", "CONNECT", "INFO"]
+    sizes = []
+    # A 6-hour show at 10 lines/s
+    for i in range(216_000):
+        level = levels[i % 4]
+        history.append(level, f"[{i // 3600 % 24:02d}:{i // 60 % 60:02d}:{i % 60:02d}] "
+                              f"{level} channel {i % 32 + 1} message {i % 500}\n")
+        if i % 50_000 == 0:
+            sizes.append(sum(len(seqs) for seqs in history.by_word.values()))
+    sizes.append(sum(len(seqs) for seqs in history.by_word.values()))
+
+    history.append("ERROR", "[23:59:59] Fader stuck on channel 7\n")
+    start = time.perf_counter()
+    voice_17 = history.search("channel 17", "VOICE")
+    search_time = time.perf_counter() - start
+    scanned = [line for line in history.lines if history.matches(line, "channel 17", "VOICE")]
+    limited = history.search("chan", limit=10)
+    newest = history.lines[-1]
+    print(f"  216,000 lines kept as {len(history):,}, filter over them in {search_time * 1000:.1f} ms")
+    return report("🗂️  Testing GUI Log History", [
+        ("history stays at its cap", len(history) == 20_000 and history.lines[0].seq == 196_001),
+        ("index size stays flat", max(sizes[1:]) <= 8 * 20_000 and max(sizes[1:]) - min(sizes[1:]) < 1000),
+        ("index finds what a full scan finds", voice_17 and voice_17 == scanned),
+        ("filter by level and word prefix", history.search("fad", "ERROR") == [newest]
+         and history.search("stuck 7") == [newest]),
+        ("limit keeps the newest", len(limited) == 10 and limited[-1] == newest),
+        ("incremental matching", history.matches(newest, "fader", "ERROR") and not history.matches(newest, "fader", "RCP")),
+        ("no match is empty", history.search("reverb") == [] and history.search("", "CONNECTED") == []),
+        ("clear empties the index", (history.clear(), len(history), history.by_word)[1:] == (0, {})),
+    ])
+
+
+def test_tcp_forwarding():
+    """Test that the TCP receiver coalesces a fader ride into one write to the desk"""
+    desk = ConsoleLoopThread()
+    simulator = ConsoleSimulator()
+    port = desk.submit(simulator.start('127.0.0.1', 0)).result(2.0)
+    receiver = YamahaTCPReceiver('127.0.0.1', 0, '127.0.0.1', port, log=AsyncLogger([]), workers=0)
+    receiver.coalescer.window = 0.2  # Wide enough that a busy machine cannot split the ride
+    bursts = []
+    sink = receiver.send_queue.sink
+    receiver.send_queue.sink = lambda lines: (bursts.append(list(lines)), sink(lines))[1]
+
+    # One utterance's lines at a time, as handle_ios_message forwards them
+    for step in range(20):
+        receiver.forward_to_yamaha([f"set MIXER:Current/InCh/Fader/Level 4 0 {-step * 100}"])
+    receiver.forward_to_yamaha(["set MIXER:Current/InCh/Fader/On 5 0 0"])
+    deadline = time.time() + 2.0
+    while simulator.commands < 2 and time.time() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.05)
+    level = simulator.mirror.get("MIXER:Current/InCh/Fader/Level", 4, 0)
+    commands = simulator.commands
+
+    # Someone moves a fader at the desk, the receiver's mirror follows
+    with socket.create_connection(('127.0.0.1', port)) as operator:
+        operator.sendall(b"set MIXER:Current/InCh/Fader/Level 10 0 -500\n")
+        deadline = time.time() + 2.0
+        while receiver.mirror.get("MIXER:Current/InCh/Fader/Level", 10, 0) != -500 and time.time() < deadline:
+            time.sleep(0.01)
+    followed = receiver.mirror.get("MIXER:Current/InCh/Fader/Level", 10, 0)
+    receiver.stop_server()
+    desk.submit(simulator.stop()).result(2.0)
+    desk.stop()
+
+    faders = [burst for burst in bursts if any("Level" in line for line in burst)]
+    return report("🧹 Testing TCP Receiver Forwarding", [
+        ("fader ride reaches the queue as one write", faders == [["set MIXER:Current/InCh/Fader/Level 4 0 -1900"]]),
+        ("mute still forwarded", any("Fader/On 5 0 0" in line for burst in bursts for line in burst)),
+        ("desk gets only the last value", commands == 2 and level == -1900),
+        ("coalesced writes counted", receiver.coalescer.coalesced == 19),
+        ("desk changes reach the receiver's mirror", followed == -500 and receiver.notifications.changes == 1),
+    ])
+
+
+def test_scheduled_forwarding():
+    """Test that timed and cue commands sent to the TCP receiver reach the desk when due"""
+    desk = ConsoleLoopThread()
+    simulator = ConsoleSimulator()
+    port = desk.submit(simulator.start('127.0.0.1', 0)).result(2.0)
+    receiver = YamahaTCPReceiver('127.0.0.1', 0, '127.0.0.1', port, log=AsyncLogger([]), workers=0)
+    server = threading.Thread(target=receiver.start_server, daemon=True)
+    server.start()
+    while not receiver.is_running:
+        time.sleep(0.01)
+    client = socket.create_connection(('127.0.0.1', receiver.port))
+    client.settimeout(2.0)
+    replies = client.makefile()
+
+    def say(text):
+        client.sendall((json.dumps({"content": text}) + "\n").encode())
+        return json.loads(replies.readline())
+
+    on_cue = say("on cue 5 mute channel 6")
+    timed = say("in 0.2 seconds mute channel 7")
+    time.sleep(0.05)
+    held = simulator.mirror.get("MIXER:Current/InCh/Fader/On", 5, 0)
+    fired = say("go 5")
+    deadline = time.time() + 2.0
+    while simulator.mirror.get("MIXER:Current/InCh/Fader/On", 6, 0) != 0 and time.time() < deadline:
+        time.sleep(0.01)
+    channel_6 = simulator.mirror.get("MIXER:Current/InCh/Fader/On", 5, 0)
+    channel_7 = simulator.mirror.get("MIXER:Current/InCh/Fader/On", 6, 0)
+    pending = len(receiver.scheduler)
+    client.close()
+    receiver.stop_server()
+    server.join(2.0)
+    desk.submit(simulator.stop()).result(2.0)
+    desk.stop()
+
+    return report("⏱️  Testing Scheduled Forwarding", [
+        ("cue command acknowledged, nothing sent", on_cue["status"] == "handled"
+         and on_cue["descriptions"][0].startswith("Scheduled at cue 5") and held != 0),
+        ("timed command scheduled in the receiver", timed["descriptions"][0].startswith("Scheduled in 0.2s")),
+        ("firing the cue sends its batch", fired["descriptions"] == ["Fired cue 'cue 5' (1 scheduled)"] and channel_6 == 0),
+        ("timed batch sent when due", channel_7 == 0 and pending == 0),
+    ])
+
+
+def test_tcp_receiver():
+    """Test the event-loop TCP receiver with many idle clients, a flooding client and shutdown"""
+    receiver = YamahaTCPReceiver('127.0.0.1', 0, log=AsyncLogger([]), workers=1)
+    server = threading.Thread(target=receiver.start_server, daemon=True)
+    server.start()
+    while not receiver.is_running:
+        time.sleep(0.01)
+    address = ('127.0.0.1', receiver.port)
+
+    idle = [socket.create_connection(address) for _ in range(2000)]
+    threads_while_idle = threading.active_count()
+
+    # A client that floods voice messages and never reads its acknowledgements
+    flooder = socket.create_connection(address)
+    flooder.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+    flooder.setblocking(False)
+    flood = b'{"content": "mute channel 3"}\n' * 2000
+    flooded = 0
+    for _ in range(2000):
+        try:
+            flooded += flooder.send(flood)
+        except BlockingIOError:
+            break
+
+    active = socket.create_connection(address)
+    active.settimeout(2.0)
+    start = time.perf_counter()
+    active.sendall(b'{"content": "mute channel 4"}\nset MIXER:Current/InCh/Fader/On 0 0 1\n5\n')
+    reply = json.loads(active.makefile().readline())
+    latency = time.perf_counter() - start
+    time.sleep(0.1)
+    connected = len(receiver.clients)
+
+    start = time.perf_counter()
+    receiver.stop_server()
+    receiver.stop_server()
+    stop_time = time.perf_counter() - start
+    server.join(2.0)
+    closed = active.recv(1) == b''
+    for sock in idle + [flooder, active]:
+        sock.close()
+
+    print(f"  2000 idle clients on {threads_while_idle} threads, reply in {latency * 1000:.1f} ms "
+          f"while {flooded / 1e6:.1f} MB flood was held back, stop in {stop_time * 1000:.0f} ms")
+    return report("🔌 Testing Event-Loop TCP Receiver", [
+        ("idle clients cost no threads", threads_while_idle < 10),
+        ("all clients tracked", connected == 2002),
+        ("JSON voice message acknowledged", reply["rcp_command"] == "set MIXER:Current/InCh/Fader/On 3 0 0"),
+        ("non-reading client is throttled, not buffered", flooded < 60_000_000),
+        ("other clients stay responsive", latency < 0.5),
+        ("stop closes clients and the loop", closed and not server.is_alive() and not receiver.clients),
+        ("repeated stop is harmless", stop_time < 2.0),
+    ])
+
+
+class SlowSink:
+    """Sink that stalls like a busy disk or a slow terminal"""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.events = []
+
+    def write(self, events):
+        time.sleep(self.delay)
+        self.events.extend(events)
+
+    def flush(self):
+        pass
+
+
+def test_async_logging():
+    """Test that logging never blocks on slow sinks and degrades by sampling"""
+    slow = SlowSink(0.05)
+    log = AsyncLogger([slow], max_queue=1000, sample_above=0.5, sample_every=10)
+    start = time.perf_counter()
+    for i in range(5000):
+        log.info("🎛️  RCP: {command}", command=f"set X {i} 0 0")
+    log.error("❌ {error}", error="console unreachable")
+    per_call = (time.perf_counter() - start) / 5001
+    log.close()
+    messages = [event.text() for event in slow.events]
+    warnings = sum("Log backpressure" in m for m in messages)
+
+    full = AsyncLogger([SlowSink(0.05)], max_queue=100, sample_above=1.0)
+    for i in range(1000):
+        full.info("🎛️  RCP: {command}", command=f"set X {i} 0 0")
+    full.close()
+
+    stream = io.StringIO()
+    path = os.path.join(tempfile.mkdtemp(), 'receiver.log')
+    structured = AsyncLogger([ConsoleSink(stream), JsonLinesSink(path)])
+    structured.info("📊 Confidence: {confidence:.1%}", confidence=0.951, device_id="iPhone")
+    structured.info("{braces} untouched")
+    structured.close()
+    with open(path) as f:
+        record = json.loads(f.readline())
+
+    print(f"  {per_call * 1e6:.1f} µs per log call with a 50 ms sink, "
+          f"{log.sampled_out} sampled out, {full.dropped} dropped when full")
+    return report("📝 Testing Async Logging", [
+        ("log calls do not wait for the sink", per_call < 0.0002),
+        ("queue stays bounded", log.logged <= 1000 + 5000 // 10 + 2),
+        ("busy queue samples info events", log.sampled_out > 0),
+        ("full queue drops new events", full.dropped > 0 and full.logged <= 101),
+        ("errors survive sampling", "❌ console unreachable" in messages),
+        ("losses are reported in the log", warnings > 0),
+        ("close writes everything queued", len(slow.events) == log.logged + warnings),
+        ("structured fields kept in JSON lines", record['device_id'] == "iPhone"
+         and record['message'] == "📊 Confidence: 95.1%" and record['level'] == "INFO"),
+        ("plain messages are not formatted", "{braces} untouched" in stream.getvalue()),
+    ])
+
+
+if __name__ == "__main__":
+    results = [
+        test_command_store(),
+        test_event_stream(),
+        test_async_event_stream(),
+        test_commands_api_helpers(),
+        test_batch_payloads(),
+        test_flask_routes(),
+        test_asgi_routes(),
+        test_engine_pool(),
+        test_udp_receiver(),
+        test_duplicate_suppression(),
+        test_log_history(),
+        test_tcp_forwarding(),
+        test_scheduled_forwarding(),
+        test_tcp_receiver(),
+        test_async_logging(),
+    ]
+    sys.exit(summarize(results))
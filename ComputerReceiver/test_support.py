@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+"""
+Shared helpers for the script-style test files
+"""
+
+
+def report(title, checks):
+    """Print PASS/FAIL lines for (name, ok) checks and return (passed, failed)"""
+    print(f"\n{title}")
+    print("-" * 40)
+    passed = 0
+    for name, ok in checks:
+        print(f"  {'✅ PASS' if ok else '❌ FAIL'}: {name}")
+        passed += bool(ok)
+    return passed, len(checks) - passed
+
+
+def summarize(results):
+    """Print the totals of (passed, failed) pairs and return the exit code"""
+    passed = sum(p for p, _ in results)
+    failed = sum(f for _, f in results)
+
+    print("\n" + "=" * 60)
+    print(f"📊 Test Summary: {passed} passed, {failed} failed")
+    if failed == 0:
+        print("🎉 All tests passed!")
+    return 1 if failed else 0
@@ -5,7 +5,12 @@ Validates the rule engine against the known working commands
 """
 
 from voice_command_engine import VoiceCommandEngine
+from command_scheduler import CommandScheduler
+from console_state import ConsoleStateMirror
+from undo_journal import UndoJournal
+from test_support import report, summarize
 import json
+import sys
 
 def test_engine():
     """Test the voice command engine with various commands"""
@@ -81,6 +86,24 @@ def test_engine():
             'expected_contains': 'ssrecall_ex scene_15'
         },
         
+        # Range and Group Commands
+        {
+            'input': 'Mute channels 1 through 16',
+            'expected_contains': 'MIXER:Current/InCh/Fader/On 15 0 0'
+        },
+        {
+            'input': 'Pan odd channels hard left',
+            'expected_contains': 'MIXER:Current/InCh/ToSt/Pan 38 0 -63'
+        },
+        {
+            'input': 'Name channel 6 snare drum',
+            'expected_contains': 'MIXER:Current/InCh/Label/Name 5 0 "snare drum"'
+        },
+        {
+            'input': 'Send drums to mix 4',
+            'expected_contains': 'MIXER:Current/InCh/ToMix/On 5 3 1'
+        },
+        
         # DCA Controls
         {
             'input': 'Set DCA 1 to unity',
@@ -163,6 +186,109 @@ def test_edge_cases():
                 print(f"    - {result.description}")
         print()
 
+def test_scheduled_commands():
+    """Test deferred and cue-based commands through the scheduler"""
+    clock = [0.0]
+    scheduler = CommandScheduler(clock=lambda: clock[0])
+    engine = VoiceCommandEngine(scheduler=scheduler)
+    
+    checks = []
+    
+    results = engine.process_command("In 10 seconds recall scene 4")
+    checks.append(("time prefix is scheduled, not sent", results and results[0].command.startswith('# Scheduled #1')))
+    
+    engine.process_command("Mute channel 3 in two minutes")
+    engine.process_command("At the end of this song mute 1 through 8")
+    checks.append(("three batches pending", len(scheduler) == 3))
+    
+    clock[0] = 10.0
+    due = scheduler.poll()
+    checks.append(("scene recall due after 10s", [c.command for b in due for c in b.commands] == ['ssrecall_ex scene_04']))
+    
+    engine.process_command("Cancel scheduled 2")
+    checks.append(("cancel removes timed batch", len(scheduler) == 1 and not scheduler.poll(1000.0)))
+    
+    engine.process_command("Fire end of song")
+    due = scheduler.poll()
+    checks.append(("cue fires waiting bulk batch", [len(c) for b in due for c in b.commands] == [8]))
+    
+    engine.process_command("On cue 5 recall scene 2")
+    results = engine.process_command("Go left")
+    checks.append(("bare word is not a cue unless one waits on it", not any(r.command.startswith('# Fired') for r in results)))
+    results = engine.process_command("Go 5")
+    checks.append(("bare name fires its waiting cue", results[0].command == '# Fired cue cue 5' and len(scheduler.poll()) == 1))
+    
+    results = engine.process_command("Recall scene 1 in a minute")
+    checks.append(("'a minute' is sixty seconds", results[0].command.startswith('# Scheduled') and not scheduler.poll(clock[0] + 59)
+                   and len(scheduler.poll(clock[0] + 60)) == 1))
+    results = engine.process_command("In a few seconds recall scene 1")
+    checks.append(("unreadable delay is not run now", len(results) == 1 and results[0].command.startswith('# Could not schedule')
+                   and len(scheduler) == 0))
+    
+    return report("⏱️  Testing Scheduled Commands", checks)
+
+def test_bulk_commands():
+    """Test ranges and groups expanding to one write per parameter"""
+    engine = VoiceCommandEngine()
+    lines = lambda text: [line for r in engine.process_command(text) for line in r.command.split('\n')]
+    
+    checks = []
+    
+    unmuted = lines("Unmute channels 1 through 16")
+    checks.append(("unmute range sends no mute", len(unmuted) == 16 and not any(line.endswith(' 0 0') for line in unmuted)))
+    checks.append(("unmute all channels is unmute only", set(l.rsplit(' ', 1)[1] for l in lines("Unmute all channels")) == {'1'}))
+    checks.append(("single unmute sends no mute", lines("Unmute channel 2") == ['set MIXER:Current/InCh/Fader/On 1 0 1']))
+    checks.append(("mix range sends to every mix", lines("Send channel 5 to mix 1 through 4")
+                   == [f'set MIXER:Current/InCh/ToMix/On 4 {mix} 1' for mix in range(4)]))
+    checks.append(("channels beyond the console are rejected", lines("Mute channels 40 through 41") == ['# No channels 40-41']))
+    checks.append(("range without an action is rejected", lines("Turn up channels 1 through 4")[0].startswith('# No action')))
+    
+    return report("🎚️  Testing Bulk Commands", checks)
+
+def test_undo_redo():
+    """Test undo/redo replay from the journal"""
+    mirror = ConsoleStateMirror()
+    engine = VoiceCommandEngine(journal=UndoJournal(mirror, depth=2))
+    level = ('MIXER:Current/InCh/Fader/Level', 0, 0)
+    on = ('MIXER:Current/InCh/Fader/On', 0, 0)
+    # As after warm-up: the desk's faders and mutes have been read
+    for address in (level[0], on[0]):
+        for x, y, value in list(mirror.items(address)):
+            mirror.set(address, x, y, value)
+    
+    checks = []
+    
+    engine.process_command("Set channel 1 to minus 10")
+    engine.process_command("Kill channel 1")
+    results = engine.process_command("Undo")
+    checks.append(("undo restores mute", results[0].command == 'set MIXER:Current/InCh/Fader/On 0 0 1' and mirror.get(*on) == 1))
+    
+    results = engine.process_command("Redo")
+    checks.append(("redo re-applies mute", results[0].command == 'set MIXER:Current/InCh/Fader/On 0 0 0' and mirror.get(*on) == 0))
+    
+    results = engine.process_command("Mute channels 1 through 8")
+    results = engine.process_command("Undo")
+    checks.append(("bulk undo is one batch", len(results) == 1 and len(results[0].command.split('\n')) == 8))
+    
+    engine.process_command("Undo")
+    checks.append(("depth is bounded", engine.process_command("Undo")[0].command == '# Nothing to undo'))
+    checks.append(("mirror back to -10 dB", mirror.get(*level) == -1000))
+    
+    unsynced = VoiceCommandEngine(journal=UndoJournal(ConsoleStateMirror()))
+    unsynced.process_command("Set channel 1 to unity")
+    results = unsynced.process_command("Undo")
+    checks.append(("unknown prior value is not replayed", len(results) == 1 and results[0].command.startswith('# Cannot undo')))
+    unsynced.process_command("Set channel 1 to minus 10")
+    results = unsynced.process_command("Undo")
+    checks.append(("value we sent ourselves is restored", results[0].command == 'set MIXER:Current/InCh/Fader/Level 0 0 0'))
+    
+    small = UndoJournal(ConsoleStateMirror(), max_params=4)
+    before = [small.mirror.get(on[0], x, 0) for x in range(8)]
+    entry = small.record(engine.translate_command("Mute channels 1 through 8"))
+    checks.append(("oversized batch leaves the mirror untouched", entry is None and before == [small.mirror.get(on[0], x, 0) for x in range(8)]))
+    
+    return report("↩️  Testing Undo/Redo", checks)
+
 def demo_context_aware():
     """Demonstrate context-aware functionality"""
     engine = VoiceCommandEngine()
@@ -196,12 +322,17 @@ def demo_context_aware():
 
 if __name__ == "__main__":
     # Run all tests
-    passed, failed = test_engine()
+    results = [test_engine()]
     test_edge_cases()
+    results.append(test_scheduled_commands())
+    results.append(test_bulk_commands())
+    results.append(test_undo_redo())
     demo_context_aware()
+    exit_code = summarize(results)
     
     print("\n" + "=" * 60)
     print("🚀 Ready to test with the GUI!")
     print("   Run: python voice_command_server.py")
     print("   Then open: http://localhost:5000")
-    print("=" * 60)
\ No newline at end of file
+    print("=" * 60)
+    sys.exit(exit_code)
\ No newline at end of file
@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+Console Traffic Recorder
+Stores every sent command and received reply/NOTIFY as fixed-width binary
+records, and replays recordings from a memory map at N× speed
+"""
+
+import argparse
+import asyncio
+import inspect
+import mmap
+import os
+import struct
+import time
+from bisect import bisect_right
+from pathlib import Path
+from typing import Callable, Iterator, List, NamedTuple, Optional, Union
+
+from console_client import ConsoleConnection
+from console_state import AddressTable, ConsoleStateMirror
+from rcp_protocol import format_value, parse_line
+
+MAGIC = b'RCPT'
+VERSION = 1
+HEADER = struct.Struct('<4sHH')     # magic, version, record size
+RECORD = struct.Struct('<dBBHHHi')  # timestamp, direction, kind, address id, x, y, value
+INDEX = struct.Struct('<dQ')        # timestamp, record number
+
+SENT, RECEIVED = 0, 1
+
+# kind = flags | status << 2 | verb
+VERBS = ('get', 'set', 'ssrecall_ex')
+STATUSES = (None, 'OK', 'OKm', 'NOTIFY', 'ERROR')
+STRING_VALUE = 0x80  # Value is an offset into the .str side file
+NO_VALUE = 0x40      # get requests carry no value
+NO_ADDRESS = 0xFFFF  # Scene recalls and lines without a known address
+
+
+class TrafficRecord(NamedTuple):
+    """One decoded record"""
+    timestamp: float
+    direction: int
+    verb: str
+    status: Optional[str]
+    address: str
+    x: int
+    y: int
+    value: Union[int, str, None]
+
+    def line(self) -> str:
+        """Rebuild the RCP line as it was on the wire"""
+        prefix = f"{self.status} " if self.status else ""
+        if self.verb == 'ssrecall_ex':
+            return f"{prefix}ssrecall_ex scene_{self.value:02d}"
+        text = f"{prefix}{self.verb} {self.address} {self.x} {self.y}"
+        return text if self.value is None else f"{text} {format_value(self.value)}"
+
+
+class TrafficRecorder:
+    """Append-only binary log of console traffic
+
+    ``<path>`` holds a small header then 20-byte records, ``<path>.idx`` one
+    (timestamp, record number) entry every ``index_every`` records for time
+    seeks, and ``<path>.str`` the rare string values (labels). Use ``tap`` as a
+    ConsoleConnection traffic tap, or call ``record`` directly. Reopening a
+    recording appends to it, after dropping a last record cut short by a crash.
+    """
+
+    def __init__(self, path: Union[str, Path], table: Optional[AddressTable] = None,
+                 index_every: int = 1024):
+        self.path = Path(path)
+        self.table = table or AddressTable.load()
+        self.index_every = index_every
+        self.count = self._trim() if self.path.exists() else 0
+        new = not self.path.exists() or self.path.stat().st_size == 0
+        self.records_file = self.path.open('ab')
+        self.index_file = Path(f"{self.path}.idx").open('ab')
+        self.strings_file = Path(f"{self.path}.str").open('ab')
+        if new:
+            self.records_file.write(HEADER.pack(MAGIC, VERSION, RECORD.size))
+        self.skipped = 0
+
+    def tap(self, sent: bool, line: str):
+        """ConsoleConnection traffic tap: a line that cannot be recorded is skipped, never raised into a send"""
+        try:
+            self.record(SENT if sent else RECEIVED, line)
+        except (OSError, ValueError):  # Disk full, or the recorder already closed
+            self.skipped += 1
+
+    def record(self, direction: int, line: str, timestamp: Optional[float] = None):
+        """Append one RCP line, lines that are not get/set/recall or do not fit a record are skipped"""
+        timestamp = time.time() if timestamp is None else timestamp
+        status, _, rest = line.partition(' ')
+        if status not in STATUSES:
+            status, rest = None, line
+        message = parse_line(line)
+        flags = 0
+        if message is not None:
+            info = self.table.get(message.address)
+            if info is None:
+                self.skipped += 1
+                return
+            verb, address_id, x, y, value = message.verb, info.address_id, message.x, message.y, message.value
+            if isinstance(value, str):
+                flags = STRING_VALUE
+                value = self._store_string(value)
+            elif value is None:
+                value = 0
+                flags = NO_VALUE
+        elif rest.startswith('ssrecall_ex scene_') and rest[18:].isdigit():
+            verb, address_id, x, y, value = 'ssrecall_ex', NO_ADDRESS, 0, 0, int(rest[18:])
+        else:
+            self.skipped += 1
+            return
+        kind = flags | STATUSES.index(status) << 2 | VERBS.index(verb)
+        try:
+            record = RECORD.pack(timestamp, direction, kind, address_id, x, y, value)
+        except struct.error:  # Index past 65535 or value outside int32
+            self.skipped += 1
+            return
+        if self.count % self.index_every == 0:
+            self.index_file.write(INDEX.pack(timestamp, self.count))
+        self.records_file.write(record)
+        self.count += 1
+
+    def flush(self):
+        for f in (self.records_file, self.index_file, self.strings_file):
+            f.flush()
+
+    def close(self):
+        for f in (self.records_file, self.index_file, self.strings_file):
+            f.close()
+
+    def _trim(self) -> int:
+        """Cut a partly written last record (and index entry), returns the whole records kept
+
+        Appending after a partial record would shift every later record off
+        the fixed-width grid and garble the rest of the recording.
+        """
+        size = self.path.stat().st_size
+        if size < HEADER.size:  # Not even the header made it, start over
+            os.truncate(self.path, 0)
+            return 0
+        with self.path.open('rb') as f:
+            magic, _, record_size = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC or record_size != RECORD.size:
+            raise ValueError(f"{self.path} is not an RCP traffic recording")
+        count = (size - HEADER.size) // RECORD.size
+        if size != HEADER.size + count * RECORD.size:
+            os.truncate(self.path, HEADER.size + count * RECORD.size)
+
+        index_path = Path(f"{self.path}.idx")
+        if index_path.exists():
+            raw = index_path.read_bytes()
+            # Entries are written just before their record, keep those whose record exists
+            kept = 0
+            for _, number in INDEX.iter_unpack(raw[:len(raw) - len(raw) % INDEX.size]):
+                if number >= count:
+                    break
+                kept += 1
+            if len(raw) != kept * INDEX.size:
+                os.truncate(index_path, kept * INDEX.size)
+        return count
+
+    def _store_string(self, value: str) -> int:
+        offset = self.strings_file.tell()
+        data = value.encode('utf-8')
+        self.strings_file.write(struct.pack('<H', len(data)) + data)
+        return offset
+
+
+class TrafficReader:
+    """Memory-mapped view of a recording; records are decoded lazily"""
+
+    def __init__(self, path: Union[str, Path], table: Optional[AddressTable] = None):
+        self.path = Path(path)
+        self.table = table or AddressTable.load()
+        self._file = self.path.open('rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, size = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or size != RECORD.size:
+            raise ValueError(f"{self.path} is not an RCP traffic recording")
+        self.count = (len(self._map) - HEADER.size) // RECORD.size
+        index_path = Path(f"{self.path}.idx")
+        raw = index_path.read_bytes() if index_path.exists() else b''
+        entries = list(INDEX.iter_unpack(raw[:len(raw) - len(raw) % INDEX.size]))
+        self.index_times = [t for t, _ in entries]
+        self.index_records = [n for _, n in entries]
+        strings_path = Path(f"{self.path}.str")
+        self.strings = strings_path.read_bytes() if strings_path.exists() else b''
+
+    def __len__(self):
+        return self.count
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def raw(self, start: int = 0, stop: Optional[int] = None) -> Iterator[tuple]:
+        """Undecoded record tuples straight from the memory map"""
+        stop = self.count if stop is None else min(stop, self.count)
+        unpack_from = RECORD.unpack_from
+        for offset in range(HEADER.size + start * RECORD.size, HEADER.size + stop * RECORD.size, RECORD.size):
+            yield unpack_from(self._map, offset)
+
+    def records(self, start: int = 0, stop: Optional[int] = None) -> Iterator[TrafficRecord]:
+        by_id = self.table.by_id
+        for timestamp, direction, kind, address_id, x, y, value in self.raw(start, stop):
+            verb = VERBS[kind & 0x03]
+            status = STATUSES[kind >> 2 & 0x07]
+            if kind & STRING_VALUE:
+                length, = struct.unpack_from('<H', self.strings, value)
+                value = self.strings[value + 2:value + 2 + length].decode('utf-8')
+            elif kind & NO_VALUE:
+                value = None
+            info = by_id.get(address_id)
+            yield TrafficRecord(timestamp, direction, verb, status,
+                                info.address if info else '', x, y, value)
+
+    def find_time(self, timestamp: float) -> int:
+        """Record number to start from to see everything at or after ``timestamp``"""
+        position = bisect_right(self.index_times, timestamp) - 1
+        start = self.index_records[position] if position >= 0 else 0
+        for offset, record in enumerate(self.raw(start)):
+            if record[0] >= timestamp:
+                return start + offset
+        return self.count
+
+
+async def replay(reader: TrafficReader, sink: Callable[[List[str]], object], speed: float = 1.0,
+                 direction: Optional[int] = None, start: int = 0) -> int:
+    """Feed recorded lines to ``sink`` in bursts, ``speed`` times faster than recorded
+
+    A speed of 0 replays as fast as possible. Awaitable sink results are awaited,
+    so the sink can be a ConsoleConnection's ``send_lines``. Returns lines replayed.
+    """
+    loop = asyncio.get_running_loop()
+    first = None
+    began = loop.time()
+    burst: List[str] = []
+    replayed = 0
+    for record in reader.records(start):
+        if direction is not None and record.direction != direction:
+            continue
+        if first is None:
+            first = record.timestamp
+        if speed > 0:
+            due = began + (record.timestamp - first) / speed
+            if due - loop.time() > 0.001:
+                replayed += await _emit(sink, burst)
+                burst = []
+                await asyncio.sleep(due - loop.time())
+        burst.append(record.line())
+        if len(burst) >= 256:
+            replayed += await _emit(sink, burst)
+            burst = []
+    return replayed + await _emit(sink, burst)
+
+
+async def _emit(sink, burst: List[str]) -> int:
+    if not burst:
+        return 0
+    result = sink(burst)
+    if inspect.isawaitable(result):
+        await result
+    return len(burst)
+
+
+async def record_console(args):
+    recorder = TrafficRecorder(args.file)
+    connection = ConsoleConnection(args.console, args.port)
+    connection.traffic_taps.append(recorder.tap)
+    await connection.connect()
+    print(f"⏺️  Recording {args.console}:{args.port} to {args.file}")
+    try:
+        while connection.connected:
+            await asyncio.sleep(1.0)
+            recorder.flush()
+    finally:
+        await connection.close()
+        recorder.close()
+        print(f"📊 {recorder.count} records written")
+
+
+async def replay_file(args):
+    reader = TrafficReader(args.file)
+    start = time.perf_counter()
+    if args.console:
+        connection = ConsoleConnection(args.console, args.port)
+        await connection.connect()
+        count = await replay(reader, connection.send_lines, args.speed, SENT)
+        await connection.close()
+    else:
+        mirror = ConsoleStateMirror(reader.table)
+        count = await replay(reader, lambda lines: [mirror.apply_line(line) for line in lines],
+                             args.speed, RECEIVED)
+        print(f"🎛️  Mirror version after replay: {mirror.version}")
+    elapsed = time.perf_counter() - start
+    pace = f"{args.speed:g}× speed" if args.speed else "full speed"
+    print(f"▶️  Replayed {count} of {len(reader)} records in {elapsed:.2f} s at {pace}")
+    reader.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Record and replay Yamaha console traffic')
+    sub = parser.add_subparsers(dest='action', required=True)
+    rec = sub.add_parser('record', help='Record everything a console sends')
+    rec.add_argument('file', help='Recording file, e.g. show.rcpt')
+    rec.add_argument('--console', default='192.168.0.128', help='Console IP (default: 192.168.0.128)')
+    rec.add_argument('--port', type=int, default=49280, help='Console RCP port (default: 49280)')
+    play = sub.add_parser('replay', help='Replay a recording into a console/simulator or a state mirror')
+    play.add_argument('file', help='Recording file')
+    play.add_argument('--speed', type=float, default=1.0, help='Speed factor, 0 for as fast as possible (default: 1)')
+    play.add_argument('--console', help='Re-send recorded commands to this console or simulator')
+    play.add_argument('--port', type=int, default=49280, help='Console RCP port (default: 49280)')
+    info = sub.add_parser('info', help='Summarise a recording')
+    info.add_argument('file', help='Recording file')
+    args = parser.parse_args()
+
+    try:
+        if args.action == 'record':
+            asyncio.run(record_console(args))
+        elif args.action == 'replay':
+            asyncio.run(replay_file(args))
+        else:
+            reader = TrafficReader(args.file)
+            if len(reader):
+                first, = reader.records(0, 1)
+                last, = reader.records(len(reader) - 1)
+                print(f"📼 {len(reader)} records over {last.timestamp - first.timestamp:.1f} s")
+            else:
+                print("📼 Empty recording")
+            reader.close()
+    except KeyboardInterrupt:
+        print("\n🛑 Stopped.")
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,41 +6,95 @@ Receives text transmissions over UDP and displays them
 
 import socket
 import json
-import threading
+import errno
+import multiprocessing
+import select
 from datetime import datetime
 import argparse
 import sys
 
+from seen_cache import SeenCache
+
+BATCH_SIZE = 64            # Datagrams drained per wakeup before printing and acking
+RECV_BUFFER = 1024 * 1024  # Requested socket receive buffer, absorbs bursts while a batch is handled
+DEDUP_WINDOW = 30.0        # Seconds a message ID is remembered, longer than the app's resend window
+DEDUP_ENTRIES = 10_000     # Message IDs remembered at most
+
 class WiFiTextReceiver:
-    def __init__(self, host='0.0.0.0', port=8080):
+    def __init__(self, host='0.0.0.0', port=8080, reuse_port=False, batch_size=BATCH_SIZE,
+                 dedup_window=DEDUP_WINDOW):
         self.host = host
         self.port = port
         self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        if reuse_port:
+            # Several worker processes bind the same port, the kernel spreads datagrams between them
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RECV_BUFFER)
+        self.socket.setblocking(False)
         self.is_running = False
+        self.batch_size = batch_size
+        self.output = []  # Lines printed once per batch
+        self.acks = []    # (payload, addr) sent once per batch
+        self.received = 0
+        self.batches = 0
+        # Resent messages get the original ack instead of being handled twice
+        self.seen = SeenCache(DEDUP_ENTRIES, dedup_window) if dedup_window > 0 else None
+        self.duplicates = 0
         
     def start_server(self):
         try:
             self.socket.bind((self.host, self.port))
-            self.is_running = True
-            print(f"🎙️  WiFi Text Receiver listening on {self.host}:{self.port}")
-            print("📱 Ready to receive messages from iOS Voice Control app")
-            print("🔄 Waiting for connections...\n")
-            
-            while self.is_running:
-                try:
-                    data, addr = self.socket.recvfrom(4096)
-                    self.handle_message(data, addr)
-                except Exception as e:
-                    if self.is_running:
-                        print(f"❌ Error receiving message: {e}")
-                        
+            self.port = self.socket.getsockname()[1]
         except OSError as e:
-            if e.errno == 48:  # Address already in use
+            if e.errno in (errno.EADDRINUSE, 48):  # Address already in use
                 print(f"❌ Port {self.port} is already in use. Try a different port with --port")
-                sys.exit(1)
             else:
                 print(f"❌ Failed to start server: {e}")
-                sys.exit(1)
+            sys.exit(1)
+        
+        self.is_running = True
+        print(f"🎙️  WiFi Text Receiver listening on {self.host}:{self.port}")
+        print("📱 Ready to receive messages from iOS Voice Control app")
+        print("🔄 Waiting for connections...\n")
+        
+        while self.is_running:
+            try:
+                readable, _, _ = select.select([self.socket], [], [], 0.5)
+                if readable:
+                    self.receive_batch()
+            except Exception as e:
+                if self.is_running:
+                    print(f"❌ Error receiving message: {e}")
+    
+    def receive_batch(self):
+        """Drain up to ``batch_size`` queued datagrams, then print and acknowledge them together"""
+        count = 0
+        while count < self.batch_size:
+            try:
+                data, addr = self.socket.recvfrom(4096)
+            except (BlockingIOError, InterruptedError):
+                break
+            count += 1
+            self.handle_message(data, addr)
+        self.received += count
+        self.batches += 1
+        self.flush_batch()
+        return count
+    
+    def flush_batch(self):
+        """One terminal write and a burst of ack sends for the whole batch"""
+        if self.output:
+            sys.stdout.write("\n".join(self.output) + "\n")
+            sys.stdout.flush()
+            self.output.clear()
+        for payload, addr in self.acks:
+            try:
+                self.socket.sendto(payload, addr)
+            except BlockingIOError:
+                pass  # Send buffer full: acks are best-effort, the app resends unacked messages
+            except OSError as e:
+                print(f"⚠️  Failed to send acknowledgment: {e}")
+        self.acks.clear()
                 
     def handle_message(self, data, addr):
         try:
@@ -55,49 +109,62 @@ class WiFiTextReceiver:
                 self.handle_plain_message(message_str, addr)
                 
         except Exception as e:
-            print(f"❌ Error handling message: {e}")
+            self.output.append(f"❌ Error handling message: {e}")
     
     def handle_json_message(self, message, addr):
         """Handle structured JSON message from iOS app"""
         timestamp = datetime.now().strftime('%H:%M:%S')
+        message_id = message.get('id')
+        if not isinstance(message_id, (str, int)):
+            message_id = None
+        
+        # A resend of a message already handled: repeat its ack, do not apply it again
+        if self.seen is not None and message_id is not None:
+            ack = self.seen.get(message_id)
+            if ack is not None:
+                self.duplicates += 1
+                self.output.append(f"🔁 [{timestamp}] Duplicate {message_id} from {addr[0]}, ack re-sent\n")
+                self.acks.append((ack, addr))
+                return
+        
         content = message.get('content', 'N/A')
         msg_type = message.get('messageType', 'unknown')
         
-        print(f"📨 [{timestamp}] Message from {addr[0]}")
-        print(f"   Content: {content}")
-        print(f"   Type: {msg_type}")
-        print(f"   ID: {message.get('id', 'N/A')}")
+        self.output.append(f"📨 [{timestamp}] Message from {addr[0]}")
+        self.output.append(f"   Content: {content}")
+        self.output.append(f"   Type: {msg_type}")
+        self.output.append(f"   ID: {message.get('id', 'N/A')}")
         
         # Check if this might be an RCP command
         if self.is_potential_rcp_command(content):
-            print(f"   🎵 Potential RCP command detected!")
+            self.output.append(f"   🎵 Potential RCP command detected!")
             rcp_command = self.convert_to_rcp(content)
             if rcp_command:
-                print(f"   RCP: {rcp_command}")
+                self.output.append(f"   RCP: {rcp_command}")
         
-        print("")  # Empty line for readability
+        self.output.append("")  # Empty line for readability
         
         # Send acknowledgment back to iOS
-        self.send_acknowledgment(message, addr)
+        ack = self.send_acknowledgment(message, addr)
+        if self.seen is not None and message_id is not None:
+            self.seen.put(message_id, ack)
     
     def handle_plain_message(self, message_str, addr):
         """Handle plain text message"""
         timestamp = datetime.now().strftime('%H:%M:%S')
-        print(f"📝 [{timestamp}] Plain text from {addr[0]}: {message_str}")
-        print("")
+        self.output.append(f"📝 [{timestamp}] Plain text from {addr[0]}: {message_str}")
+        self.output.append("")
     
     def send_acknowledgment(self, original_message, addr):
-        """Send acknowledgment back to iOS app"""
-        try:
-            response = json.dumps({
-                "status": "received",
-                "timestamp": datetime.now().isoformat(),
-                "messageId": original_message.get('id'),
-                "receiver": "computer"
-            })
-            self.socket.sendto(response.encode('utf-8'), addr)
-        except Exception as e:
-            print(f"⚠️  Failed to send acknowledgment: {e}")
+        """Queue an acknowledgment back to iOS app, sent with the rest of the batch"""
+        response = json.dumps({
+            "status": "received",
+            "timestamp": datetime.now().isoformat(),
+            "messageId": original_message.get('id'),
+            "receiver": "computer"
+        }).encode('utf-8')
+        self.acks.append((response, addr))
+        return response
     
     def is_potential_rcp_command(self, content):
         """Detect if message content might be a mixing console command"""
@@ -126,13 +193,60 @@ class WiFiTextReceiver:
         self.is_running = False
         self.socket.close()
 
+def run_worker(host, port, batch_size=BATCH_SIZE, dedup_window=DEDUP_WINDOW):
+    """Entry point of one SO_REUSEPORT worker process"""
+    receiver = WiFiTextReceiver(host, port, reuse_port=True, batch_size=batch_size, dedup_window=dedup_window)
+    try:
+        receiver.start_server()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        receiver.stop_server()
+
+def serve_workers(host, port, workers, batch_size=BATCH_SIZE, dedup_window=DEDUP_WINDOW):
+    """Run ``workers`` receiver processes sharing one port
+    
+    Linux hashes each sender's address to one worker, so every phone keeps
+    its order (and its resends reach the worker that saw the original)
+    while several phones use several cores. Other systems may deliver
+    everything to a single worker.
+    """
+    context = multiprocessing.get_context('spawn')
+    processes = [context.Process(target=run_worker, args=(host, port, batch_size, dedup_window),
+                                 name=f'udp-worker-{n + 1}')
+                 for n in range(workers)]
+    for process in processes:
+        process.start()
+    print(f"🧵 {workers} receiver processes sharing port {port}")
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        # Ctrl+C reaches the whole process group, workers stop on their own
+        print("\n🛑 Shutting down receivers...")
+        for process in processes:
+            process.join(5.0)
+            if process.is_alive():
+                process.terminate()
+        print("✅ Receivers stopped.")
+
 def main():
     parser = argparse.ArgumentParser(description='WiFi Text Receiver for iOS Voice Control')
     parser.add_argument('--port', type=int, default=8080, help='Port to listen on (default: 8080)')
     parser.add_argument('--host', default='0.0.0.0', help='Host to bind to (default: 0.0.0.0)')
+    parser.add_argument('--workers', type=int, default=1, help='Receiver processes sharing the port via SO_REUSEPORT (default: 1)')
+    parser.add_argument('--batch', type=int, default=BATCH_SIZE, help=f'Datagrams handled per wakeup (default: {BATCH_SIZE})')
+    parser.add_argument('--dedup-window', type=float, default=DEDUP_WINDOW,
+                        help=f'Seconds a message ID is remembered to drop resends, 0 disables (default: {DEDUP_WINDOW:g})')
     args = parser.parse_args()
     
-    receiver = WiFiTextReceiver(args.host, args.port)
+    if args.workers > 1:
+        if hasattr(socket, 'SO_REUSEPORT'):
+            serve_workers(args.host, args.port, args.workers, args.batch, args.dedup_window)
+            return
+        print("⚠️  SO_REUSEPORT is not available here, running a single receiver")
+    
+    receiver = WiFiTextReceiver(args.host, args.port, batch_size=args.batch, dedup_window=args.dedup_window)
     
     try:
         receiver.start_server()
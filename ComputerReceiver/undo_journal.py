@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Undo/Redo Journal for applied RCP command batches
+Stores the prior value of every parameter a batch touched, as compact
+arrays, so "undo" and "redo" can be replayed as one pipelined burst
+"""
+
+from array import array
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from console_state import ConsoleStateMirror
+from rcp_protocol import command_lines, format_set, parse_line
+
+
+@dataclass
+class JournalEntry:
+    """Parameter diff of one applied batch
+
+    Integer values are packed into parallel arrays (15 bytes per parameter);
+    the rare string parameters (labels) keep their text in ``strings``.
+    ``known`` marks the parameters whose prior value the mirror had actually
+    seen, only those are restored by undo.
+    """
+    description: str
+    address_ids: array = field(default_factory=lambda: array('H'))
+    xs: array = field(default_factory=lambda: array('H'))
+    ys: array = field(default_factory=lambda: array('H'))
+    before: array = field(default_factory=lambda: array('i'))
+    after: array = field(default_factory=lambda: array('i'))
+    known: bytearray = field(default_factory=bytearray)
+    strings: Dict[int, Tuple[str, str]] = field(default_factory=dict)  # position -> (before, after)
+
+    def __len__(self):
+        return len(self.address_ids)
+
+
+class UndoJournal:
+    """Bounded undo/redo stacks of parameter diffs taken from the state mirror
+
+    ``record`` captures prior values before a batch is applied and updates the
+    mirror optimistically with the new ones; console replies and NOTIFYs
+    correct it later. Both stacks are deques capped at ``depth`` entries, so
+    pushing, undoing and redoing are O(1) regardless of history length.
+    """
+
+    def __init__(self, mirror: ConsoleStateMirror, depth: int = 50, max_params: int = 4096):
+        self.mirror = mirror
+        self.depth = depth
+        self.max_params = max_params  # Larger batches are not journalled
+        self.undo_stack: deque = deque(maxlen=depth)
+        self.redo_stack: deque = deque(maxlen=depth)
+
+    def record(self, commands, description: str = "") -> Optional[JournalEntry]:
+        """Journal a batch about to be applied, returns None if nothing is undoable"""
+        table = self.mirror.table
+        entry = JournalEntry(description)
+        positions: Dict[Tuple[int, int, int], int] = {}
+
+        # Size the batch before touching the mirror, an oversized one must leave it as it was
+        writes = []
+        keys = set()
+        for line in command_lines(commands):
+            message = parse_line(line)
+            if message is None or message.verb != 'set' or message.value is None:
+                continue
+            info = table.get(message.address)
+            if info is None:
+                continue
+            try:
+                info.slot(message.x, message.y)
+            except IndexError:
+                continue
+            writes.append((info, message))
+            keys.add((info.address_id, message.x, message.y))
+        if len(keys) > self.max_params:
+            print(f"⚠️  Batch of more than {self.max_params} parameters not journalled")
+            return None
+
+        for info, message in writes:
+            known = self.mirror.known(message.address, message.x, message.y)
+            previous = self.mirror.set(message.address, message.x, message.y, message.value)
+            current = self.mirror.get(message.address, message.x, message.y)
+
+            key = (info.address_id, message.x, message.y)
+            position = positions.get(key)
+            if position is None:
+                position = len(entry)
+                positions[key] = position
+                entry.address_ids.append(info.address_id)
+                entry.xs.append(message.x)
+                entry.ys.append(message.y)
+                entry.known.append(known)
+                if info.is_integer:
+                    entry.before.append(previous)
+                    entry.after.append(current)
+                else:
+                    entry.before.append(0)
+                    entry.after.append(0)
+                    entry.strings[position] = (previous, current)
+            elif info.is_integer:
+                entry.after[position] = current
+            else:
+                entry.strings[position] = (entry.strings[position][0], current)
+
+        if not len(entry):
+            return None
+        self.undo_stack.append(entry)
+        self.redo_stack.clear()
+        return entry
+
+    def undo(self) -> Optional[Tuple[JournalEntry, List[str]]]:
+        """Pop the last entry and return it with the lines that restore prior values
+
+        Parameters whose prior value was never seen (e.g. before the mirror
+        was synced) are left alone rather than reset to a catalog default;
+        the lines are empty when none was seen.
+        """
+        if not self.undo_stack:
+            return None
+        entry = self.undo_stack.pop()
+        self.redo_stack.append(entry)
+        return entry, self._replay(entry, restore=True)
+
+    def redo(self) -> Optional[Tuple[JournalEntry, List[str]]]:
+        """Re-apply the most recently undone entry"""
+        if not self.redo_stack:
+            return None
+        entry = self.redo_stack.pop()
+        self.undo_stack.append(entry)
+        return entry, self._replay(entry, restore=False)
+
+    def clear(self):
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+
+    def _replay(self, entry: JournalEntry, restore: bool) -> List[str]:
+        """Build set lines for one side of the diff and apply them to the mirror"""
+        by_id = self.mirror.table.by_id
+        values = entry.before if restore else entry.after
+        lines = []
+        for position in range(len(entry)):
+            if restore and not entry.known[position]:
+                continue
+            address = by_id[entry.address_ids[position]].address
+            x, y = entry.xs[position], entry.ys[position]
+            if position in entry.strings:
+                value = entry.strings[position][0 if restore else 1]
+            else:
+                value = values[position]
+            self.mirror.set(address, x, y, value)
+            lines.append(format_set(address, x, y, value))
+        return lines
@@ -5,7 +5,9 @@ Converts natural language voice commands to Yamaha RCP protocol commands
 """
 
 import re
-from typing import Dict, List, Tuple, Optional, Union
+from array import array
+from functools import cached_property
+from typing import Any, Dict, Iterator, List, Set, Tuple, Optional, Union
 from dataclasses import dataclass
 import json
 
@@ -18,12 +20,58 @@ class RCPCommand:
     confidence: float = 1.0
 
 
+@dataclass
+class BulkRCPCommand:
+    """One parameter value applied across many channels
+
+    Kept as a single compact record (address, channel index array, value)
+    instead of one RCPCommand per channel; the sender expands it into a
+    pipelined burst with ``lines()``.
+    """
+    address: str
+    channels: array  # 0-based X indices
+    y: int
+    value: Union[int, str]
+    description: str
+    confidence: float = 1.0
+    
+    def lines(self) -> Iterator[str]:
+        """Yield the individual RCP set lines of this bulk operation"""
+        prefix = f"set {self.address} "
+        suffix = f" {self.y} {self.value}"
+        for x in self.channels:
+            yield f"{prefix}{x}{suffix}"
+            
+    @cached_property
+    def command(self) -> str:
+        """All expanded RCP lines, newline separated"""
+        return "\n".join(self.lines())
+        
+    def __len__(self):
+        return len(self.channels)
+
+
+@dataclass
+class ScheduleSpec:
+    """A voice command deferred by a time or cue prefix"""
+    command: str
+    delay: Optional[float] = None  # Seconds from now
+    cue: Optional[str] = None  # Cue name such as "end of song"
+    unreadable: Optional[str] = None  # Time phrase that was recognised but could not be read
+
+
 class VoiceCommandEngine:
     """Rule-based engine for converting voice commands to RCP commands"""
     
-    def __init__(self):
+    def __init__(self, scheduler=None, journal=None):
         self.channel_labels = {}  # Store channel labels for context-aware commands
         self.dca_labels = {}  # Store DCA labels
+        self.scheduler = scheduler  # Optional CommandScheduler for deferred commands
+        self.journal = journal  # Optional UndoJournal recording every processed batch
+        self.max_channels = 40  # InCh count on TF series consoles
+        self.max_mixes = 20  # Mix buses on TF series consoles
+        self.label_index: Dict[str, Set[int]] = {}  # Label word -> channel numbers
+        self.label_by_channel: Dict[int, str] = {}  # Channel number -> current label
         
         # Common word variations for numbers
         self.number_words = {
@@ -43,6 +91,13 @@ class VoiceCommandEngine:
             'right': 32, 'hard right': 63, 'hard_right': 63, 'hardright': 63
         }
         
+        # Time unit multipliers for scheduled commands
+        self.time_units = {
+            'second': 1, 'seconds': 1, 'sec': 1, 'secs': 1,
+            'minute': 60, 'minutes': 60, 'min': 60, 'mins': 60,
+            'hour': 3600, 'hours': 3600
+        }
+        
         # dB value mapping
         self.db_keywords = {
             'unity': 0, 'zero': 0, 'nominal': 0,
@@ -115,6 +170,9 @@ class VoiceCommandEngine:
                 channel_idx = channel_num - 1  # Convert to 0-based index
                 
                 if action == 'set':
+                    # "channel 1 to mix 3" is a send, not a fader level
+                    if re.match(r'(?:mix|aux|monitor|matrix)\b', match.group(2)):
+                        continue
                     db_value = self.parse_db_value(match.group(2))
                     if db_value is not None:
                         results.append(RCPCommand(
@@ -146,7 +204,7 @@ class VoiceCommandEngine:
         
         # Patterns for mute commands
         patterns = [
-            (r'(?:mute|kill|cut|silence|turn\s+off)\s+channel\s+(\d+)', 0),  # Mute
+            (r'\b(?:mute|kill|cut|silence|turn\s+off)\s+channel\s+(\d+)', 0),  # Mute, not inside "unmute"
             (r'(?:unmute|restore|open|activate|turn\s+on)\s+channel\s+(\d+)', 1),  # Unmute
             (r'channel\s+(\d+)\s+(?:on|unmute)', 1),  # Unmute
             (r'channel\s+(\d+)\s+(?:off|mute)', 0),  # Mute
@@ -187,6 +245,7 @@ class VoiceCommandEngine:
                     
                     # Store label for context-aware commands
                     self.channel_labels[label.lower()] = channel_num
+                    self.index_channel_label(channel_num, label)
                     
                     results.append(RCPCommand(
                         f'set MIXER:Current/InCh/Label/Name {channel_idx} 0 "{label}"',
@@ -406,27 +465,381 @@ class VoiceCommandEngine:
         """Process context-aware commands using stored labels"""
         results = []
         
+        # Commands that define labels must not be rewritten by existing labels
+        if re.search(r'\b(?:name|label|call|tag|mark)\s+(?:channel|dca|vca|group)\b|'
+                     r'\bchannel\s+\d+\s+(?:name|label|is|called)\b', command.lower()):
+            return results
+            
         # Check for labeled channels
         for label, channel_num in self.channel_labels.items():
             if label in command.lower():
                 # Replace label with channel number and reprocess
                 modified_command = command.lower().replace(label, f"channel {channel_num}")
-                results.extend(self.process_command(modified_command))
+                results.extend(self.translate_command(modified_command))
                 
         # Check for labeled DCAs
         for label, dca_num in self.dca_labels.items():
             if label in command.lower():
                 # Replace label with DCA number and reprocess
                 modified_command = command.lower().replace(label, f"dca {dca_num}")
-                results.extend(self.process_command(modified_command))
+                results.extend(self.translate_command(modified_command))
+                
+        return results
+        
+    @staticmethod
+    def label_word(word: str) -> str:
+        """Reduce a label word to its index key so 'drums' matches 'kick drum'"""
+        word = word.lower()
+        if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+            word = word[:-1]
+        return word
+        
+    def index_channel_label(self, channel_num: int, label: str):
+        """Update the word -> channels label index for a relabelled channel"""
+        old_label = self.label_by_channel.get(channel_num)
+        if old_label is not None:
+            for word in re.findall(r'[a-z0-9]+', old_label.lower()):
+                channels = self.label_index.get(self.label_word(word))
+                if channels is not None:
+                    channels.discard(channel_num)
+                    if not channels:
+                        del self.label_index[self.label_word(word)]
+        self.label_by_channel[channel_num] = label
+        for word in re.findall(r'[a-z0-9]+', label.lower()):
+            self.label_index.setdefault(self.label_word(word), set()).add(channel_num)
+            
+    def parse_channel_set(self, command: str) -> Optional[Tuple[List[int], str, Tuple[int, int], bool]]:
+        """Find a multi-channel reference in a command
+        
+        Handles ranges ("channels 1 through 16", "1-8"), lists ("channels 1, 3 and 5"),
+        parity and all ("odd channels", "all channels") and label groups resolved
+        through the label index ("all drums", "drums"). Returns the channel
+        numbers (empty when they are out of range), a spoken name for
+        descriptions, the span to replace and whether it was a label group.
+        Numbers right after "mix", "scene" or "dca" are not channels.
+        """
+        command_lower = command.lower()
+        number = r'(\d+|' + '|'.join(sorted(self.number_words, key=len, reverse=True)) + r')'
+        parity = r'(?:(odd|even)(?:[-\s]numbered)?\s+)?'
+        
+        range_patterns = [
+            rf'\b{parity}(?:channels?\s+)?{number}\s+(?:through|thru)\s+{number}\b',
+            rf'\b{parity}channels\s+{number}\s+to\s+{number}\b',
+            rf'\b{parity}(?:channels?\s+)?(\d+)[-–](\d+)\b',
+        ]
+        
+        for pattern in range_patterns:
+            for match in re.finditer(pattern, command_lower):
+                if re.search(r'\b(?:mix(?:es)?|aux(?:es)?|monitors?|scenes?|dcas?)\s+$', command_lower[:match.start()]):
+                    continue
+                start = self.parse_number(match.group(2))
+                end = self.parse_number(match.group(3))
+                if start is None or end is None:
+                    continue
+                name = f"channels {start}-{end}"
+                if not 1 <= start < end <= self.max_channels:
+                    return [], name, match.span(), False
+                channels = list(range(start, end + 1))
+                if match.group(1):
+                    remainder = 1 if match.group(1) == 'odd' else 0
+                    channels = [ch for ch in channels if ch % 2 == remainder]
+                    name = f"{match.group(1)} {name}"
+                return channels, name, match.span(), False
+                
+        match = re.search(rf'\bchannels\s+({number}(?:\s*(?:,|and|&)\s*{number})+)\b', command_lower)
+        if match:
+            channels = []
+            for token in re.split(r'\s*(?:,|and|&)\s*', match.group(1)):
+                channel_num = self.parse_number(token)
+                if channel_num is None or not 1 <= channel_num <= self.max_channels:
+                    return [], f"channels {match.group(1)}", match.span(), False
+                if channel_num not in channels:
+                    channels.append(channel_num)
+            return channels, f"channels {', '.join(map(str, channels))}", match.span(), False
+            
+        match = re.search(r'\b(?:the\s+)?(odd|even|all)(?:[-\s]numbered)?\s+(?:input\s+)?channels\b', command_lower)
+        if match:
+            channels = list(range(1, self.max_channels + 1))
+            if match.group(1) != 'all':
+                remainder = 1 if match.group(1) == 'odd' else 0
+                channels = [ch for ch in channels if ch % 2 == remainder]
+            return channels, f"{match.group(1)} channels", match.span(), False
+            
+        # Label groups: "all drums" always, a bare "drums" only if it names 2+ channels
+        # and is not also a DCA label (those stay with the DCA processor)
+        for match in re.finditer(r'\b(all\s+(?:the\s+|of\s+the\s+)?)?([a-z]+)\b', command_lower):
+            word = match.group(2)
+            channels = self.label_index.get(self.label_word(word))
+            if not channels:
+                continue
+            if not match.group(1) and (len(channels) < 2 or word in self.dca_labels):
+                continue
+            channels = sorted(channels)
+            start, end = match.span()
+            if not match.group(1):
+                article = re.search(r'\bthe\s+$', command_lower[:start])
+                if article:
+                    start = article.start()
+            return channels, f"{word} (channels {', '.join(map(str, channels))})", (start, end), True
+            
+        return None
+        
+    def process_bulk_commands(self, command: str) -> List[Union[RCPCommand, BulkRCPCommand]]:
+        """Process range and group commands into compact bulk operations
+        
+        The channel set is swapped for a single placeholder channel and run
+        through the regular per-channel processors, so every existing phrasing
+        works for ranges too; each resulting InCh set becomes one BulkRCPCommand.
+        Numbered channels out of range, or with nothing to do, are answered
+        with a "#" note instead of falling through to single-channel parsing.
+        """
+        channel_set = self.parse_channel_set(command)
+        if channel_set is None:
+            return []
+        channels, name, (start, end), label_group = channel_set
+        if not channels:
+            return [RCPCommand(f"# No {name}", f"Cannot address {name}: the console has channels 1-{self.max_channels}", 0.5)]
+        
+        placeholder = command.lower()[:start] + "channel 1" + command.lower()[end:]
+        singles = []
+        for processor in (self.process_channel_fader, self.process_channel_mute,
+                          self.process_send_to_mix, self.process_pan_commands):
+            singles.extend(processor(placeholder))
+        if not singles:
+            # Label groups may still mean something to the context-aware processor
+            return [] if label_group else [RCPCommand(f"# No action for {name}", f"Nothing to do for {name}", 0.5)]
+            
+        # One value per parameter: when two patterns disagree the later one wins
+        writes: Dict[Tuple[str, int], RCPCommand] = {}
+        others: Dict[str, RCPCommand] = {}
+        for single in singles:
+            match = re.match(r'^set (MIXER:Current/InCh/\S+) 0 (\d+) (.+)$', single.command)
+            if match:
+                key = (match.group(1), int(match.group(2)))
+                writes.pop(key, None)
+                writes[key] = single
+            else:
+                others.setdefault(single.command, single)
+                
+        results = []
+        xs = array('H', (ch - 1 for ch in channels))
+        for (address, y), single in writes.items():
+            value = single.command.rsplit(' ', 1)[1]
+            results.append(BulkRCPCommand(
+                address, xs, y,
+                int(value) if re.match(r'^-?\d+$', value) else value,
+                re.sub(r'\bchannel 1\b', name, single.description), single.confidence
+            ))
+        for single in others.values():
+            results.append(RCPCommand(single.command, re.sub(r'\bchannel 1\b', name, single.description),
+                                      single.confidence * 0.8))
+                
+        return results
+        
+    def process_mix_range(self, command: str) -> Optional[List[Union[RCPCommand, BulkRCPCommand]]]:
+        """Run a command once per mix, as in 'send channel 5 to mix 1 through 4'"""
+        number = r'(\d+|' + '|'.join(sorted(self.number_words, key=len, reverse=True)) + r')'
+        command_lower = command.lower()
+        match = re.search(rf'\b(mix|aux|monitor)(?:es|s)?\s+{number}(?:\s+(?:through|thru|to)\s+|\s*[-–]\s*){number}\b',
+                          command_lower)
+        if match is None:
+            return None
+        kind = match.group(1)
+        start = self.parse_number(match.group(2))
+        end = self.parse_number(match.group(3))
+        if start is None or end is None or not 1 <= start < end <= self.max_mixes:
+            return [RCPCommand(f"# No {kind} {match.group(2)}-{match.group(3)}",
+                               f"Cannot address {kind} {match.group(2)}-{match.group(3)}: "
+                               f"the console has mixes 1-{self.max_mixes}", 0.5)]
+        results = []
+        for mix in range(start, end + 1):
+            results.extend(self.translate_command(command_lower[:match.start()] + f"{kind} {mix}"
+                                                  + command_lower[match.end():]))
+        return results
+        
+    def parse_schedule(self, command: str) -> Optional[ScheduleSpec]:
+        """Split a time or cue prefix/suffix off a command"""
+        command_lower = command.lower().strip()
+        units = r'(seconds?|secs?|minutes?|mins?|hours?)'
+        amount = r'(\d+(?:\.\d+)?|an?(?:\s+(?:few|couple(?:\s+of)?))?|[a-z]+)'
+        
+        # Time patterns: "in 10 seconds recall scene 4", "recall scene 4 in 10 seconds"
+        time_patterns = [
+            rf'^(?:in|after)\s+{amount}\s+{units}\s*,?\s+(?:then\s+)?(.+)$',
+            rf'^(.+?)\s+(?:in|after)\s+{amount}\s+{units}$',
+        ]
+        
+        for i, pattern in enumerate(time_patterns):
+            match = re.search(pattern, command_lower)
+            if match:
+                if i == 0:
+                    amount_text, unit, rest = match.groups()
+                else:
+                    rest, amount_text, unit = match.groups()
+                try:
+                    value = float(amount_text)
+                except ValueError:
+                    value = 1 if amount_text in ('a', 'an') else self.parse_number(amount_text)
+                if value is None:
+                    # Never run now what was asked for later
+                    return ScheduleSpec(rest.strip(), unreadable=f"{amount_text} {unit}")
+                return ScheduleSpec(rest.strip(), delay=value * self.time_units[unit])
+                
+        # Cue patterns: "at the end of this song mute 1 through 8", "on cue 5 recall scene 2"
+        cue_patterns = [
+            r'^(?:at|on)\s+(?:the\s+)?(end\s+of\s+(?:this\s+|the\s+)?(?:song|scene|set|act))\s*,?\s+(.+)$',
+            r'^(?:at|on)\s+(?:the\s+)?(next\s+cue|cue\s+\w+)\s*,?\s+(.+)$',
+        ]
+        
+        for pattern in cue_patterns:
+            match = re.search(pattern, command_lower)
+            if match:
+                return ScheduleSpec(match.group(2).strip(), cue=match.group(1))
                 
+        return None
+        
+    def process_scheduled(self, spec: ScheduleSpec) -> List[RCPCommand]:
+        """Parse the deferred part of a command and hand it to the scheduler"""
+        if spec.unreadable is not None:
+            return self.schedule_batch(spec, [], spec.command)
+        batch = self.translate_command(spec.command)
+        if not batch:
+            return []
+        return self.schedule_batch(spec, batch, "; ".join(result.description for result in batch))
+        
+    def schedule_batch(self, spec: ScheduleSpec, batch: List[Any], summary: str) -> List[RCPCommand]:
+        """Hand an already parsed batch (commands or raw RCP lines) to the scheduler"""
+        if spec.unreadable is not None:
+            return [RCPCommand(
+                f"# Could not schedule: {spec.unreadable}",
+                f"Could not schedule '{spec.unreadable}', not running: {summary}",
+                0.5
+            )]
+        when_text = f"in {spec.delay:g}s" if spec.delay is not None else f"at {spec.cue}"
+        
+        if self.scheduler is None:
+            return [RCPCommand(
+                f"# No scheduler available to run {when_text}",
+                f"Cannot schedule {when_text}: {summary}",
+                0.5
+            )]
+            
+        if spec.delay is not None:
+            entry = self.scheduler.schedule_in(spec.delay, batch, label=spec.command)
+        else:
+            entry = self.scheduler.schedule_on_cue(spec.cue, batch, label=spec.command)
+            
+        return [RCPCommand(
+            f"# Scheduled #{entry.batch_id} {when_text}",
+            f"Scheduled {when_text}: {summary}"
+        )]
+        
+    def process_schedule_control(self, command: str) -> Optional[List[RCPCommand]]:
+        """Handle listing, cancelling and cue firing for scheduled commands"""
+        if self.scheduler is None:
+            return None
+            
+        command_lower = command.lower().strip()
+        
+        if re.search(r'^(?:list|show)\s+(?:all\s+)?(?:scheduled|pending)(?:\s+commands)?$', command_lower):
+            results = []
+            for entry in self.scheduler.list_pending():
+                if entry.when is not None:
+                    when_text = f"in {max(0.0, entry.when - self.scheduler.clock()):.1f}s"
+                else:
+                    when_text = f"at {entry.cue}"
+                results.append(RCPCommand(
+                    f"# Scheduled #{entry.batch_id} {when_text}",
+                    f"Pending {when_text}: {entry.label}"
+                ))
+            return results
+            
+        if re.search(r'^cancel\s+(?:all\s+)(?:scheduled|pending)(?:\s+commands)?$', command_lower):
+            count = self.scheduler.cancel_all()
+            return [RCPCommand(f"# Cancelled {count} scheduled", f"Cancelled {count} scheduled commands")]
+            
+        match = re.search(r'^cancel\s+(?:scheduled|pending)(?:\s+command)?\s+(?:number\s+)?(\w+)$', command_lower)
+        if match:
+            batch_id = self.parse_number(match.group(1))
+            if batch_id is not None and self.scheduler.cancel(batch_id):
+                return [RCPCommand(f"# Cancelled scheduled #{batch_id}", f"Cancelled scheduled command {batch_id}")]
+            return [RCPCommand(f"# No scheduled #{match.group(1)}", f"No scheduled command {match.group(1)}", 0.5)]
+            
+        match = re.search(r'^(?:fire|trigger|go)\s+(end\s+of\s+.+|next\s+cue|cue\s+\w+)$', command_lower)
+        cue = match.group(1) if match else None
+        if cue is None:
+            # A bare name ("go 5") only counts when a batch waits on it, "go left" is not a cue
+            match = re.search(r'^(?:fire|trigger|go)\s+(\w+)$', command_lower)
+            if match and self.scheduler.has_cue(f"cue {match.group(1)}"):
+                cue = f"cue {match.group(1)}"
+        if cue is not None:
+            fired = self.scheduler.fire_cue(cue)
+            return [RCPCommand(f"# Fired cue {cue}", f"Fired cue '{cue}' ({len(fired)} scheduled)")]
+            
+        return None
+        
+    def process_undo_redo(self, command: str) -> Optional[List[RCPCommand]]:
+        """Handle "undo" / "redo" by replaying the journal as one batch"""
+        command_lower = command.lower().strip()
+        if re.search(r'^(?:undo|revert|take\s+(?:that\s+)?back)(?:\s+(?:that|it|last(?:\s+command)?|the\s+last\s+command))?$', command_lower):
+            action = 'undo'
+        elif re.search(r'^redo(?:\s+(?:that|it|last(?:\s+command)?))?$', command_lower):
+            action = 'redo'
+        else:
+            return None
+            
+        if self.journal is None:
+            return [RCPCommand(f"# No journal available to {action}", f"Cannot {action}: history disabled", 0.5)]
+            
+        replay = self.journal.undo() if action == 'undo' else self.journal.redo()
+        if replay is None:
+            return [RCPCommand(f"# Nothing to {action}", f"Nothing to {action}", 0.5)]
+            
+        entry, lines = replay
+        if not lines:
+            # Never push a guessed value to the desk
+            return [RCPCommand(f"# Cannot {action}: prior values unknown",
+                               f"Cannot {action} {entry.description}: the desk's prior values were never seen", 0.5)]
+        return [RCPCommand("\n".join(lines), f"{action.capitalize()}: {entry.description}")]
+        
+    def process_command(self, command: str) -> List[Union[RCPCommand, BulkRCPCommand]]:
+        """Main entry point for processing voice commands
+        
+        Batches are journalled for undo when a journal is attached. Scheduled
+        batches are not, the scheduler's dispatcher records them when they run.
+        """
+        command = command.strip()
+        results = self.process_undo_redo(command)
+        if results is not None:
+            return results
+            
+        results = self.translate_command(command)
+        if self.journal is not None and results:
+            self.journal.record(results, "; ".join(result.description for result in results))
         return results
         
-    def process_command(self, command: str) -> List[RCPCommand]:
-        """Main entry point for processing voice commands"""
+    def translate_command(self, command: str) -> List[Union[RCPCommand, BulkRCPCommand]]:
+        """Convert a voice command to RCP commands without journalling it"""
         results = []
         command = command.strip()
         
+        # Deferred and cue-based commands are parsed now but run later
+        control = self.process_schedule_control(command)
+        if control is not None:
+            return control
+        schedule = self.parse_schedule(command)
+        if schedule is not None:
+            return self.process_scheduled(schedule)
+        
+        # Mix ranges run once per mix, channel ranges and groups expand to one
+        # bulk operation per parameter
+        mixes = self.process_mix_range(command)
+        if mixes is not None:
+            return mixes
+        bulk = self.process_bulk_commands(command)
+        if bulk:
+            return bulk
+        
         # Try each processor
         processors = [
             self.process_channel_fader,
@@ -1,17 +1,22 @@
 #!/usr/bin/env python3
 """
-Simple Flask server for Voice Command GUI
+Simple Flask server for Voice Command GUI (or ASGI with --asgi)
 Serves the HTML interface and processes voice commands via the rule engine
 """
 
 from flask import Flask, request, jsonify, send_file
 from flask_cors import CORS
+import argparse
 import os
 import sys
 import socket
 import json
 from engine import VoiceCommandEngine
 
+# Default receiver settings for /send_to_receiver
+RECEIVER_HOST = '127.0.0.1'
+RECEIVER_PORT = 8080
+
 # Initialize Flask app
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
@@ -24,19 +29,16 @@ def index():
     """Serve the main GUI HTML file"""
     return send_file('gui.html')
 
-@app.route('/process', methods=['POST'])
-def process_command():
-    """Process a voice command and return RCP commands"""
+def process_payload(data):
+    """Run the engine on a /process payload, returns (response body, HTTP status)"""
     try:
-        data = request.get_json()
-        
         if not data or 'command' not in data:
-            return jsonify({'error': 'No command provided'}), 400
+            return {'error': 'No command provided'}, 400
             
         command = data['command'].strip()
         
         if not command:
-            return jsonify({'error': 'Empty command'}), 400
+            return {'error': 'Empty command'}, 400
             
         # Process the command
         results = engine.process_command(command)
@@ -50,14 +52,28 @@ def process_command():
                 'confidence': result.confidence
             })
             
-        return jsonify({
+        return {
             'success': True,
             'results': json_results,
             'command': command
-        })
+        }, 200
         
     except Exception as e:
-        return jsonify({'error': f'Server error: {str(e)}'}), 500
+        return {'error': f'Server error: {str(e)}'}, 500
+
+def receiver_reply(data):
+    """Response for a message sent to the receiver"""
+    return {
+        'success': True,
+        'message': f'Sent to receiver at {RECEIVER_HOST}:{RECEIVER_PORT}',
+        'commands_sent': len(data.get('rcpCommands', []))
+    }
+
+@app.route('/process', methods=['POST'])
+def process_command():
+    """Process a voice command and return RCP commands"""
+    body, status = process_payload(request.get_json(silent=True))
+    return jsonify(body), status
 
 @app.route('/labels', methods=['GET'])
 def get_labels():
@@ -83,15 +99,11 @@ def test_endpoint():
 def send_to_receiver():
     """Send RCP commands to ComputerReceiver"""
     try:
-        data = request.get_json()
+        data = request.get_json(silent=True)
         
         if not data:
             return jsonify({'error': 'No data provided'}), 400
         
-        # Default receiver settings
-        receiver_host = '127.0.0.1'
-        receiver_port = 8080
-        
         # Create UDP socket to send to receiver
         sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         sock.settimeout(5.0)  # 5 second timeout
@@ -99,13 +111,9 @@ def send_to_receiver():
         try:
             # Send the message as JSON
             message_json = json.dumps(data)
-            sock.sendto(message_json.encode('utf-8'), (receiver_host, receiver_port))
+            sock.sendto(message_json.encode('utf-8'), (RECEIVER_HOST, RECEIVER_PORT))
             
-            return jsonify({
-                'success': True,
-                'message': f'Sent to receiver at {receiver_host}:{receiver_port}',
-                'commands_sent': len(data.get('rcpCommands', []))
-            })
+            return jsonify(receiver_reply(data))
             
         except socket.timeout:
             return jsonify({'error': 'Timeout connecting to receiver - make sure it\'s running on port 8080'}), 408
@@ -119,28 +127,111 @@ def send_to_receiver():
     except Exception as e:
         return jsonify({'error': f'Server error: {str(e)}'}), 500
 
+def create_asgi_app():
+    """The same routes as an ASGI app for uvicorn (--asgi)
+
+    The engine runs in Starlette's thread pool so a slow parse never holds
+    up the event loop, and the UDP send to the receiver is awaited instead
+    of holding a worker thread.
+    """
+    import asyncio
+    from starlette.applications import Starlette
+    from starlette.concurrency import run_in_threadpool
+    from starlette.middleware import Middleware
+    from starlette.middleware.cors import CORSMiddleware
+    from starlette.responses import FileResponse, JSONResponse
+    from starlette.routing import Route
+
+    async def json_body(request):
+        try:
+            return await request.json()
+        except ValueError:
+            return None
+
+    async def index(request):
+        return FileResponse('gui.html')
+
+    async def process_command(request):
+        body, status = await run_in_threadpool(process_payload, await json_body(request))
+        return JSONResponse(body, status)
+
+    async def get_labels(request):
+        try:
+            return JSONResponse({
+                'channel_labels': engine.get_channel_labels(),
+                'dca_labels': engine.get_dca_labels()
+            })
+        except Exception as e:
+            return JSONResponse({'error': f'Server error: {str(e)}'}, 500)
+
+    async def test_endpoint(request):
+        return JSONResponse({
+            'status': 'ok',
+            'message': 'Voice Command Server is running',
+            'engine_ready': True
+        })
+
+    async def send_to_receiver(request):
+        data = await json_body(request)
+        if not data:
+            return JSONResponse({'error': 'No data provided'}, 400)
+        loop = asyncio.get_running_loop()
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.setblocking(False)
+            try:
+                await asyncio.wait_for(
+                    loop.sock_sendto(sock, json.dumps(data).encode('utf-8'), (RECEIVER_HOST, RECEIVER_PORT)), 5.0)
+            except asyncio.TimeoutError:
+                return JSONResponse({'error': 'Timeout connecting to receiver - make sure it\'s running on port 8080'}, 408)
+            except ConnectionRefusedError:
+                return JSONResponse({'error': 'Connection refused - make sure ComputerReceiver is running on port 8080'}, 503)
+            except OSError as e:
+                return JSONResponse({'error': f'Network error: {str(e)}'}, 500)
+        return JSONResponse(receiver_reply(data))
+
+    return Starlette(
+        routes=[
+            Route('/', index),
+            Route('/process', process_command, methods=['POST']),
+            Route('/labels', get_labels),
+            Route('/test', test_endpoint),
+            Route('/send_to_receiver', send_to_receiver, methods=['POST']),
+        ],
+        middleware=[Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])],
+    )
+
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Voice Command Tester Server')
+    parser.add_argument('--port', type=int, default=5001, help='HTTP port (default: 5001)')
+    parser.add_argument('--asgi', action='store_true', help='Serve the ASGI app with uvicorn instead of the Flask server')
+    args = parser.parse_args()
+    
     print("=" * 60)
     print("🎙️  Voice Command Tester Server")
     print("=" * 60)
     print()
     print("Starting server...")
-    print("📍 GUI will be available at: http://localhost:5001")
-    print("🔧 API endpoint: http://localhost:5001/process")
+    print(f"📍 GUI will be available at: http://localhost:{args.port}")
+    print(f"🔧 API endpoint: http://localhost:{args.port}/process")
     print()
     print("Press Ctrl+C to stop the server")
     print()
     
-    # Run the Flask development server
     try:
-        app.run(
-            host='127.0.0.1',
-            port=5001,  # Changed from 5000 to avoid Apple AirTunes conflict
-            debug=True,
-            use_reloader=False  # Disable reloader to prevent double startup
-        )
+        if args.asgi:
+            import uvicorn  # Needs uvicorn and starlette
+            print("⚡ ASGI mode (uvicorn)")
+            uvicorn.run(create_asgi_app(), host='127.0.0.1', port=args.port, access_log=False, log_level='warning')
+        else:
+            # Run the Flask development server
+            app.run(
+                host='127.0.0.1',
+                port=args.port,  # 5001 by default, 5000 conflicts with Apple AirTunes
+                debug=True,
+                use_reloader=False  # Disable reloader to prevent double startup
+            )
     except KeyboardInterrupt:
         print("\n👋 Server stopped")
     except Exception as e:
         print(f"❌ Error starting server: {e}")
-        sys.exit(1)
\ No newline at end of file
+        sys.exit(1)